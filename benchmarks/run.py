@@ -0,0 +1,242 @@
+"""Rendering benchmark: scripted sessions over synthetic plans.
+
+    python benchmarks/run.py --mp 1 16 100 --lines 500 --rects 200 -o results.json
+    python benchmarks/run.py --mp 1 16 --baseline results.json --fail-above 15
+
+Every plan runs in its own process under the SDL dummy video driver with
+FLANER_PROFILE recording on; frames are grouped by the scripted sequence
+that caused them (load, drag, draw, undo, zoom, pan). The results are JSON;
+with --baseline the p50/p95 frame times are compared per plan and sequence,
+and the exit status is 1 if any of them got slower than --fail-above percent.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from synthetic import SRC, make_plan  # noqa: E402
+
+RESULTS_VERSION = 1
+# sequences and the statistics compared against a baseline
+COMPARED = ('p50', 'p95')
+# changes smaller than this (in ms) are noise, whatever the percentage
+MIN_DELTA_MS = 0.5
+
+
+def _percentile(vals, q):
+    if not vals:
+        return 0.0
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, max(0, int(round(q * (len(vals) - 1)))))]
+
+
+def summarize(frames, waits):
+    """Per-tag frame statistics in milliseconds."""
+    from profiler import PHASES
+    by_tag = {}
+    for rec in frames:
+        by_tag.setdefault(rec.get('tag', '?'), []).append(rec)
+    out = {}
+    for tag, recs in by_tag.items():
+        total = [r['total'] * 1000.0 for r in recs]
+        out[tag] = {
+            'frames': len(recs),
+            'p50': _percentile(total, 0.5),
+            'p95': _percentile(total, 0.95),
+            'max': max(total),
+            'phases_p50': {ph: _percentile([r.get(ph, 0.0) * 1000.0 for r in recs], 0.5) for ph in PHASES},
+            'objects_drawn_max': max(r.get('objects_drawn', 0) for r in recs),
+        }
+    for tag, seconds in waits.items():
+        out.setdefault(tag, {'frames': 0})['wait_s'] = seconds
+    return out
+
+
+def worker(plan_root, meta_path, out_path, repeat):
+    """Run one scripted session of flaner over the plan; write its statistics to `out_path`."""
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+    os.environ['FLANER_PROJECTS'] = plan_root
+    os.environ['FLANER_AUTOSAVE'] = '0'
+    # every run decodes the plan image, unless the pixel cache is asked for explicitly
+    os.environ.setdefault('FLANER_PIXEL_CACHE_MB', '0')
+    os.environ.pop('FLANER_PROFILE', None)
+    if SRC not in sys.path:
+        sys.path.insert(0, SRC)
+    with open(meta_path, 'r', encoding='utf-8') as fh:
+        meta = json.load(fh)
+
+    import pygame
+    import flaner
+    import image_loader
+    from profiler import FrameProfiler
+    from scenarios import ScriptedEvents, build_script
+
+    script = build_script(meta, (flaner.WINDOW_WIDTH, flaner.WINDOW_HEIGHT), flaner.SIDEBAR_WIDTH,
+                          image_loader.IMAGE_LOADED, repeat=repeat)
+    source = ScriptedEvents(script)
+    profilers = []
+
+    class TaggedProfiler(FrameProfiler):
+        # every frame, labelled with the scripted sequence it belongs to
+        @classmethod
+        def from_env(cls, environ=None):
+            p = cls(enabled=True, size=1 << 20, dump_path=out_path + '.frames.csv')
+            profilers.append(p)
+            return p
+
+        def end_frame(self, *args, **kwargs):
+            n = len(self.frames)
+            super().end_frame(*args, **kwargs)
+            if len(self.frames) > n:
+                self.frames[-1]['tag'] = source.tag
+
+    flaner.FrameProfiler = TaggedProfiler
+    pygame.init()
+    source.install()
+    t0 = time.perf_counter()
+    try:
+        flaner.main()
+    except SystemExit:
+        pass
+    elapsed = time.perf_counter() - t0
+    frames = list(profilers[0].frames) if profilers else []
+    result = {
+        'plan': meta,
+        'steps': len(script),
+        'steps_done': source.pos,
+        'session_s': elapsed,
+        'sequences': summarize(frames, source.waits),
+    }
+    with open(out_path, 'w', encoding='utf-8') as fh:
+        json.dump(result, fh, indent=1)
+
+
+def run_plan(args, mp):
+    meta = make_plan(args.cache, mp, args.lines, args.rects, seed=args.seed, image_format=args.image_format)
+    plan_root = os.path.join(args.cache, meta['name'])
+    meta_path = os.path.join(plan_root, 'quicksave', 'bench-plan.json')
+    fd, out_path = tempfile.mkstemp(prefix='flaner-bench-', suffix='.json')
+    os.close(fd)
+    try:
+        cmd = [sys.executable, os.path.abspath(__file__), '--worker', plan_root, meta_path, out_path,
+               str(args.repeat)]
+        proc = subprocess.run(cmd, cwd=SRC, timeout=args.timeout)
+        if proc.returncode != 0:
+            raise RuntimeError(f"benchmark worker for {meta['name']} exited with {proc.returncode}")
+        with open(out_path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    finally:
+        for p in (out_path, out_path + '.frames.csv'):
+            try:
+                os.remove(p)
+            except Exception:
+                pass
+
+
+def environment():
+    info = {'python': platform.python_version(), 'platform': platform.platform(), 'machine': platform.machine()}
+    for mod in ('pygame', 'numpy'):
+        try:
+            info[mod] = __import__(mod).__version__
+        except Exception:
+            info[mod] = None
+    try:
+        info['commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                                        text=True).stdout.strip() or None
+    except Exception:
+        info['commit'] = None
+    return info
+
+
+def compare(results, baseline, fail_above):
+    """Rows (plan, tag, stat, base ms, new ms, change %) and whether any got slower than allowed."""
+    rows, failed = [], False
+    base_runs = {r['plan']['name']: r for r in baseline.get('runs', [])}
+    for run in results['runs']:
+        base = base_runs.get(run['plan']['name'])
+        if base is None:
+            continue
+        for tag, seq in run['sequences'].items():
+            old = base['sequences'].get(tag)
+            if not old or not seq.get('frames') or not old.get('frames'):
+                continue
+            for stat in COMPARED:
+                a, b = old[stat], seq[stat]
+                pct = (b - a) / a * 100.0 if a else 0.0
+                slower = pct > fail_above and b - a > MIN_DELTA_MS
+                failed = failed or slower
+                rows.append((run['plan']['name'], tag, stat, a, b, pct, slower))
+    return rows, failed
+
+
+def print_results(results):
+    for run in results['runs']:
+        print(f"{run['plan']['name']}  ({run['plan']['size'][0]}x{run['plan']['size'][1]}, "
+              f"{run['session_s']:.1f} s)")
+        for tag, seq in run['sequences'].items():
+            line = f"  {tag:<6} {seq.get('frames', 0):5d} frames"
+            if seq.get('frames'):
+                line += f"  p50 {seq['p50']:7.2f}  p95 {seq['p95']:7.2f}  max {seq['max']:7.2f} ms"
+            if 'wait_s' in seq:
+                line += f"  waited {seq['wait_s']:.2f} s"
+            print(line)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Scripted rendering benchmark over synthetic plans.')
+    ap.add_argument('--mp', type=float, nargs='+', default=[1.0, 16.0], help='plan image sizes in megapixels')
+    ap.add_argument('--lines', type=int, default=500, help='measure lines per plan')
+    ap.add_argument('--rects', type=int, default=200, help='rectangles per plan')
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--repeat', type=int, default=1, help='times the scripted sequences run per plan')
+    ap.add_argument('--image-format', default='png', choices=('png', 'jpg', 'bmp'))
+    ap.add_argument('--cache', default=os.path.join(tempfile.gettempdir(), 'flaner-bench'),
+                    help='folder for the generated plans (reused between runs)')
+    ap.add_argument('--timeout', type=float, default=1800.0, help='seconds per plan')
+    ap.add_argument('-o', '--output', help='write the results as JSON here')
+    ap.add_argument('--baseline', help='results JSON of an earlier run to compare against')
+    ap.add_argument('--fail-above', type=float, default=10.0,
+                    help='percent slowdown of a p50/p95 against the baseline that counts as a regression')
+    args = ap.parse_args(argv)
+
+    os.makedirs(args.cache, exist_ok=True)
+    results = {'version': RESULTS_VERSION, 'environment': environment(),
+               'args': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'cache')},
+               'runs': []}
+    for mp in args.mp:
+        results['runs'].append(run_plan(args, mp))
+    print_results(results)
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        rows, failed = compare(results, baseline, args.fail_above)
+        results['baseline'] = {'path': args.baseline, 'environment': baseline.get('environment'),
+                               'fail_above': args.fail_above,
+                               'rows': [dict(zip(('plan', 'tag', 'stat', 'base_ms', 'ms', 'change_pct', 'slower'), r))
+                                        for r in rows]}
+        print(f"\ncompared with {args.baseline}:")
+        for plan, tag, stat, a, b, pct, slower in rows:
+            print(f"  {plan:<24} {tag:<6} {stat}  {a:7.2f} -> {b:7.2f} ms  {pct:+6.1f}%{'  SLOWER' if slower else ''}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=1)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        worker(sys.argv[2], sys.argv[3], sys.argv[4], int(sys.argv[5]))
+        sys.exit(0)
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Scripted input for the benchmarks.
+
+`build_script` turns a plan's metadata into a list of steps; `ScriptedEvents`
+replaces pygame's event queue so `flaner.main()` sees exactly one scripted
+event per frame. Events posted by worker threads (image load, saves) are
+passed through first, and `Until` steps block until such an event arrives.
+Each step carries a tag (load, drag, undo, draw, zoom, pan) that the frames
+it causes are reported under.
+"""
+import time
+
+import pygame
+
+# frames per sequence; the runner can scale them with --repeat
+ZOOM_STEPS = 15
+PAN_STEPS = 30
+DRAG_STEPS = 30
+UNDO_STEPS = 10
+DRAW_LINES = 5
+
+
+class Until:
+    """Block until an event of `etype` arrives (e.g. IMAGE_LOADED)."""
+    def __init__(self, etype, limit_s=600.0):
+        self.etype = etype
+        self.limit_s = limit_s
+
+
+def _ev(etype, **attrs):
+    return pygame.event.Event(etype, **attrs)
+
+
+def key(k, mod=0, unicode=''):
+    return _ev(pygame.KEYDOWN, key=k, mod=mod, unicode=unicode, scancode=0)
+
+
+def press(pos, button=1):
+    return _ev(pygame.MOUSEBUTTONDOWN, pos=pos, button=button, touch=False, which=0)
+
+
+def release(pos, button=1):
+    return _ev(pygame.MOUSEBUTTONUP, pos=pos, button=button, touch=False, which=0)
+
+
+def motion(pos, rel, buttons=(1, 0, 0)):
+    return _ev(pygame.MOUSEMOTION, pos=pos, rel=rel, buttons=buttons, touch=False, which=0)
+
+
+def wheel(y):
+    return _ev(pygame.MOUSEWHEEL, x=0, y=y, flipped=False, precise_x=0.0, precise_y=float(y), which=0, touch=False)
+
+
+def drag(tag, start, delta, steps):
+    """Press at `start`, move by `delta` in `steps` motion events, release."""
+    out = [(tag, press(start))]
+    x, y = start
+    for i in range(1, steps + 1):
+        nx = start[0] + int(delta[0] * i / steps)
+        ny = start[1] + int(delta[1] * i / steps)
+        out.append((tag, motion((nx, ny), (nx - x, ny - y))))
+        x, y = nx, ny
+    out.append((tag, release((x, y))))
+    return out
+
+
+def fitted_view(size, window, sidebar):
+    """(scale, left, top) of the image right after it was loaded (see fit_image)."""
+    w, h = size
+    scale = min((window[0] - sidebar) / w, window[1] / h, 1.0)
+    return scale, sidebar, 0
+
+
+def build_script(meta, window, sidebar, image_loaded_event, repeat=1):
+    """Steps for one benchmark run over the plan described by `meta`."""
+    scale, left, top = fitted_view(meta['size'], window, sidebar)
+
+    def screen(x, y):
+        return left + int(x * scale), top + int(y * scale)
+
+    x0, y0, x1, y1 = meta['probe']
+    probe = screen((x0 + x1) / 2, (y0 + y1) / 2)
+    steps = []
+    # quickload (nothing is open yet), then toggle the grid twice: the first key finishes the object stream
+    steps.append(('load', key(pygame.K_q, unicode='q')))
+    steps.append(('load', Until(image_loaded_event)))
+    steps.append(('load', key(pygame.K_v, unicode='v')))
+    steps.append(('load', key(pygame.K_v, unicode='v')))
+    for _ in range(repeat):
+        # grab the probe rectangle and move it around
+        steps += drag('drag', probe, (120, 80), DRAG_STEPS)
+        steps += drag('drag', (probe[0] + 120, probe[1] + 80), (-120, -80), DRAG_STEPS)
+        # new measure lines, then undo and redo them together with the drags
+        for i in range(DRAW_LINES):
+            steps.append(('draw', key(pygame.K_l, unicode='l')))
+            a = (probe[0] - 150, probe[1] - 100 + i * 20)
+            steps += drag('draw', a, (100, 0), 5)
+        for _ in range(UNDO_STEPS):
+            steps.append(('undo', key(pygame.K_z, mod=pygame.KMOD_CTRL)))
+        for _ in range(UNDO_STEPS):
+            steps.append(('undo', key(pygame.K_y, mod=pygame.KMOD_CTRL)))
+        # zoom in on the probe and back out
+        steps.append(('zoom', motion(probe, (0, 0), buttons=(0, 0, 0))))
+        steps += [('zoom', wheel(1)) for _ in range(ZOOM_STEPS)]
+        steps += [('zoom', wheel(-1)) for _ in range(ZOOM_STEPS)]
+        # pan by dragging the empty room
+        blank = screen(*meta['blank'])
+        steps += drag('pan', blank, (300, 200), PAN_STEPS)
+        steps += drag('pan', (blank[0] + 300, blank[1] + 200), (-300, -200), PAN_STEPS)
+    return steps
+
+
+class ScriptedEvents:
+    """Stand-in for pygame.event.wait/get, pygame.mouse.get_pos and pygame.key.get_mods."""
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.pos = 0
+        self.tag = 'load'
+        self.mouse = (0, 0)
+        self.mods = 0
+        self.waits = {}       # tag -> seconds spent blocked in Until steps
+        self._pending = []
+        self._real_wait = pygame.event.wait
+        self._real_get = pygame.event.get
+
+    def install(self):
+        pygame.event.wait = self.wait
+        pygame.event.get = self.get
+        pygame.mouse.get_pos = lambda: self.mouse
+        pygame.key.get_mods = lambda: self.mods
+
+    def get(self, *args, **kwargs):
+        # one event per frame; everything else comes through `wait`
+        return []
+
+    def _next_scripted(self):
+        if self.pos >= len(self.steps):
+            return _ev(pygame.QUIT)
+        tag, step = self.steps[self.pos]
+        self.tag = tag
+        if isinstance(step, Until):
+            t0 = time.perf_counter()
+            while time.perf_counter() - t0 < step.limit_s:
+                ev = self._real_wait(100)
+                if ev.type == step.etype:
+                    self.pos += 1
+                    self.waits[tag] = self.waits.get(tag, 0.0) + time.perf_counter() - t0
+                    return ev
+                if ev.type >= pygame.USEREVENT:
+                    # e.g. the low-resolution preview that precedes IMAGE_LOADED
+                    return ev
+            raise RuntimeError(f"timed out waiting for event {step.etype}")
+        self.pos += 1
+        if hasattr(step, 'pos'):
+            self.mouse = step.pos
+        if step.type == pygame.KEYDOWN:
+            self.mods = step.mod
+        return step
+
+    def wait(self, timeout=0):
+        # thread-posted events (image load, saves) first; window events are dropped
+        for ev in self._real_get():
+            if ev.type >= pygame.USEREVENT:
+                self._pending.append(ev)
+        if self._pending:
+            return self._pending.pop(0)
+        return self._next_scripted()
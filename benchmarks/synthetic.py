@@ -0,0 +1,117 @@
+"""Synthetic floor plans for the benchmarks.
+
+A plan is a project folder (image + project.json) with a scale line, N
+measure lines along the walls and M room rectangles, generated from a fixed
+seed so every run draws the same scene. The last object is the "probe"
+rectangle in the middle of the plan, which the scripted drag grabs; the
+top-left room is left empty for the scripted pan.
+"""
+import json
+import math
+import os
+import random
+import sys
+
+import numpy as np
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+ASPECT = 1.5
+WALL_COLOR = (40, 40, 40)
+PAPER_COLOR = (245, 243, 238)
+PLAN_META = 'bench-plan.json'
+
+
+def image_size(megapixels):
+    w = int(math.sqrt(megapixels * 1e6 * ASPECT))
+    return w, max(1, int(w / ASPECT))
+
+
+def plan_name(megapixels, lines, rects, seed):
+    return f"{megapixels:g}mp-{lines}l-{rects}r-s{seed}"
+
+
+def _rooms(w, h, rng):
+    # a regular grid of rooms with some cells merged, in image pixels
+    cell = max(60, int(min(w, h) / 12))
+    rooms = []
+    for y in range(0, h - cell, cell):
+        x = 0
+        while x < w - cell:
+            span = cell * rng.choice((1, 1, 2))
+            rooms.append((x, y, min(w - 1, x + span), min(h - 1, y + cell)))
+            x += span
+    return rooms, cell
+
+
+def _draw_image(path, w, h, rooms, wall):
+    # walls as thick lines straight into an (h, w, 3) array; writing it is the slow part for 100 MP
+    import pygame
+    arr = np.empty((h, w, 3), dtype=np.uint8)
+    arr[:] = PAPER_COLOR
+    for x0, y0, x1, y1 in rooms:
+        arr[y0:y0 + wall, x0:x1] = WALL_COLOR
+        arr[y1 - wall:y1, x0:x1] = WALL_COLOR
+        arr[y0:y1, x0:x0 + wall] = WALL_COLOR
+        arr[y0:y1, x1 - wall:x1] = WALL_COLOR
+    surf = pygame.surfarray.make_surface(arr.transpose(1, 0, 2))
+    tmp = path + '.tmp' + os.path.splitext(path)[1]
+    pygame.image.save(surf, tmp)
+    os.replace(tmp, path)
+
+
+def make_plan(root, megapixels, lines, rects, seed=1, image_format='png'):
+    """Create (or reuse) the plan folder `<root>/<name>/quicksave`; returns its metadata."""
+    name = plan_name(megapixels, lines, rects, seed)
+    proj_dir = os.path.join(root, name, 'quicksave')
+    meta_path = os.path.join(proj_dir, PLAN_META)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as fh:
+            meta = json.load(fh)
+        if os.path.isfile(os.path.join(proj_dir, meta['image'])):
+            return meta
+    except Exception:
+        pass
+
+    from objects.scale_line import ScaleLine
+    from objects.measure_line import MeasureLine
+    from objects.rectangle import Rectangle
+    from project_writer import save_project, write_json_atomic
+
+    rng = random.Random(seed)
+    w, h = image_size(megapixels)
+    rooms, cell = _rooms(w, h, rng)
+    wall = max(2, cell // 40)
+    os.makedirs(proj_dir, exist_ok=True)
+    image = f"plan.{image_format}"
+    _draw_image(os.path.join(proj_dir, image), w, h, rooms, wall)
+
+    # the first room stays empty, so a click there pans instead of selecting
+    blank = rooms[0]
+    rooms = rooms[1:]
+    objects = [ScaleLine((rooms[0][0], rooms[0][1]), (rooms[0][2], rooms[0][1]), meters=4.0).to_dict()]
+    for _ in range(lines):
+        x0, y0, x1, y1 = rng.choice(rooms)
+        if rng.random() < 0.5:
+            y = rng.choice((y0, y1)) + rng.uniform(-wall, wall)
+            objects.append(MeasureLine((x0, y), (x1, y), width=2).to_dict())
+        else:
+            x = rng.choice((x0, x1)) + rng.uniform(-wall, wall)
+            objects.append(MeasureLine((x, y0), (x, y1), width=2).to_dict())
+    for _ in range(rects):
+        x0, y0, x1, y1 = rng.choice(rooms)
+        m = rng.uniform(0.05, 0.3)
+        dx, dy = (x1 - x0) * m, (y1 - y0) * m
+        objects.append(Rectangle((x0 + dx, y0 + dy), (x1 - dx, y1 - dy), width=2).to_dict())
+    # the probe: a room-sized rectangle in the middle, on top of everything else
+    probe = (w * 0.45, h * 0.45, w * 0.55, h * 0.55)
+    objects.append(Rectangle(probe[:2], probe[2:], color=(80, 200, 255), width=3).to_dict())
+    save_project(proj_dir, os.path.join(proj_dir, image), objects)
+
+    meta = {'name': name, 'image': image, 'size': [w, h], 'megapixels': megapixels,
+            'lines': lines, 'rects': rects, 'seed': seed, 'probe': list(probe),
+            'blank': [(blank[0] + blank[2]) / 2, (blank[1] + blank[3]) / 2]}
+    write_json_atomic(meta_path, meta)
+    return meta
@@ -0,0 +1,198 @@
+"""Headless renderer: draws saved projects into image files without a window.
+
+Usage (from the `src` folder, or with `src` on PYTHONPATH):
+
+    python -m flaner render PROJECT_OR_FOLDER [...] -o OUT_DIR [--width 2000 | --scale 0.5]
+        [--format png|jpg] [--grid-spacing 50] [--no-grid] [--jobs N]
+
+A path containing `project.json` (or `project.flnb`) is rendered directly; any other folder is
+searched one level deep for project folders (e.g. the projects root).
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# project_loader.PROJECT_FILE / BINARY_FILE; kept here so scanning for projects does not need
+# project_loader (and with it pygame). Run as `flaner.py render`, pygame is already imported by then.
+PROJECT_FILES = ('project.json', 'project.flnb')
+# grid of projects saved without one (the app's default)
+DEFAULT_GRID_SPACING_M = 0.5
+_labels = None  # per-process label renderer (font resolved once per worker)
+
+
+def _init_pygame():
+    # the dummy video driver lets pygame draw into Surfaces without a display
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    import pygame
+    pygame.display.init()
+    pygame.font.init()
+
+
+def _is_project(d):
+    return any(os.path.isfile(os.path.join(d, name)) for name in PROJECT_FILES)
+
+
+def find_projects(paths):
+    """Expand the given paths into a sorted list of project folders."""
+    found = []
+    for p in paths:
+        if _is_project(p):
+            found.append(p)
+            continue
+        try:
+            names = sorted(os.listdir(p))
+        except Exception:
+            continue
+        for name in names:
+            d = os.path.join(p, name)
+            if _is_project(d):
+                found.append(d)
+    return found
+
+
+def load_scene(path):
+    """Read a project file into a Scene; returns (fields, scene)."""
+    from scene import Scene
+    from project_loader import load_project
+    columns = None
+    if path.endswith('.flnb'):
+        from project_binary import load_binary
+        fields, scale_object, objects, columns = load_binary(path)
+    else:
+        fields, scale_object, objects = load_project(path)
+    scene = Scene()
+    scene.replace(scale_object, objects, columns)
+    return fields, scene
+
+
+def saved_grid(fields, image_scale):
+    """(spacing_m, offset_px) of the project's saved grid at `image_scale`, or None.
+
+    The app stores the offset in display pixels at the zoom it was dragged at
+    (`offset_scale`, 1.0 when missing), so it is rescaled to the render.
+    """
+    grid = fields.get('grid')
+    if not isinstance(grid, dict) or not grid.get('spacing_m'):
+        return None
+    try:
+        ox, oy = grid.get('offset_px') or (0.0, 0.0)
+        k = image_scale / float(grid.get('offset_scale') or 1.0)
+        return float(grid['spacing_m']), (ox * k, oy * k)
+    except Exception:
+        return float(grid['spacing_m']), (0.0, 0.0)
+
+
+def render_project(project_dir, out_path, width=None, scale=None, grid=True, grid_spacing_m=None, label_scale=1.0):
+    """Render one project folder to `out_path` (format chosen by extension).
+
+    The grid follows the project's saved spacing and offset; `grid_spacing_m`
+    overrides the spacing, and is the default for projects without a grid.
+    """
+    import pygame
+    from grid import draw_grid
+    from labels import LabelRenderer
+    from image_loader import load_full
+    from project_loader import project_file
+
+    data, scene = load_scene(project_file(project_dir))
+    original = load_full(os.path.join(project_dir, data.get('image')))
+    orig_w, orig_h = original.get_size()
+    if width:
+        image_scale = float(width) / orig_w
+    elif scale:
+        image_scale = float(scale)
+    else:
+        image_scale = 1.0
+    out_w = max(1, int(orig_w * image_scale))
+    out_h = max(1, int(orig_h * image_scale))
+    image_rect = pygame.Rect(0, 0, out_w, out_h)
+    out = pygame.Surface((out_w, out_h), 0, 32)
+    try:
+        out.blit(pygame.transform.smoothscale(original, (out_w, out_h)), (0, 0))
+    except Exception:
+        out.blit(pygame.transform.scale(original, (out_w, out_h)), (0, 0))
+
+    ppm = scene.pixels_per_meter
+    text_scale = image_scale * label_scale
+    global _labels
+    if _labels is None:
+        _labels = LabelRenderer()
+    labels = _labels
+    if scene.scale_object:
+        scene.scale_object.draw(out, image_rect, image_scale, labels, pixels_per_meter=ppm, label_scale=text_scale)
+    for obj in scene.objects:
+        obj.draw(out, image_rect, image_scale, labels, pixels_per_meter=ppm, label_scale=text_scale)
+    if grid and ppm:
+        spacing_m, offset_px = saved_grid(data, image_scale) or (DEFAULT_GRID_SPACING_M, (0.0, 0.0))
+        if grid_spacing_m:
+            spacing_m = grid_spacing_m
+        draw_grid(out, image_rect, image_scale, ppm, spacing_m, offset_px)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    pygame.image.save(out, out_path)
+    return out_path
+
+
+def _render_job(args):
+    project_dir, out_path, opts = args
+    try:
+        render_project(project_dir, out_path, **opts)
+        return project_dir, out_path, None
+    except Exception as e:
+        return project_dir, out_path, f"{type(e).__name__}: {e}"
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog='flaner render', description='Render saved Flaner projects to image files.')
+    ap.add_argument('paths', nargs='+', help='project folders, or folders containing project folders')
+    ap.add_argument('-o', '--out', default='renders', help='output folder (default: ./renders)')
+    size = ap.add_mutually_exclusive_group()
+    size.add_argument('--width', type=int, help='output width in pixels (height keeps the aspect ratio)')
+    size.add_argument('--scale', type=float, help='output scale relative to the source image (default 1.0)')
+    ap.add_argument('--format', choices=('png', 'jpg'), default='png')
+    ap.add_argument('--grid-spacing', type=float, help="grid spacing in centimeters (default: the project's, else 50)")
+    ap.add_argument('--no-grid', action='store_true', help='do not draw the grid')
+    ap.add_argument('--label-scale', type=float, default=1.0)
+    ap.add_argument('-j', '--jobs', type=int, default=0, help='worker processes (default: CPU count)')
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    projects = find_projects(args.paths)
+    if not projects:
+        print('No projects found.', file=sys.stderr)
+        return 1
+    opts = {
+        'width': args.width,
+        'scale': args.scale,
+        'grid': not args.no_grid,
+        'grid_spacing_m': args.grid_spacing / 100.0 if args.grid_spacing else None,
+        'label_scale': args.label_scale,
+    }
+    jobs = []
+    for d in projects:
+        name = os.path.basename(os.path.normpath(d))
+        jobs.append((d, os.path.join(args.out, f"{name}.{args.format}"), opts))
+
+    failed = 0
+    workers = min(args.jobs or os.cpu_count() or 1, len(jobs))
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_pygame)
+        results = (f.result() for f in as_completed([pool.submit(_render_job, j) for j in jobs]))
+    else:
+        _init_pygame()
+        results = (_render_job(j) for j in jobs)
+    try:
+        for i, (project_dir, out_path, err) in enumerate(results, 1):
+            if err:
+                failed += 1
+                print(f"[{i}/{len(jobs)}] FAILED {project_dir}: {err}", file=sys.stderr)
+            else:
+                print(f"[{i}/{len(jobs)}] {out_path}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return 1 if failed else 0
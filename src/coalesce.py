@@ -0,0 +1,62 @@
+import pygame
+
+# a resize counts as finished after this long without another VIDEORESIZE
+RESIZE_SETTLE_MS = 200
+
+
+def coalesce_events(events):
+    """Collapse one frame's events: runs of MOUSEMOTION and all VIDEORESIZE.
+
+    Consecutive motion events become one at the latest position with the
+    summed `rel`, so a drag or pan does its work once per frame however fast
+    the mouse reports. Motion is never merged across other events (a button
+    release in between still sees the position it happened at). Only the last
+    VIDEORESIZE is kept, at its own place in the order.
+    """
+    out = []
+    last_resize = None
+    for i, ev in enumerate(events):
+        if ev.type == pygame.VIDEORESIZE:
+            last_resize = i
+    for i, ev in enumerate(events):
+        if ev.type == pygame.VIDEORESIZE and i != last_resize:
+            continue
+        if ev.type == pygame.MOUSEMOTION and out and out[-1].type == pygame.MOUSEMOTION:
+            prev = out[-1]
+            attrs = dict(ev.dict)
+            rel = getattr(prev, 'rel', (0, 0))
+            cur = getattr(ev, 'rel', (0, 0))
+            attrs['rel'] = (rel[0] + cur[0], rel[1] + cur[1])
+            out[-1] = pygame.event.Event(pygame.MOUSEMOTION, attrs)
+            continue
+        out.append(ev)
+    return out
+
+
+class ResizeDebounce:
+    """Tracks whether the window is being resized.
+
+    While `active`, drawing uses the cheap nearest-neighbour scale; `settled`
+    reports (once) that no resize arrived for `settle_ms`, which is when the
+    quality resample is due.
+    """
+    def __init__(self, settle_ms=RESIZE_SETTLE_MS):
+        self.settle_ms = settle_ms
+        self.deadline = 0
+
+    @property
+    def active(self):
+        return self.deadline != 0
+
+    def resized(self, now):
+        self.deadline = now + self.settle_ms
+
+    def timeout(self, now):
+        """Milliseconds until the resize settles (for event.wait), or 0 when idle."""
+        return max(1, self.deadline - now) if self.deadline else 0
+
+    def settled(self, now):
+        if self.deadline and now >= self.deadline:
+            self.deadline = 0
+            return True
+        return False
@@ -0,0 +1,447 @@
+"""Wall and room detection on plan images, to seed measurements.
+
+`detect_array` finds the dominant straight lines of a grayscale plan with a
+Hough transform over its ink pixels and closes them into rectangular rooms;
+`DetectJob` runs it for an image file in a separate process and caches the
+proposals per image (see pixel_cache.source_key), so reopening a plan gives
+them back at once. Everything is in original-image pixels.
+"""
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+
+import numpy as np
+import pygame
+
+# kept in the projects root, next to .pixelcache
+DETECT_FOLDER = '.detectcache'
+# bump when the detector changes, so older cached proposals are recomputed
+DETECT_VERSION = 1
+# the analysis runs on the image reduced to this size (darkest pixel per block, so thin lines survive)
+WORK_MAX_SIDE = 1600
+# angular resolution of the accumulator
+THETA_STEP_DEG = 0.5
+# at most this many ink pixels vote; on busier plans a random sample does
+MAX_VOTERS = 250_000
+MAX_LINES = 300
+# a wall is at least this long, as a fraction of the longer side of the work image
+MIN_LENGTH_FRAC = 0.04
+# lines within this many degrees of horizontal/vertical may bound a room
+AXIS_TOLERANCE_DEG = 2.0
+# share of a room side that has to lie on a detected wall
+ROOM_COVERAGE = 0.7
+# rooms smaller than this (fraction of the longer side) are ignored
+MIN_ROOM_FRAC = 0.03
+MAX_ROOMS = 500
+
+# posted from the job thread; attrs: job_id, path, result, error, cached
+DETECT_DONE = pygame.event.custom_type()
+
+_job_ids = itertools.count(1)
+
+
+def reduce_gray(gray, max_side=WORK_MAX_SIDE):
+    """(reduced array, factor): `gray` shrunk by an integer factor, keeping the darkest pixel of each block."""
+    h, w = gray.shape
+    f = max(1, int(math.ceil(max(h, w) / float(max_side))))
+    if f == 1:
+        return gray, 1
+    h2, w2 = h // f, w // f
+    blocks = gray[:h2 * f, :w2 * f].reshape(h2, f, w2, f)
+    return blocks.min(axis=(1, 3)), f
+
+
+def otsu_threshold(gray):
+    """Gray level that best separates ink from paper."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    levels = np.arange(256, dtype=np.float64)
+    w0 = np.cumsum(hist)
+    w1 = total - w0
+    m0 = np.cumsum(hist * levels)
+    mean_all = m0[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (mean_all * w0 - total * m0) ** 2 / (w0 * w1)
+    between[~np.isfinite(between)] = 0
+    return int(np.argmax(between))
+
+
+def ink_mask(gray):
+    """Boolean mask of the drawing: pixels darker than the Otsu level (or lighter, on a dark plan)."""
+    t = otsu_threshold(gray)
+    mask = gray <= t
+    if mask.mean() > 0.5:
+        # light lines on a dark background
+        mask = ~mask
+    return mask
+
+
+class _Hough:
+    # vote accumulator over (theta, rho) for a set of points, with removal
+    def __init__(self, xs, ys, diag):
+        self.thetas = np.deg2rad(np.arange(0.0, 180.0, THETA_STEP_DEG))
+        self.cos = np.cos(self.thetas)
+        self.sin = np.sin(self.thetas)
+        self.n_rho = 2 * diag + 1
+        self.offset = diag
+        self.acc = np.zeros(len(self.thetas) * self.n_rho, dtype=np.int32)
+        self.vote(xs, ys, 1)
+
+    def vote(self, xs, ys, sign, chunk=8192):
+        cols = np.arange(len(self.thetas)) * self.n_rho
+        for i in range(0, len(xs), chunk):
+            x = xs[i:i + chunk, None].astype(np.float32)
+            y = ys[i:i + chunk, None].astype(np.float32)
+            rho = np.rint(x * self.cos + y * self.sin).astype(np.int64) + self.offset
+            counts = np.bincount((rho + cols).ravel(), minlength=self.acc.size)
+            if sign > 0:
+                self.acc += counts.astype(np.int32)
+            else:
+                self.acc -= counts.astype(np.int32)
+
+    def peak(self):
+        i = int(np.argmax(self.acc))
+        t, r = divmod(i, self.n_rho)
+        return int(self.acc[i]), t, r
+
+    def band(self, t, r, votes):
+        # rho bins next to the peak with at least half its votes: the stroke's thickness
+        row = self.acc[t * self.n_rho:(t + 1) * self.n_rho]
+        lo = hi = r
+        while lo > 0 and row[lo - 1] * 2 >= votes:
+            lo -= 1
+        while hi < self.n_rho - 1 and row[hi + 1] * 2 >= votes:
+            hi += 1
+        return lo - self.offset, hi - self.offset
+
+
+def _runs(ts, max_gap, min_length):
+    """(start, end) runs of sorted positions `ts` split at gaps over `max_gap`, at least `min_length` long."""
+    if len(ts) == 0:
+        return []
+    breaks = np.nonzero(np.diff(ts) > max_gap)[0]
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [len(ts) - 1]))
+    out = []
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        if ts[e] - ts[s] >= min_length:
+            out.append((float(ts[s]), float(ts[e])))
+    return out
+
+
+def find_lines(mask, max_lines=MAX_LINES, min_length=None, seed=0):
+    """Walls in a boolean ink mask, strongest first.
+
+    Each wall is a dict with `theta` (radians, of the line normal), `rho`
+    (centre of the stroke), `half` (half its thickness) and `segments`, the
+    (t0, t1) stretches along the line that are drawn, split at gaps such as
+    door openings. The strongest peak of the accumulator is taken, its
+    pixels are removed from the vote, and so on until no peak is long enough.
+    """
+    h, w = mask.shape
+    if min_length is None:
+        min_length = max(12, int(MIN_LENGTH_FRAC * max(h, w)))
+    ys, xs = np.nonzero(mask)
+    xf, yf = xs.astype(np.float32), ys.astype(np.float32)
+    # on busy plans only a sample votes; segments are still cut from every ink pixel
+    voters = np.arange(len(xs))
+    if len(xs) > MAX_VOTERS:
+        voters = np.sort(np.random.default_rng(seed).choice(len(xs), MAX_VOTERS, replace=False))
+    density = len(voters) / float(max(1, len(xs)))
+    vx, vy = xf[voters], yf[voters]
+    hough = _Hough(xs[voters], ys[voters], int(math.ceil(math.hypot(w, h))))
+    alive = np.ones(len(voters), dtype=bool)
+    lines = []
+    for _ in range(max_lines * 2):
+        if len(lines) >= max_lines:
+            break
+        votes, t, r = hough.peak()
+        if votes < min_length * density:
+            break
+        lo, hi = hough.band(t, r, votes)
+        c, s = float(hough.cos[t]), float(hough.sin[t])
+        # this stroke no longer votes
+        vrho = vx * c + vy * s
+        gone = np.nonzero(alive & (vrho >= lo - 0.5) & (vrho <= hi + 0.5))[0]
+        alive[gone] = False
+        hough.vote(xs[voters[gone]], ys[voters[gone]], -1)
+        # ...but crossing walls keep their pixels, so they are not cut where this one crosses
+        rho = xf * c + yf * s
+        band = (rho >= lo - 0.5) & (rho <= hi + 0.5)
+        half = (hi - lo) / 2.0 + 0.5
+        along = np.sort(-xf[band] * s + yf[band] * c)
+        segments = _runs(along, max(3.0, 2.0 * half), min_length)
+        if segments:
+            lines.append({'theta': float(hough.thetas[t]), 'rho': (lo + hi) / 2.0, 'half': half,
+                          'segments': segments})
+    return lines
+
+
+def line_endpoints(line, t0, t1):
+    c, s = math.cos(line['theta']), math.sin(line['theta'])
+    rho = line['rho']
+    return (rho * c - t0 * s, rho * s + t0 * c), (rho * c - t1 * s, rho * s + t1 * c)
+
+
+def _axis(line):
+    # 'h' or 'v' for (near) axis-aligned walls, else None; theta is the normal angle
+    deg = math.degrees(line['theta'])
+    if abs(deg - 90.0) <= AXIS_TOLERANCE_DEG:
+        return 'h'
+    if deg <= AXIS_TOLERANCE_DEG or deg >= 180.0 - AXIS_TOLERANCE_DEG:
+        return 'v'
+    return None
+
+
+def _axis_walls(lines, tol):
+    """Horizontal and vertical walls as (position, half thickness, [(a, b), ...]) sorted by position.
+
+    Parallel walls closer than `tol` (two detections of one stroke) are merged.
+    """
+    found = {'h': [], 'v': []}
+    for line in lines:
+        axis = _axis(line)
+        if axis is None:
+            continue
+        spans = []
+        for t0, t1 in line['segments']:
+            p, q = line_endpoints(line, t0, t1)
+            # along x for a horizontal wall, along y for a vertical one
+            k = 0 if axis == 'h' else 1
+            a, b = sorted((p[k], q[k]))
+            spans.append((a, b))
+        pos = line['rho'] * (math.sin(line['theta']) if axis == 'h' else math.cos(line['theta']))
+        found[axis].append([abs(pos), line['half'], spans])
+    out = {}
+    for axis, walls in found.items():
+        walls.sort(key=lambda wall: wall[0])
+        merged = []
+        for wall in walls:
+            if merged and wall[0] - merged[-1][0] <= tol:
+                merged[-1][2] = merged[-1][2] + wall[2]
+                merged[-1][1] = max(merged[-1][1], wall[1])
+                continue
+            merged.append(wall)
+        out[axis] = [(p, half, sorted(spans)) for p, half, spans in merged]
+    return out['h'], out['v']
+
+
+def _coverage(spans, a, b):
+    # share of [a, b] covered by the (sorted) spans
+    if b <= a:
+        return 0.0
+    covered = 0.0
+    end = a
+    for s, e in spans:
+        s, e = max(s, end), min(e, b)
+        if e > s:
+            covered += e - s
+            end = e
+    return covered / (b - a)
+
+
+def find_rooms(lines, size, min_size=None, max_rooms=MAX_ROOMS):
+    """Rectangular rooms bounded by axis-aligned walls, as (x0, y0, x1, y1) inside the walls.
+
+    From every top wall and left wall, the right walls the top wall reaches
+    are tried nearest first: the first wall below that spans the box is its
+    bottom, and the room is taken once the right wall reaches down to it.
+    Each side must lie on its wall for at least ROOM_COVERAGE of its length.
+    """
+    w, h = size
+    tol = max(3.0, 0.005 * max(w, h))
+    if min_size is None:
+        min_size = max(8.0, MIN_ROOM_FRAC * max(w, h))
+    hwalls, vwalls = _axis_walls(lines, tol)
+    rooms = []
+    seen = set()
+    for top in hwalls:
+        for li, left in enumerate(vwalls):
+            if len(rooms) >= max_rooms:
+                return rooms
+            # the left wall has to start at the top wall
+            if _coverage(left[2], top[0], top[0] + min_size) < ROOM_COVERAGE:
+                continue
+            for right in vwalls[li + 1:]:
+                if right[0] - left[0] < min_size:
+                    continue
+                if _coverage(top[2], left[0], right[0]) < ROOM_COVERAGE:
+                    break
+                # the first wall below that spans the box closes it, if the right wall reaches down to it
+                closed = None
+                for bottom in hwalls:
+                    if bottom[0] - top[0] < min_size:
+                        continue
+                    if _coverage(left[2], top[0], bottom[0]) < ROOM_COVERAGE:
+                        break
+                    if _coverage(bottom[2], left[0], right[0]) >= ROOM_COVERAGE:
+                        closed = bottom
+                        break
+                if closed is None or _coverage(right[2], top[0], closed[0]) < ROOM_COVERAGE:
+                    continue
+                box = (left[0] + left[1], top[0] + top[1], right[0] - right[1], closed[0] - closed[1])
+                key = tuple(int(round(v / tol)) for v in box)
+                if key not in seen and box[2] > box[0] and box[3] > box[1]:
+                    seen.add(key)
+                    rooms.append(box)
+                break
+    return rooms
+
+
+def detect_array(gray):
+    """Proposals for a plan given as a 2-D uint8 gray array (rows = y).
+
+    Returns {'size': [w, h], 'lines': [[x1, y1, x2, y2], ...], 'rooms':
+    [[x0, y0, x1, y1], ...]} in the pixels of `gray`; lines run along the
+    centre of each wall, rooms lie inside the walls.
+    """
+    small, f = reduce_gray(np.asarray(gray, dtype=np.uint8))
+    lines = find_lines(ink_mask(small))
+    h, w = small.shape
+    # work pixel centres back to image pixels
+    scale = lambda v: (v + 0.5) * f
+    out_lines = []
+    for line in lines:
+        for t0, t1 in line['segments']:
+            (x1, y1), (x2, y2) = line_endpoints(line, t0, t1)
+            out_lines.append([scale(x1), scale(y1), scale(x2), scale(y2)])
+    out_rooms = [[scale(v) for v in box] for box in find_rooms(lines, (w, h))]
+    return {'size': [int(gray.shape[1]), int(gray.shape[0])], 'lines': out_lines, 'rooms': out_rooms}
+
+
+def gray_of_surface(surface):
+    """2-D uint8 luminance array (rows = y) of a pygame surface."""
+    g = pygame.transform.grayscale(surface)
+    return pygame.surfarray.array_red(g).T
+
+
+def detect_file(path, pixel_cache_folder=None):
+    """`detect_array` over an image file; meant to run in a worker process."""
+    surf = None
+    if pixel_cache_folder:
+        # a large plan that was opened before is mapped rather than decoded again
+        from pixel_cache import PixelCache
+        surf = PixelCache(pixel_cache_folder).load(path)
+    if surf is None:
+        surf = pygame.image.load(path)
+    return detect_array(gray_of_surface(surf))
+
+
+def cache_path(folder, key):
+    return os.path.join(folder, key.hex() + '.json')
+
+
+def load_cached(folder, key):
+    """Cached proposals for an image key, or None."""
+    try:
+        with open(cache_path(folder, key), 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+    except Exception:
+        return None
+    if data.get('version') != DETECT_VERSION:
+        return None
+    return data
+
+
+def store_cached(folder, key, result):
+    os.makedirs(folder, exist_ok=True)
+    path = cache_path(folder, key)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(dict(result, version=DETECT_VERSION), fh)
+    os.replace(tmp, path)
+
+
+class DetectJob(threading.Thread):
+    """Finds the walls and rooms of an image file off the UI thread.
+
+    A cached result (per `source_key` of the file) is posted right away;
+    otherwise `detect_file` runs in a separate Python process, so the
+    analysis never holds the UI's GIL, and the result is cached. Posts
+    DETECT_DONE; `cancel` kills the worker process and posts nothing.
+    """
+    event_type = DETECT_DONE
+
+    def __init__(self, path, cache_folder=None, pixel_cache_folder=None):
+        super().__init__(daemon=True)
+        self.path = path
+        self.cache_folder = cache_folder
+        self.pixel_cache_folder = pixel_cache_folder
+        self.job_id = next(_job_ids)
+        self._cancel = threading.Event()
+        self._proc = None
+
+    def cancel(self):
+        self._cancel.set()
+        proc = self._proc
+        if proc is not None:
+            try:
+                proc.kill()
+            except Exception:
+                pass
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def _post(self, **attrs):
+        if self.cancelled:
+            return
+        try:
+            pygame.event.post(pygame.event.Event(DETECT_DONE, job_id=self.job_id, path=self.path, **attrs))
+        except Exception:
+            pass
+
+    def _compute(self):
+        # `python detect.py IMAGE [PIXEL_CACHE]` prints the result as JSON
+        import subprocess
+        cmd = [sys.executable, os.path.abspath(__file__), self.path]
+        if self.pixel_cache_folder:
+            cmd.append(self.pixel_cache_folder)
+        env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1', SDL_VIDEODRIVER='dummy')
+        self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        if self.cancelled:
+            self._proc.kill()
+        out, err = self._proc.communicate()
+        code = self._proc.returncode
+        self._proc = None
+        if self.cancelled:
+            return None
+        if code != 0:
+            lines = err.decode('utf-8', 'replace').strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f"exit status {code}")
+        # the result is the last line, whatever else the worker printed
+        return json.loads(out.splitlines()[-1])
+
+    def run(self):
+        from pixel_cache import source_key
+        key = None
+        if self.cache_folder is not None:
+            try:
+                key = source_key(self.path)
+                cached = load_cached(self.cache_folder, key)
+            except Exception:
+                cached = None
+            if cached is not None:
+                self._post(result=cached, error=None, cached=True)
+                return
+        try:
+            result = self._compute()
+        except Exception as e:
+            self._post(result=None, error=e, cached=False)
+            return
+        if result is None:
+            return
+        self._post(result=result, error=None, cached=False)
+        if key is not None:
+            try:
+                store_cached(self.cache_folder, key, result)
+            except Exception as e:
+                print('Detection cache write failed:', e)
+
+
+if __name__ == '__main__':
+    print(json.dumps(detect_file(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)))
@@ -1,62 +1,50 @@
+import time
+# taken before the other imports, so --startup-profile can include them
+STARTUP_T0 = time.perf_counter()
 import math
 import sys
 import os
-import json
-import shutil
 import pygame
-import subprocess
 from objects.scale_line import ScaleLine
 from objects.measure_line import MeasureLine
 from objects.rectangle import Rectangle
-import tkinter as tk
-from tkinter import filedialog, simpledialog
+from image_loader import ImageLoadJob, IMAGE_PREVIEW, IMAGE_LOADED
+from pixel_cache import PixelCache
+from labels import LabelRenderer
+from grid import GridLayer
+from profiler import FrameProfiler
+from projects_root import get_projects_root
+from journal import SceneJournal, read_journal, apply_records, mark_active, clear_active, read_active, autosave_file, AUTOSAVE_FOLDER
+from scene import Scene
+from lod import draw_merged
+from history import History, AddObject, AddObjects, DeleteObject, MoveBy, MoveHandle, SetScale, SetWidth
+from invalidation import DirtyRegions, object_screen_rect, screen_rect_for_points, decoration_margin
+from coalesce import coalesce_events, ResizeDebounce
+from snapping import find_snap, draw_marker, marker_rect
 
 WINDOW_WIDTH = 1200
 WINDOW_HEIGHT = 800
 BG_COLOR = (30, 30, 30)
 SIDEBAR_COLOR = (40, 40, 40)
-GRID_COLOR = (0, 200, 200)
 SCALE_COLOR = (255, 100, 100)
+PROPOSAL_COLOR = (230, 60, 230)
 TEXT_COLOR = (230, 230, 230)
 SIDEBAR_WIDTH = 300
 TEXT_PADDING = 4
+POPUP_PAD = 8
+# the loading popup stays until the image arrives (or the load is cancelled)
+LOADING_POPUP_MS = 10 * 60 * 1000
+# events after which the whole window is redrawn
+FULL_REDRAW_EVENTS = (
+    pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP,
+    pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWSHOWN, pygame.WINDOWRESTORED,
+)
 
 
-def get_projects_root():
-    """Return the projects root folder.
-
-    Priority order:
-    - Environment variable `FLANER_PROJECTS` (if set)
-    - On Windows: `~/Documents/Flaner/projects` (user-accessible)
-    - On other OS: XDG_DATA_HOME or ~/.local/share/Flaner/projects
-    If creation fails, fall back to a `projects` folder in the current working dir.
-    """
-    try:
-        # allow overriding the location for portability/debugging
-        env = os.getenv('FLANER_PROJECTS')
-        if env:
-            root = env
-        elif os.name == 'nt':
-            # prefer Documents so the folder is easy to open in Explorer
-            docs = os.path.join(os.path.expanduser('~'), 'Documents')
-            root = os.path.join(docs, 'Flaner', 'projects')
-        else:
-            # use XDG data home or fallback to ~/.local/share
-            xdg = os.getenv('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
-            root = os.path.join(xdg, 'Flaner', 'projects')
-
-        os.makedirs(root, exist_ok=True)
-        return root
-    except Exception:
-        # final fallback to cwd/projects
-        fallback = os.path.join(os.getcwd(), 'projects')
-        try:
-            os.makedirs(fallback, exist_ok=True)
-        except Exception:
-            pass
-        return fallback
-
 def open_image_dialog():
+    # tkinter is slow to import and only needed for dialogs, so it is loaded on first use
+    import tkinter as tk
+    from tkinter import filedialog
     # create a temporary hidden tkinter root to own the dialog
     root = tk.Tk()
     root.withdraw()
@@ -79,6 +67,8 @@ def open_image_dialog():
 
 def ask_float(prompt, title="Input", initial=0.0):
     try:
+        import tkinter as tk
+        from tkinter import simpledialog
         root = tk.Tk()
         root.withdraw()
         val = simpledialog.askfloat(title, prompt, initialvalue=initial)
@@ -147,16 +137,36 @@ def draw_arrow_ends(surface, p1, p2, color, size=10, width=2):
     except Exception:
         pass
 
-def main():
-    pygame.init()
-    # pygame initialized
+def main(startup=None):
+    # startup: a StartupTimer when run with --startup-profile; main returns after the first frame
+    if startup is not None:
+        startup.mark('imports')
+    # only the subsystems flaner uses (pygame.init would also start audio, joysticks, ...)
+    pygame.display.init()
+    pygame.font.init()
+    if startup is not None:
+        startup.mark('pygame init')
     win_w, win_h = WINDOW_WIDTH, WINDOW_HEIGHT
     screen = pygame.display.set_mode((win_w, win_h), pygame.RESIZABLE)
     pygame.display.set_caption("Flaner — Flat planner")
     clock = pygame.time.Clock()
-    # display created
+    if startup is not None:
+        startup.mark('window')
     font = pygame.font.SysFont(None, 20)
     sidebar_font = pygame.font.SysFont(None, 24)
+    # label font is resolved once; finished label surfaces are cached across frames
+    try:
+        label_renderer = LabelRenderer()
+    except Exception:
+        label_renderer = LabelRenderer(font)
+    if startup is not None:
+        startup.mark('fonts')
+    # per-phase frame timings: F3 shows the HUD, F4 dumps; FLANER_PROFILE records from the start
+    profiler = FrameProfiler.from_env()
+    profile_from_env = profiler.enabled
+    show_hud = profiler.enabled
+    label_renderer.timed = profiler.enabled
+    objects_drawn = 0
 
     image = None
     original_image = None
@@ -190,65 +200,37 @@ def main():
     draw_start = (0, 0)
     draw_current = (0, 0)
     # object model
-    scale_object = None  # only one scale allowed
-    objects = []  # other drawable objects (MeasureLine instances etc.)
+    # scale line + other drawable objects, with a spatial index for hit testing
+    scene = Scene()
+    HIT_TOLERANCE = 8  # screen pixels
     selected_obj = None
     obj_dragging = False
     obj_drag_last = (0, 0)
     resize_mode = False
     resize_handle = None
     resize_anchor_screen = None
-    # undo/redo stacks store snapshots of (scale_object, objects)
-    import copy
-    undo_stack = []
-    redo_stack = []
-    UNDO_LIMIT = 100
-
-    def snapshot_state():
-        return (copy.deepcopy(scale_object), copy.deepcopy(objects))
-
-    def restore_snapshot(snap):
-        nonlocal scale_object, objects, pixels_per_meter, selected_obj
-        so, objs = snap
-        scale_object = copy.deepcopy(so)
-        objects = copy.deepcopy(objs)
-        # recompute derived value
-        try:
-            pixels_per_meter = scale_object.pixels_per_meter if scale_object else None
-        except Exception:
-            pixels_per_meter = None
-        selected_obj = None
-
-    def push_undo():
-        nonlocal undo_stack, redo_stack
-        try:
-            undo_stack.append(snapshot_state())
-            if len(undo_stack) > UNDO_LIMIT:
-                undo_stack.pop(0)
-            redo_stack.clear()
-        except Exception:
-            pass
+    # pointer snapping to object points, edges and the grid while drawing or resizing (N toggles, Alt bypasses)
+    snapping_enabled = True
+    snap_target = None
+    # undo/redo journal of small reversible commands, bounded by memory
+    history = History()
 
     def do_undo():
-        nonlocal undo_stack, redo_stack
+        nonlocal pixels_per_meter, selected_obj
         try:
-            if not undo_stack:
-                return
-            # push current to redo
-            redo_stack.append(snapshot_state())
-            snap = undo_stack.pop()
-            restore_snapshot(snap)
+            if history.undo(scene) is not None:
+                # recompute derived value
+                pixels_per_meter = scene.pixels_per_meter
+                selected_obj = None
         except Exception:
             pass
 
     def do_redo():
-        nonlocal undo_stack, redo_stack
+        nonlocal pixels_per_meter, selected_obj
         try:
-            if not redo_stack:
-                return
-            undo_stack.append(snapshot_state())
-            snap = redo_stack.pop()
-            restore_snapshot(snap)
+            if history.redo(scene) is not None:
+                pixels_per_meter = scene.pixels_per_meter
+                selected_obj = None
         except Exception:
             pass
 
@@ -260,53 +242,708 @@ def main():
     scale_points = []
     pixels_per_meter = None
     grid_spacing_m = 0.5  # default 50 cm
+    # grid rasterized once per zoom/spacing/offset and blitted on pans
+    grid_layer = GridLayer()
     # quicksave popup state (milliseconds since pygame start)
     quicksave_popup_until = 0
     quicksave_msg = ""
+    # background image decoding (see image_loader.ImageLoadJob); large plans are decoded once into the pixel cache
+    pixel_cache = PixelCache.for_root(get_projects_root())
+    load_job = None
+    load_done_msg = None
+    load_fitted = False
+    # wall/room detection: runs in a worker process, proposals are shown until accepted (Enter) or discarded (C)
+    detect_job = None
+    proposals = None  # {'lines': [[x1, y1, x2, y2], ...], 'rooms': [[x0, y0, x1, y1], ...]} in image pixels
+    proposal_view = 'all'  # which proposals Enter accepts: 'all', 'lines' or 'rooms' (Tab cycles)
+    # saves run on a background writer, started by the first save; completion comes back as PROJECT_SAVED
+    writer = None
+    # autosave: scene edits are appended to a journal next to autosave.json (FLANER_AUTOSAVE=0 turns it off)
+    autosave_enabled = os.getenv('FLANER_AUTOSAVE', '1') != '0'
+    project_dir = None  # folder of the open project; unsaved work is journaled in the autosave folder
+    journal = None
     
+    def popup_rect():
+        # screen area covered by the transient quicksave popup
+        tw, th = sidebar_font.size(quicksave_msg or 'Quicksaved')
+        pw = tw + POPUP_PAD * 2
+        ph = th + POPUP_PAD * 2
+        px = SIDEBAR_WIDTH + max(0, (win_w - SIDEBAR_WIDTH - pw) // 2)
+        return pygame.Rect(px, 8, pw, ph)
+
+    def mark_object(obj):
+        # invalidate everything the object and its selection overlay may cover
+        if obj is not None and image:
+            try:
+                dirty.mark(object_screen_rect(obj, image_rect, image_scale, image_scale * label_scale))
+            except Exception:
+                dirty.mark_all()
+
+    def mark_preview():
+        # invalidate the rubber-band preview (line/rect plus its live labels)
+        if drawing:
+            margin = decoration_margin(object_line_width, image_scale * label_scale)
+            dirty.mark(screen_rect_for_points(draw_start, draw_current, margin))
+
+    def set_snap(target):
+        nonlocal snap_target
+        if target == snap_target:
+            return
+        if snap_target is not None:
+            dirty.mark(marker_rect(snap_target))
+        snap_target = target
+        if target is not None:
+            dirty.mark(marker_rect(target))
+
+    def snap_point(mx, my, exclude=None):
+        # the screen point the pointer snaps to (unchanged when nothing is in reach)
+        target = None
+        if snapping_enabled and image and not (pygame.key.get_mods() & pygame.KMOD_ALT):
+            grid = (pixels_per_meter, grid_spacing_m, grid_offset_px) if grid_visible and pixels_per_meter else None
+            try:
+                target = find_snap(scene, mx, my, image_rect, image_scale, grid=grid, exclude=exclude)
+            except Exception:
+                target = None
+        set_snap(target)
+        return (target.sx, target.sy) if target is not None else (mx, my)
+
+    def show_popup(msg, duration_ms=2000):
+        nonlocal quicksave_msg, quicksave_popup_until
+        # old and new text may differ in width
+        dirty.mark(popup_rect())
+        quicksave_msg = msg
+        try:
+            quicksave_popup_until = pygame.time.get_ticks() + duration_ms
+        except Exception:
+            quicksave_popup_until = 0
+        dirty.mark(popup_rect())
+
+    def fit_image(size):
+        # reset zoom so an image of `size` (original pixels) fits the drawing area
+        nonlocal orig_w, orig_h, image_scale, user_zoomed, image_rect
+        orig_w, orig_h = size
+        area_w = max(1, win_w - SIDEBAR_WIDTH)
+        area_h = max(1, win_h)
+        image_scale = min(area_w / orig_w, area_h / orig_h, 1.0)
+        user_zoomed = False
+        new_w = max(1, int(orig_w * image_scale))
+        new_h = max(1, int(orig_h * image_scale))
+        image_rect = pygame.Rect(SIDEBAR_WIDTH, 0, new_w, new_h)
+
+    def begin_image_load(path, keep_current=False, done_msg=None):
+        # decode on a worker thread; IMAGE_PREVIEW / IMAGE_LOADED arrive as events
+        nonlocal load_job, load_done_msg, load_fitted, image, original_image, image_path
+        if load_job is not None:
+            load_job.cancel()
+        if not keep_current:
+            image = None
+            original_image = None
+            image_path = None
+        load_job = ImageLoadJob(path, cache=pixel_cache)
+        load_done_msg = done_msg
+        load_fitted = False
+        load_job.start()
+        show_popup(f"Loading {os.path.basename(path)}...", duration_ms=LOADING_POPUP_MS)
+
+    def start_detection():
+        nonlocal detect_job
+        if not image or not image_path:
+            return
+        if detect_job is not None:
+            show_popup("Still detecting walls...")
+            return
+        from detect import DetectJob, DETECT_FOLDER
+        detect_job = DetectJob(image_path, cache_folder=os.path.join(get_projects_root(), DETECT_FOLDER),
+                               pixel_cache_folder=pixel_cache.folder if pixel_cache is not None else None)
+        detect_job.start()
+        show_popup("Detecting walls...", duration_ms=LOADING_POPUP_MS)
+
+    def discard_proposals():
+        nonlocal detect_job, proposals
+        if detect_job is not None:
+            detect_job.cancel()
+            detect_job = None
+        if proposals is not None:
+            proposals = None
+            dirty.mark_all()
+
+    def shown_proposals():
+        # (lines, rooms) that Enter would add
+        if proposals is None:
+            return [], []
+        lines = proposals['lines'] if proposal_view in ('all', 'lines') else []
+        rooms = proposals['rooms'] if proposal_view in ('all', 'rooms') else []
+        return lines, rooms
+
+    def accept_proposals():
+        nonlocal proposals
+        lines, rooms = shown_proposals()
+        objs = []
+        for x1, y1, x2, y2 in lines:
+            dp = math.hypot(x2 - x1, y2 - y1)
+            meters = round(dp / pixels_per_meter, 2) if pixels_per_meter else None
+            objs.append(MeasureLine((x1, y1), (x2, y2), meters, width=object_line_width))
+        for x0, y0, x1, y1 in rooms:
+            objs.append(Rectangle((x0, y0), (x1, y1), width=object_line_width))
+        proposals = None
+        dirty.mark_all()
+        if objs:
+            scene.extend(objs)
+            history.record(AddObjects(objs))
+        show_popup(f"Added {len(objs)} detected objects")
+
+    def cancel_image_load():
+        nonlocal load_job
+        if load_job is not None:
+            load_job.cancel()
+            load_job = None
+            show_popup("Loading cancelled")
+
+    def grid_settings():
+        # the offset is in display pixels; offset_scale is the zoom it applies to (see batch_render.saved_grid)
+        return {'spacing_m': grid_spacing_m, 'offset_px': [grid_offset_px[0], grid_offset_px[1]], 'offset_scale': image_scale}
+
+    def save_writer():
+        nonlocal writer
+        if writer is None:
+            from project_writer import ProjectWriter
+            # FLANER_PROJECT_FORMAT=binary writes project.flnb instead of project.json
+            writer = ProjectWriter(binary=os.getenv('FLANER_PROJECT_FORMAT', 'json').lower() == 'binary')
+            writer.start()
+        return writer
+
+    def snapshot(proj_dir, message=None):
+        # explicit save (P, quicksave): the only writer of project.json
+        if journal is not None and journal.proj_dir == proj_dir:
+            # the save holds every journaled edit; the next edit starts a new session
+            close_journal()
+        save_writer().submit(proj_dir, image_path, scene.to_dicts(), message, {'grid': grid_settings()})
+
+    def autosave_snapshot():
+        # autosave.json next to the journal, covering the journal so far
+        extra = {'grid': grid_settings()}
+        extra.update(journal.snapshot_fields())
+        save_writer().submit(journal.proj_dir, image_path, scene.to_dicts(), None, extra,
+                      (journal.session, journal.seq), autosave=True)
+
+    def close_journal():
+        nonlocal journal
+        if journal is not None:
+            journal.close()
+            journal = None
+
+    def journal_append(records):
+        nonlocal journal
+        if not autosave_enabled or not image_path or not records:
+            return
+        try:
+            if journal is None:
+                # a new session starts from a full snapshot, which already holds this edit
+                d = project_dir or os.path.join(get_projects_root(), AUTOSAVE_FOLDER)
+                journal = SceneJournal(d)
+                mark_active(get_projects_root(), d)
+                autosave_snapshot()
+                return
+            journal.append(records)
+            if journal.needs_compaction():
+                autosave_snapshot()
+        except Exception as e:
+            print('Autosave failed:', e)
+
+    def journal_command(cmd, undone):
+        journal_append(cmd.journal(scene, undone))
+
+    history.listener = journal_command
+
+    # objects of a project being opened are added a few batches per frame
+    project_stream = None  # (folder, ProjectReader, batch iterator)
+    STREAM_BUDGET_S = 0.03
+
+    def load_project_dir(d, done_msg=None):
+        """Open a project folder: the image loads in the background and the objects stream in."""
+        nonlocal pixels_per_meter, selected_obj, project_dir, project_stream
+        from project_loader import ProjectReader, project_file
+        finish_project_stream()
+        # unsaved edits newer than the saved project are restored from their autosave
+        path = autosave_file(d) or project_file(d)
+        if path is None:
+            raise FileNotFoundError(f"no project file in {d}")
+        if path.endswith('.flnb'):
+            # binary projects are read as whole columns; nothing to stream
+            from project_binary import load_binary
+            header, scale_obj, objs, columns = load_binary(path)
+            reader = None
+        else:
+            reader = ProjectReader(path)
+            try:
+                header = reader.read_header()
+            except Exception:
+                reader.close()
+                raise
+        img_file = os.path.join(d, header.get('image') or '')
+        if os.path.isfile(img_file):
+            begin_image_load(img_file, done_msg=done_msg)
+        scene.replace(None, [])
+        pixels_per_meter = None
+        selected_obj = None
+        # history does not span loads; the next edit starts a new journal session here
+        history.clear()
+        close_journal()
+        project_dir = d
+        if reader is None:
+            scene.replace(scale_obj, objs, columns)
+            project_loaded(d, header)
+        else:
+            project_stream = (d, reader, reader.batches())
+
+    def step_project_stream(budget_s=None):
+        """Add streamed objects for up to `budget_s` seconds (None: until the end)."""
+        nonlocal project_stream, pixels_per_meter
+        if project_stream is None:
+            return
+        from project_loader import split_scale
+        d, reader, batches = project_stream
+        t_end = None if budget_s is None else time.perf_counter() + budget_s
+        try:
+            for batch in batches:
+                scale_obj, others = split_scale(batch)
+                if scale_obj is not None:
+                    scene.set_scale(scale_obj)
+                scene.extend(others)
+                pixels_per_meter = scene.pixels_per_meter
+                dirty.mark_all()
+                if t_end is not None and time.perf_counter() >= t_end:
+                    return
+        except Exception as e:
+            print("Failed to load project:", e)
+            reader.close()
+        project_stream = None
+        if reader.skipped:
+            print(f"Skipped {reader.skipped} objects in {d}: {reader.first_error}")
+            show_popup(f"Skipped {reader.skipped} unreadable objects ({reader.first_error})", duration_ms=6000)
+        project_loaded(d, reader.fields)
+
+    def project_loaded(d, fields):
+        """All objects of the project in `d` are in the scene: replay its journal."""
+        nonlocal pixels_per_meter, grid_spacing_m
+        from project_loader import object_from_dict
+        # edits made after the snapshot was written (e.g. before a crash)
+        records = read_journal(d, fields.get('journal_session'), fields.get('journal_seq', 0))
+        grid = apply_records(scene, records, object_from_dict, fields.get('grid'))
+        if grid.get('spacing_m'):
+            grid_spacing_m = float(grid['spacing_m'])
+        if grid.get('offset_px'):
+            grid_offset_px[0], grid_offset_px[1] = grid['offset_px'][:2]
+        pixels_per_meter = scene.pixels_per_meter
+        history.clear()
+        dirty.mark_all()
+
+    def finish_project_stream():
+        step_project_stream(None)
+
+    # `J` shows the projects of the projects root from an on-disk index (see project_index.py)
+    project_index = None
+    index_refresher = None
+    browser = None
+
+    def open_browser():
+        nonlocal project_index, index_refresher, browser
+        # the browser and its index are imported the first time they are needed
+        from project_index import ProjectIndex, IndexRefresher, THUMB_SIZE
+        from project_browser import ProjectBrowser
+        root = get_projects_root()
+        if project_index is None or project_index.root != root:
+            project_index = ProjectIndex(root)
+        browser = ProjectBrowser(project_index, font, sidebar_font, THUMB_SIZE)
+        # cached entries show at once; changed folders are re-read in the background
+        if index_refresher is None or not index_refresher.is_alive():
+            index_refresher = IndexRefresher(project_index)
+            index_refresher.start()
+        browser.busy = True
+        dirty.mark_all()
+
+    def close_browser():
+        nonlocal browser
+        browser = None
+        dirty.mark_all()
+
+    def pick_project_folder():
+        from tkinter import filedialog
+        try:
+            d = filedialog.askdirectory(title="Open project folder", initialdir=get_projects_root())
+        except Exception:
+            d = filedialog.askdirectory(title="Open project folder")
+        if d:
+            try:
+                load_project_dir(d)
+            except Exception as e:
+                print("Failed to load project:", e)
+
+    def render_scene():
+        nonlocal slider_rect, label_slider_rect, objects_drawn
+        profiler.mark()
+        if browser is not None:
+            # the browser covers the whole window; nothing under it needs drawing
+            browser.draw(screen, screen.get_rect())
+            profiler.lap('sidebar')
+            return
+        screen.fill(BG_COLOR)
+
+        # (sidebar drawn after image and grid)
+
+        # draw image (may overlap sidebar by design)
+        if image:
+            image.draw(screen, image_rect, image_scale, smooth=not resize_debounce.active)
+        profiler.lap('image')
+
+        # labels grow/shrink with zoom; the renderer caches them per scale bucket
+        text_scale = image_scale * label_scale
+
+        # draw scale/measurement objects over image (not while a project's image is still loading)
+        if image and scene.scale_object:
+            scene.scale_object.draw(screen, image_rect, image_scale, label_renderer, pixels_per_meter=pixels_per_meter, label_scale=text_scale)
+            objects_drawn += 1
+        # only objects that can touch the area being redrawn (culled in one array pass), each with
+        # as much detail as its size on screen warrants; the smallest are rasterized together
+        if image:
+            visible, merged = scene.visible_detail(image_rect, image_scale, screen.get_clip(), text_scale)
+            draw_merged(screen, *merged)
+            objects_drawn += len(visible) + len(merged[0])
+            for obj, detail in visible:
+                obj.draw(screen, image_rect, image_scale, label_renderer, pixels_per_meter=pixels_per_meter,
+                         label_scale=text_scale, detail=detail)
+
+        # draw selection highlight/handles
+        if selected_obj:
+            try:
+                HCOL = (255,220,80)
+                if isinstance(selected_obj, ScaleLine) or isinstance(selected_obj, MeasureLine):
+                    x1 = image_rect.x + int(selected_obj.p1[0] * image_scale)
+                    y1 = image_rect.y + int(selected_obj.p1[1] * image_scale)
+                    x2 = image_rect.x + int(selected_obj.p2[0] * image_scale)
+                    y2 = image_rect.y + int(selected_obj.p2[1] * image_scale)
+                    if obj_dragging:
+                        # draw the whole line in highlight color and draw arrows/caps depending on type
+                        pygame.draw.line(screen, HCOL, (x1, y1), (x2, y2), max(2, int(selected_obj.width) + 2))
+                        if isinstance(selected_obj, MeasureLine):
+                            draw_arrow_ends(screen, (x1, y1), (x2, y2), HCOL, size=max(6, int(selected_obj.width*3)), width=max(1, selected_obj.width))
+                        else:
+                            # scale line: show perpendicular caps
+                            draw_perp_cap(screen, (x1, y1), (x2, y2), HCOL, length=12, width=max(1, selected_obj.width))
+                    else:
+                        # selection not moving: show highlight and endpoint handles (small squares)
+                        pygame.draw.line(screen, HCOL, (x1, y1), (x2, y2), max(2, int(selected_obj.width) + 2))
+                        pygame.draw.rect(screen, HCOL, (x1-4, y1-4, 8, 8))
+                        pygame.draw.rect(screen, HCOL, (x2-4, y2-4, 8, 8))
+                elif isinstance(selected_obj, Rectangle):
+                    rx = image_rect.x + int(min(selected_obj.p1[0], selected_obj.p2[0]) * image_scale)
+                    ry = image_rect.y + int(min(selected_obj.p1[1], selected_obj.p2[1]) * image_scale)
+                    rw = int(abs(selected_obj.p2[0] - selected_obj.p1[0]) * image_scale)
+                    rh = int(abs(selected_obj.p2[1] - selected_obj.p1[1]) * image_scale)
+                    pygame.draw.rect(screen, HCOL, (rx, ry, rw, rh), max(2, selected_obj.width + 1))
+                    # corner handles
+                    for cx, cy in ((rx, ry), (rx+rw, ry), (rx, ry+rh), (rx+rw, ry+rh)):
+                        pygame.draw.rect(screen, HCOL, (cx-4, cy-4, 8, 8))
+            except Exception:
+                pass
+
+        # detected walls and rooms waiting to be accepted
+        if proposals is not None:
+            lines, rooms = shown_proposals()
+            ox, oy = image_rect.x, image_rect.y
+            for x1, y1, x2, y2 in lines:
+                pygame.draw.line(screen, PROPOSAL_COLOR, (ox + x1 * image_scale, oy + y1 * image_scale),
+                                 (ox + x2 * image_scale, oy + y2 * image_scale), 2)
+            for x0, y0, x1, y1 in rooms:
+                pygame.draw.rect(screen, PROPOSAL_COLOR, (ox + x0 * image_scale, oy + y0 * image_scale,
+                                                          (x1 - x0) * image_scale, (y1 - y0) * image_scale), 1)
+
+        # draw preview while dragging to add scale/measure/rect
+        if drawing and mode in ('setting_scale', 'add_measure', 'add_rect'):
+            sx1, sy1 = draw_start
+            sx2, sy2 = draw_current
+            # anti-aliased preview line/rect
+            try:
+                if mode == 'add_rect':
+                    rx = min(sx1, sx2)
+                    ry = min(sy1, sy2)
+                    rw = abs(sx2 - sx1)
+                    rh = abs(sy2 - sy1)
+                    pygame.draw.rect(screen, (255, 150, 50), (rx, ry, rw, rh), 2)
+                else:
+                    pygame.draw.aaline(screen, (255, 150, 50), (sx1, sy1), (sx2, sy2))
+            except Exception:
+                if mode == 'add_rect':
+                    pygame.draw.rect(screen, (255, 150, 50), (min(sx1, sx2), min(sy1, sy2), abs(sx2 - sx1), abs(sy2 - sy1)), 2)
+                else:
+                    pygame.draw.line(screen, (255, 150, 50), (sx1, sy1), (sx2, sy2), 1)
+            # preview caps/arrows instead of end dots
+            if mode == 'setting_scale':
+                draw_perp_cap(screen, (sx1, sy1), (sx2, sy2), (255, 150, 50), length=8, width=3)
+            elif mode == 'add_measure':
+                draw_arrow_ends(screen, (sx1, sy1), (sx2, sy2), (255, 150, 50), size=8, width=2)
+                # show live measurement during preview
+                # compute original-image pixel distance
+                ox1 = (sx1 - image_rect.x) / image_scale
+                oy1 = (sy1 - image_rect.y) / image_scale
+                ox2 = (sx2 - image_rect.x) / image_scale
+                oy2 = (sy2 - image_rect.y) / image_scale
+                dp = math.hypot(ox2 - ox1, oy2 - oy1)
+                if pixels_per_meter:
+                    meters = dp / pixels_per_meter
+                else:
+                    meters = None
+                if meters is not None:
+                    txt = f"{meters:.2f} m"
+                else:
+                    txt = f"{int(round(dp))} px"
+                try:
+                    shadow, img = label_renderer.render(txt, text_scale)
+                    midx = (sx1 + sx2)//2
+                    midy = (sy1 + sy2)//2
+                    screen.blit(shadow, (midx - shadow.get_width()//2 + 1, midy - shadow.get_height()//2 + 1))
+                    screen.blit(img, (midx - img.get_width()//2, midy - img.get_height()//2))
+                except Exception:
+                    pass
+            elif mode == 'add_rect':
+                # show live rectangle dimensions in meters if scale known. Use original-image coords
+                ox1 = (sx1 - image_rect.x) / image_scale
+                oy1 = (sy1 - image_rect.y) / image_scale
+                ox2 = (sx2 - image_rect.x) / image_scale
+                oy2 = (sy2 - image_rect.y) / image_scale
+                disp_w = abs(sx2 - sx1)
+                disp_h = abs(sy2 - sy1)
+                rect_orig_w = abs(ox2 - ox1)
+                rect_orig_h = abs(oy2 - oy1)
+                # prefer meters if scale known, otherwise show pixels
+                if pixels_per_meter:
+                    wtxt = f"{(rect_orig_w / pixels_per_meter):.2f} m"
+                    htxt = f"{(rect_orig_h / pixels_per_meter):.2f} m"
+                else:
+                    wtxt = f"{int(round(rect_orig_w))} px"
+                    htxt = f"{int(round(rect_orig_h))} px"
+                try:
+                    # scaled rendering for width label
+                    wshadow, wimg = label_renderer.render(wtxt, text_scale)
+                    tx = min(sx1, sx2) + disp_w//2
+                    ty = min(sy1, sy2) - max(14, label_renderer.get_linesize())
+                    screen.blit(wshadow, (tx - wshadow.get_width()//2 + 1, ty + 1))
+                    screen.blit(wimg, (tx - wimg.get_width()//2, ty))
+
+                    # scaled rendering for height label
+                    hshadow, himg = label_renderer.render(htxt, text_scale)
+                    lx = min(sx1, sx2) - max(34, label_renderer.get_linesize() + 6)
+                    ly = min(sy1, sy2) + disp_h//2
+                    screen.blit(hshadow, (lx + 1, ly - hshadow.get_height()//2 + 1))
+                    screen.blit(himg, (lx, ly - himg.get_height()//2))
+                except Exception:
+                    pass
+
+        profiler.lap('objects')
+
+        # draw grid (aligned to image)
+        if image and pixels_per_meter and grid_visible:
+            grid_layer.draw(screen, image_rect, image_scale, pixels_per_meter, grid_spacing_m, grid_offset_px, min_x=SIDEBAR_WIDTH + 2)
+        profiler.lap('grid')
+
+        # snap marker over the grid, only while a point is being placed
+        if snap_target is not None and (drawing or resize_mode or mode in ('setting_scale', 'add_measure', 'add_rect')):
+            draw_marker(screen, snap_target)
+
+            # draw scale preview (if in setting mode and one point clicked)
+            # (hint will be drawn after the sidebar to ensure visibility)
+
+        # draw sidebar on top so it never gets overlapped
+        sidebar_rect = pygame.Rect(0, 0, SIDEBAR_WIDTH, win_h)
+        pygame.draw.rect(screen, SIDEBAR_COLOR, sidebar_rect)
+        controls = (
+            "Controls:\n"
+            "O: Open image\n"
+            "S: Set scale (drag line)\n"
+            "L: Add measurement (drag line)\n"
+            "D: Add rectangle (drag)\n"
+            "Q: Quicksave current project\n"
+            "Hold Shift: snap H/V\n"
+            "N: Toggle snapping (Alt: off)\n"
+            "A: Detect walls (Enter: accept)\n"
+            "G: Grid spacing (cm)\n"
+            "V: Toggle grid\n"
+            "C: Cancel current operation\n"
+            "P: Save project | J: Load project\n"
+            "K: Open projects folder\n"
+            "Delete: Delete selected object\n"
+            "Ctrl+Z / Ctrl+Y: Undo / Redo\n"
+            "Esc: Quit\n"
+        )
+        # draw current mode and controls with padding
+        mode_name = "Normal"
+        if mode == 'setting_scale':
+            mode_name = "Adding scale"
+        elif mode == 'add_measure':
+            mode_name = "Adding line"
+        elif mode == 'add_rect':
+            mode_name = "Adding rectangle"
+        base_y = 10
+        draw_text(screen, f"Mode: {mode_name}", (10, base_y), sidebar_font)
+        draw_text(screen, controls, (10, base_y + 30 + TEXT_PADDING), sidebar_font)
+        # place cancel button below controls to avoid overlap
+        controls_lines = controls.count('\n') + 1
+        controls_height = controls_lines * sidebar_font.get_linesize()
+        cancel_y = base_y + 30 + TEXT_PADDING + controls_height + 8
+        if mode in ('setting_scale', 'add_measure', 'add_rect'):
+            cancel_rect = pygame.Rect(10, cancel_y, SIDEBAR_WIDTH - 20, 30)
+            pygame.draw.rect(screen, (100, 40, 40), cancel_rect)
+            draw_text(screen, "Cancel (C)", (cancel_rect.x + 8, cancel_rect.y + 6), sidebar_font, color=(220,220,220))
+        else:
+            # place hint below the controls block to avoid overlap
+            hint_y = cancel_y
+            draw_text(screen, "Drag inside image to pan.", (10, hint_y), sidebar_font)
+
+        # draw current scale indicator in sidebar (below controls)
+        scale_y = cancel_y + 44
+        if pixels_per_meter:
+            px_len = pixels_per_meter * image_scale * 1.0
+            # cap the drawn length so it doesn't overflow the sidebar
+            max_len = max(0, SIDEBAR_WIDTH - 20)
+            draw_len = min(int(px_len), max_len)
+            sx = 10
+            sy = scale_y
+            draw_text(screen, f"1.0 m = {px_len:.1f} px", (sx, sy), sidebar_font)
+            draw_text(screen, f"Grid spacing: {grid_spacing_m*100:.0f} cm", (sx, sy + 30), sidebar_font)
+
+        # draw line-width slider
+        slider_y = scale_y + 70
+        slider_x = 10
+        slider_w = SIDEBAR_WIDTH - 20
+        slider_h = 18
+        slider_rect = pygame.Rect(slider_x, slider_y, slider_w, slider_h)
+        # track
+        pygame.draw.rect(screen, (70,70,70), slider_rect)
+        # knob position
+        rel = (object_line_width - SLIDER_MIN) / float(SLIDER_MAX - SLIDER_MIN)
+        knob_x = slider_x + int(rel * (slider_w - 10))
+        knob_rect = pygame.Rect(knob_x, slider_y - 4, 10, slider_h + 8)
+        pygame.draw.rect(screen, (200,200,200), knob_rect)
+        draw_text(screen, f"Line width: {object_line_width}", (slider_x, slider_y - 22), sidebar_font)
+        # label-size slider below line-width
+        label_slider_y = slider_y + slider_h + 34
+        label_slider_x = slider_x
+        label_slider_w = slider_w
+        label_slider_h = slider_h
+        label_slider_rect = pygame.Rect(label_slider_x, label_slider_y, label_slider_w, label_slider_h)
+        pygame.draw.rect(screen, (70,70,70), label_slider_rect)
+        # knob for label scale
+        lrel = (label_scale - LABEL_SCALE_MIN) / float(LABEL_SCALE_MAX - LABEL_SCALE_MIN)
+        lknob_x = label_slider_x + int(lrel * (label_slider_w - 10))
+        lknob_rect = pygame.Rect(lknob_x, label_slider_y - 4, 10, label_slider_h + 8)
+        pygame.draw.rect(screen, (200,200,200), lknob_rect)
+        draw_text(screen, f"Label scale: {label_scale:.2f}x", (label_slider_x, label_slider_y - 22), sidebar_font)
+        # hint to open projects folder
+        draw_text(screen, "K: Open projects folder", (slider_x, label_slider_y + label_slider_h + 8), sidebar_font)
+
+        # draw drag hint after sidebar so it is not overlapped by the image
+        if mode == 'setting_scale' and drawing:
+            draw_text(screen, "Drag and release to set scale; hold Shift to snap", (SIDEBAR_WIDTH + 10, win_h - 50), font)
+        # transient quicksave popup (top center of image area)
+        try:
+            now = pygame.time.get_ticks()
+        except Exception:
+            now = 0
+        if quicksave_popup_until and now and now < quicksave_popup_until:
+            try:
+                popup_txt = quicksave_msg or 'Quicksaved'
+                popup_img = sidebar_font.render(popup_txt, True, (255,255,255))
+                popup = popup_rect()
+                pygame.draw.rect(screen, (30,30,30), popup)
+                screen.blit(popup_img, (popup.x + POPUP_PAD, popup.y + POPUP_PAD))
+            except Exception:
+                pass
+        profiler.lap('sidebar')
+
     frame_count = 0
+    # only regions marked dirty are redrawn; with nothing dirty the loop sleeps in event.wait
+    dirty = DirtyRegions((win_w, win_h))
+    # while the window is being resized the image is scaled cheaply; the smooth resample follows once it stops
+    resize_debounce = ResizeDebounce()
+    # reopen the work of a session that did not shut down cleanly
+    if autosave_enabled:
+        crashed_dir = read_active(get_projects_root())
+        if crashed_dir:
+            try:
+                load_project_dir(crashed_dir, done_msg="Restored unsaved work")
+            except Exception as e:
+                print('Failed to restore autosave:', e)
+    if startup is not None:
+        startup.mark('setup')
     while running:
-        # poll events
-        for event in pygame.event.get():
+        # block until an event arrives, waking up in time to hide the quicksave popup
+        timeout = 0
+        if quicksave_popup_until:
+            timeout = max(1, quicksave_popup_until - pygame.time.get_ticks())
+        if resize_debounce.active:
+            settle = resize_debounce.timeout(pygame.time.get_ticks())
+            timeout = min(timeout, settle) if timeout else settle
+        if project_stream is not None:
+            # keep streaming objects in between events
+            timeout = 1
+        # queued motion collapses to the latest position and resizes to the last size
+        events = coalesce_events([pygame.event.wait(timeout)] + pygame.event.get())
+        profiler.begin_frame()
+        step_project_stream(STREAM_BUDGET_S)
+        for event in events:
+            # edits and commands apply to the whole project, not a half-loaded one
+            if project_stream is not None and event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                finish_project_stream()
+            # discrete input can change anything on screen; motion marks its own regions below
+            if event.type in FULL_REDRAW_EVENTS:
+                dirty.mark_all()
+            if browser is not None and event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP,
+                                                      pygame.MOUSEWHEEL, pygame.MOUSEMOTION):
+                # the browser covers the window and takes all input while open
+                action = browser.handle(event) if event.type != pygame.MOUSEMOTION else None
+                if event.type != pygame.MOUSEMOTION:
+                    dirty.mark_all()
+                if action is not None:
+                    kind, d = action
+                    close_browser()
+                    if kind == 'open':
+                        try:
+                            load_project_dir(d)
+                        except Exception as e:
+                            print("Failed to load project:", e)
+                            show_popup(f"Failed to load {os.path.basename(d)}")
+                    elif kind == 'folder':
+                        pick_project_folder()
+                continue
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.VIDEORESIZE:
                 win_w, win_h = event.w, event.h
                 screen = pygame.display.set_mode((win_w, win_h), pygame.RESIZABLE)
+                dirty.resize((win_w, win_h))
+                resize_debounce.resized(pygame.time.get_ticks())
                 # rescale the image to fit the new area (if present)
-                if original_image:
-                    orig_w, orig_h = original_image.get_size()
+                if image:
+                    orig_w, orig_h = image.get_size()
                     area_w = max(1, win_w - SIDEBAR_WIDTH)
                     area_h = max(1, win_h)
                     if not user_zoomed:
                         image_scale = min(area_w / orig_w, area_h / orig_h, 1.0)
                     new_w = max(1, int(orig_w * image_scale))
                     new_h = max(1, int(orig_h * image_scale))
-                    image = pygame.transform.smoothscale(original_image, (new_w, new_h))
                     image_rect = pygame.Rect(SIDEBAR_WIDTH, 0, new_w, new_h)
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
                 elif event.key == pygame.K_o:
+                    from tkinter import filedialog
                     path = filedialog.askopenfilename(
                         title="Open image",
                         filetypes=[("Image files", "*.png *.jpg *.jpeg *.bmp *.gif"), ("All files", "*")]
                     )
                     if path:
-                        try:
-                            original_image = pygame.image.load(path).convert_alpha()
-                            image_path = path
-                            orig_w, orig_h = original_image.get_size()
-                            area_w = max(1, win_w - SIDEBAR_WIDTH)
-                            area_h = max(1, win_h)
-                            image_scale = min(area_w / orig_w, area_h / orig_h, 1.0)
-                            user_zoomed = False
-                            new_w = max(1, int(orig_w * image_scale))
-                            new_h = max(1, int(orig_h * image_scale))
-                            image = pygame.transform.smoothscale(original_image, (new_w, new_h))
-                            image_rect = pygame.Rect(SIDEBAR_WIDTH, 0, new_w, new_h)
-                        except Exception as e:
-                            print("Failed to load image:", e)
+                        # decoded in the background; the current image stays until the new one arrives
+                        begin_image_load(path, keep_current=True)
                 elif event.key == pygame.K_s:
                     if image:
                         mode = 'setting_scale'
@@ -329,6 +966,13 @@ def main():
                         mode = 'add_rect'
                         scale_points = []
                 elif event.key == pygame.K_c:
+                    # cancel a pending image load
+                    if load_job is not None:
+                        cancel_image_load()
+                    # drop detection proposals (or a detection still running)
+                    if detect_job is not None or proposals is not None:
+                        discard_proposals()
+                        show_popup("Detection discarded")
                     # cancel drawing mode
                     if mode in ('setting_scale', 'add_measure', 'add_rect'):
                         mode = 'normal'
@@ -337,184 +981,80 @@ def main():
                 elif event.key == pygame.K_p:
                     # save project to per-user projects folder
                     if original_image and image_path:
+                        from tkinter import simpledialog
                         name = simpledialog.askstring("Save project", "Project name:")
                         if name:
-                            root_projects = get_projects_root()
-                            proj_dir = os.path.join(root_projects, name)
-                            os.makedirs(proj_dir, exist_ok=True)
-                            img_name = os.path.basename(image_path)
-                            dst_img = os.path.join(proj_dir, img_name)
-                            try:
-                                shutil.copy(image_path, dst_img)
-                            except Exception as e:
-                                print("Failed to copy image:", e)
-                            j = {"image": img_name, "objects": []}
-                            if scale_object:
-                                j["objects"].append(scale_object.to_dict())
-                            for o in objects:
-                                j["objects"].append(o.to_dict())
-                            with open(os.path.join(proj_dir, "project.json"), "w", encoding="utf-8") as fh:
-                                json.dump(j, fh, indent=2)
+                            proj_dir = os.path.join(get_projects_root(), name)
+                            if proj_dir != project_dir:
+                                # autosave follows the project to its new folder
+                                close_journal()
+                                project_dir = proj_dir
+                            snapshot(proj_dir, f"Saved project to {proj_dir}")
                 elif event.key == pygame.K_q:
                     # Quicksave OR quickload: if nothing is open (no image, no scale, no objects), try to load quicksave.
                     try:
                         root_projects = get_projects_root()
                         quick_dir = os.path.join(root_projects, 'quicksave')
-                        pj = os.path.join(quick_dir, 'project.json')
-                        if (not original_image) and (scale_object is None) and (len(objects) == 0):
+                        if load_job is None and (not original_image) and scene.is_empty():
                             # attempt to load quicksave
-                            if os.path.exists(pj):
+                            from project_loader import project_file
+                            if project_file(quick_dir):
                                 try:
-                                    with open(pj, 'r', encoding='utf-8') as fh:
-                                        data = json.load(fh)
-                                    img_file = os.path.join(quick_dir, data.get('image'))
-                                    if os.path.exists(img_file):
-                                        image_path = img_file
-                                        original_image = pygame.image.load(img_file).convert_alpha()
-                                        orig_w, orig_h = original_image.get_size()
-                                        area_w = max(1, win_w - SIDEBAR_WIDTH)
-                                        area_h = max(1, win_h)
-                                        image_scale = min(area_w / orig_w, area_h / orig_h, 1.0)
-                                        user_zoomed = False
-                                        new_w = max(1, int(orig_w * image_scale))
-                                        new_h = max(1, int(orig_h * image_scale))
-                                        image = pygame.transform.smoothscale(original_image, (new_w, new_h))
-                                        image_rect = pygame.Rect(SIDEBAR_WIDTH, 0, new_w, new_h)
-                                    # rebuild objects
-                                    scale_object = None
-                                    objects = []
-                                    for it in data.get('objects', []):
-                                        if it.get('type') == 'scale':
-                                            p1 = tuple(it.get('p1'))
-                                            p2 = tuple(it.get('p2'))
-                                            m = it.get('meters')
-                                            w = int(it.get('width', object_line_width))
-                                            scale_object = ScaleLine(p1, p2, m, width=w)
-                                            pixels_per_meter = scale_object.pixels_per_meter
-                                        elif it.get('type') == 'measure':
-                                            p1 = tuple(it.get('p1'))
-                                            p2 = tuple(it.get('p2'))
-                                            m = it.get('meters')
-                                            w = int(it.get('width', object_line_width))
-                                            objects.append(MeasureLine(p1, p2, m, width=w))
-                                        elif it.get('type') == 'rect':
-                                            try:
-                                                objects.append(Rectangle.from_dict(it))
-                                            except Exception:
-                                                pass
-                                    # clear and seed undo/redo
-                                    try:
-                                        undo_stack.clear()
-                                        redo_stack.clear()
-                                        push_undo()
-                                    except Exception:
-                                        pass
-                                    quicksave_msg = f"Loaded quicksave from {quick_dir}"
-                                    try:
-                                        quicksave_popup_until = pygame.time.get_ticks() + 2000
-                                    except Exception:
-                                        quicksave_popup_until = 0
+                                    load_project_dir(quick_dir, done_msg=f"Loaded quicksave from {quick_dir}")
+                                    if load_job is None:
+                                        show_popup(f"Loaded quicksave from {quick_dir}")
                                 except Exception as e_l:
                                     print('Failed to load quicksave project:', e_l)
                             else:
-                                print('No quicksave found at', pj)
-                        else:
-                            # perform quicksave
-                            if original_image and image_path:
-                                try:
-                                    os.makedirs(quick_dir, exist_ok=True)
-                                    img_name = os.path.basename(image_path)
-                                    dst_img = os.path.join(quick_dir, img_name)
-                                    try:
-                                        src_ab = os.path.abspath(image_path)
-                                        dst_ab = os.path.abspath(dst_img)
-                                        if src_ab.lower() != dst_ab.lower():
-                                            shutil.copy(image_path, dst_img)
-                                    except Exception as e_copy:
-                                        print('Quicksave: failed to copy image:', e_copy)
-                                    j = {'image': img_name, 'objects': []}
-                                    if scale_object:
-                                        j['objects'].append(scale_object.to_dict())
-                                    for o in objects:
-                                        j['objects'].append(o.to_dict())
-                                    with open(os.path.join(quick_dir, 'project.json'), 'w', encoding='utf-8') as fh:
-                                        json.dump(j, fh, indent=2)
-                                    quicksave_msg = f"Quicksaved to {quick_dir}"
-                                    try:
-                                        quicksave_popup_until = pygame.time.get_ticks() + 2000
-                                    except Exception:
-                                        quicksave_popup_until = 0
-                                except Exception as e_qs:
-                                    print('Quicksave failed:', e_qs)
-                    except Exception as e_q:
-                        print('Quicksave handling failed:', e_q)
-                elif event.key == pygame.K_j:
-                    # load project folder (default to per-user projects folder)
-                    try:
-                        d = filedialog.askdirectory(title="Open project folder", initialdir=get_projects_root())
-                    except Exception:
-                        d = filedialog.askdirectory(title="Open project folder")
-                    if d:
-                        pj = os.path.join(d, "project.json")
-                        try:
-                            with open(pj, "r", encoding="utf-8") as fh:
-                                data = json.load(fh)
-                            img_file = os.path.join(d, data.get("image"))
-                            if os.path.exists(img_file):
-                                image_path = img_file
-                                original_image = pygame.image.load(img_file).convert_alpha()
-                                orig_w, orig_h = original_image.get_size()
-                                area_w = max(1, win_w - SIDEBAR_WIDTH)
-                                area_h = max(1, win_h)
-                                image_scale = min(area_w / orig_w, area_h / orig_h, 1.0)
-                                user_zoomed = False
-                                new_w = max(1, int(orig_w * image_scale))
-                                new_h = max(1, int(orig_h * image_scale))
-                                image = pygame.transform.smoothscale(original_image, (new_w, new_h))
-                                image_rect = pygame.Rect(SIDEBAR_WIDTH, 0, new_w, new_h)
-                            # rebuild objects
-                            scale_object = None
-                            objects = []
-                            for it in data.get("objects", []):
-                                if it.get("type") == "scale":
-                                    p1 = tuple(it.get("p1"))
-                                    p2 = tuple(it.get("p2"))
-                                    m = it.get("meters")
-                                    w = int(it.get('width', object_line_width))
-                                    scale_object = ScaleLine(p1, p2, m, width=w)
-                                    pixels_per_meter = scale_object.pixels_per_meter
-                                elif it.get("type") == "measure":
-                                    p1 = tuple(it.get("p1"))
-                                    p2 = tuple(it.get("p2"))
-                                    m = it.get("meters")
-                                    w = int(it.get('width', object_line_width))
-                                    objects.append(MeasureLine(p1, p2, m, width=w))
-                                elif it.get("type") == "rect":
-                                    try:
-                                        objects.append(Rectangle.from_dict(it))
-                                    except Exception:
-                                        pass
-                            # clear undo/redo history on load
-                            try:
-                                undo_stack.clear()
-                                redo_stack.clear()
-                                push_undo()
-                            except Exception:
-                                pass
-                        except Exception as e:
-                            print("Failed to load project:", e)
+                                print('No quicksave found at', quick_dir)
+                        else:
+                            # perform quicksave
+                            if original_image and image_path:
+                                # the image is only copied when it changed; the popup shows when the write is done
+                                snapshot(quick_dir, f"Quicksaved to {quick_dir}")
+                    except Exception as e_q:
+                        print('Quicksave handling failed:', e_q)
+                elif event.key == pygame.K_j:
+                    # browse the projects folder
+                    open_browser()
                 elif event.key == pygame.K_g:
                     val = ask_float("Enter grid spacing in centimeters:", "Grid spacing", initial=50.0)
                     if val and val > 0:
                         grid_spacing_m = val / 100.0
+                        journal_append([dict(op='grid', **grid_settings())])
                 elif event.key == pygame.K_v:
                     grid_visible = not grid_visible
+                elif event.key == pygame.K_a:
+                    start_detection()
+                elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER) and proposals is not None:
+                    accept_proposals()
+                elif event.key == pygame.K_TAB and proposals is not None:
+                    proposal_view = {'all': 'lines', 'lines': 'rooms', 'rooms': 'all'}[proposal_view]
+                    lines, rooms = shown_proposals()
+                    show_popup(f"Enter adds {len(lines)} lines and {len(rooms)} rooms")
+                elif event.key == pygame.K_n:
+                    snapping_enabled = not snapping_enabled
+                    set_snap(None)
+                    show_popup("Snapping on" if snapping_enabled else "Snapping off")
+                elif event.key == pygame.K_F3:
+                    show_hud = not show_hud
+                    profiler.enabled = show_hud or profile_from_env
+                    label_renderer.timed = profiler.enabled
+                elif event.key == pygame.K_F4:
+                    if profiler.frames:
+                        try:
+                            show_popup(f"Profile saved to {profiler.dump()}")
+                        except Exception as e:
+                            show_popup(f"Profile dump failed: {e}")
                 elif event.key == pygame.K_r:
+                    if scene.scale_object is not None:
+                        history.record(SetScale(scene.set_scale(None), None))
                     pixels_per_meter = None
-                    scale_object = None
                     scale_points = []
                 elif event.key == pygame.K_k:
                     # open the projects folder in the system file browser
+                    import subprocess
+                    import tkinter as tk
                     try:
                         proj_root = get_projects_root()
                         # ensure folder exists (get_projects_root should have created it,
@@ -604,13 +1144,13 @@ def main():
                 elif event.key in (pygame.K_DELETE, pygame.K_BACKSPACE):
                     # delete selected object
                     if selected_obj:
-                        push_undo()
                         try:
-                            if selected_obj is scale_object:
-                                scale_object = None
+                            if selected_obj is scene.scale_object:
+                                history.record(SetScale(scene.set_scale(None), None))
                                 pixels_per_meter = None
                             else:
-                                objects.remove(selected_obj)
+                                pos = scene.remove(selected_obj)
+                                history.record(DeleteObject(selected_obj, pos))
                         except Exception:
                             pass
                         selected_obj = None
@@ -629,6 +1169,7 @@ def main():
                         # slider click handling (line width and label size sliders)
                         if slider_rect and slider_rect.collidepoint((sx, sy)):
                             slider_dragging = True
+                            history.begin_gesture()
                             continue
                         if label_slider_rect and label_slider_rect.collidepoint((sx, sy)):
                             label_slider_dragging = True
@@ -636,26 +1177,11 @@ def main():
                 if event.button == 1 and image and mode == 'normal':
                     mx, my = event.pos
                     if image_rect.inflate(2,2).collidepoint(mx, my):
-                        # first check for object selection (top-most first)
-                        found = None
-                        # check scale object
-                        try:
-                            if scale_object and scale_object.hit_test(mx, my, image_rect, image_scale):
-                                found = scale_object
-                        except Exception:
-                            found = None
-                        # check other objects (reverse order so top-most selected)
-                        if not found:
-                            for o in reversed(objects):
-                                try:
-                                    if hasattr(o, 'hit_test') and o.hit_test(mx, my, image_rect, image_scale):
-                                        found = o
-                                        break
-                                except Exception:
-                                    continue
+                        # first check for object selection (scale line, then top-most object)
+                        found = scene.hit_test(mx, my, image_rect, image_scale, tol=HIT_TOLERANCE)
                         if found:
-                            # record current state for undo before any mutation
-                            push_undo()
+                            # moves/resizes until mouse-up merge into one undo entry
+                            history.begin_gesture()
                             # check if user clicked a handle first
                             handle_idx = None
                             try:
@@ -722,11 +1248,9 @@ def main():
                 if event.button == 1 and image and mode in ('setting_scale', 'add_measure', 'add_rect'):
                     mx, my = event.pos
                     if image_rect.inflate(2,2).collidepoint(mx, my):
-                        # push undo before starting a new drawn object
-                        push_undo()
                         drawing = True
-                        draw_start = (mx, my)
-                        draw_current = (mx, my)
+                        draw_start = snap_point(mx, my)
+                        draw_current = draw_start
             elif event.type == pygame.MOUSEBUTTONUP:
                 if event.button == 1:
                     # finish panning
@@ -738,6 +1262,7 @@ def main():
                     if resize_mode:
                         resize_mode = False
                         resize_handle = None
+                        set_snap(None)
                     # finish drawing (scale or measure)
                     if 'drawing' in locals() and drawing and image and mode in ('setting_scale', 'add_measure', 'add_rect'):
                         sx1, sy1 = draw_start
@@ -761,12 +1286,14 @@ def main():
                                 # ask for real-world distance for scale
                                 val = ask_float("Enter real-world distance between the two points (meters):", "Set scale", initial=1.0)
                                 if val and val > 0:
-                                    scale_object = ScaleLine((ox1, oy1), (ox2, oy2), val, width=object_line_width)
-                                    pixels_per_meter = scale_object.pixels_per_meter
+                                    new_scale = ScaleLine((ox1, oy1), (ox2, oy2), val, width=object_line_width)
+                                    history.record(SetScale(scene.set_scale(new_scale), new_scale))
+                                    pixels_per_meter = scene.pixels_per_meter
                             elif mode == 'add_rect':
                                 try:
                                     rect_obj = Rectangle((ox1, oy1), (ox2, oy2), width=object_line_width)
-                                    objects.append(rect_obj)
+                                    scene.add(rect_obj)
+                                    history.record(AddObject(rect_obj))
                                 except Exception:
                                     pass
                             else:
@@ -778,19 +1305,25 @@ def main():
                                     meters = None
                                 try:
                                     ml = MeasureLine((ox1, oy1), (ox2, oy2), meters, width=object_line_width)
-                                    objects.append(ml)
+                                    scene.add(ml)
+                                    history.record(AddObject(ml))
                                 except Exception:
                                     pass
                         mode = 'normal'
                         drawing = False
+                        set_snap(None)
                 if event.button == 2:
+                    if grid_dragging:
+                        journal_append([dict(op='grid', **grid_settings())])
                     grid_dragging = False
                 if event.button == 1:
                     # release slider drag
                     slider_dragging = False
+                    history.end_gesture()
                     label_slider_dragging = False
             elif event.type == pygame.MOUSEMOTION:
                 if resize_mode and selected_obj and image:
+                    mark_object(selected_obj)
                     mx, my = event.pos
                     # determine target screen position, applying Shift-based snapping
                     tx, ty = mx, my
@@ -815,6 +1348,9 @@ def main():
                                 size = max(abs(dxs), abs(dys))
                                 tx = int(ax + sx * size)
                                 ty = int(ay + sy * size)
+                            set_snap(None)
+                        else:
+                            tx, ty = snap_point(mx, my, exclude=selected_obj)
                     except Exception:
                         tx, ty = mx, my
                     # convert target to original-image coords
@@ -847,13 +1383,18 @@ def main():
                             dxo = tox - curx
                             dyo = toy - cury
                             try:
+                                before = (selected_obj.p1, selected_obj.p2)
                                 selected_obj.move_handle(resize_handle, dxo, dyo)
+                                scene.moved(selected_obj)
+                                history.record(MoveHandle(selected_obj, before, (selected_obj.p1, selected_obj.p2)))
                             except Exception:
                                 pass
                         except Exception:
                             pass
                     obj_drag_last = (mx, my)
+                    mark_object(selected_obj)
                 if obj_dragging and selected_obj and image:
+                    mark_object(selected_obj)
                     mx, my = event.pos
                     dx = mx - obj_drag_last[0]
                     dy = my - obj_drag_last[1]
@@ -863,21 +1404,27 @@ def main():
                         dyo = dy / image_scale
                         try:
                             selected_obj.move_by(dxo, dyo)
+                            scene.moved(selected_obj)
+                            history.record(MoveBy(selected_obj, dxo, dyo))
                         except Exception:
                             pass
                     obj_drag_last = (mx, my)
+                    mark_object(selected_obj)
                 if panning and image:
                     mx, my = event.pos
                     dx = mx - pan_start[0]
                     dy = my - pan_start[1]
                     image_rect.topleft = (image_start_pos[0] + dx, image_start_pos[1] + dy)
+                    dirty.mark_all()
                 if grid_dragging:
                     mx, my = event.pos
                     dx = mx - grid_drag_start[0]
                     dy = my - grid_drag_start[1]
                     grid_offset_px[0] = grid_offset_start[0] + dx
                     grid_offset_px[1] = grid_offset_start[1] + dy
+                    dirty.mark_all()
                 if 'drawing' in locals() and drawing:
+                    mark_preview()
                     mx, my = event.pos
                     mods = pygame.key.get_mods()
                     if mods & pygame.KMOD_SHIFT:
@@ -898,7 +1445,16 @@ def main():
                             else:
                                 # snap vertical
                                 mx = draw_start[0]
+                        set_snap(None)
+                    else:
+                        mx, my = snap_point(mx, my)
                     draw_current = (mx, my)
+                    mark_preview()
+                elif image and mode in ('setting_scale', 'add_measure', 'add_rect'):
+                    # show where the first point would land
+                    snap_point(*event.pos)
+                elif snap_target is not None and not resize_mode:
+                    set_snap(None)
                 # handle slider dragging
                 if slider_dragging:
                     sx, sy = event.pos
@@ -909,17 +1465,17 @@ def main():
                         new_w = int(round(SLIDER_MIN + rel * (SLIDER_MAX - SLIDER_MIN)))
                         if new_w != object_line_width:
                             object_line_width = new_w
+                            dirty.mark_all()
                             # apply to existing objects
-                            if scale_object is not None:
-                                try:
-                                    scale_object.width = object_line_width
-                                except Exception:
-                                    pass
-                            for o in objects:
+                            targets = ([scene.scale_object] if scene.scale_object is not None else []) + scene.objects
+                            old_widths = [(o, getattr(o, 'width', object_line_width)) for o in targets]
+                            for o in targets:
                                 try:
                                     o.width = object_line_width
                                 except Exception:
                                     setattr(o, 'width', object_line_width)
+                            if old_widths:
+                                history.record(SetWidth(old_widths, object_line_width))
                 if label_slider_dragging:
                     sx, sy = event.pos
                     if label_slider_rect:
@@ -929,6 +1485,7 @@ def main():
                         new_scale = (LABEL_SCALE_MIN + rel * (LABEL_SCALE_MAX - LABEL_SCALE_MIN))
                         if abs(new_scale - label_scale) > 1e-3:
                             label_scale = new_scale
+                            dirty.mark_all()
             elif event.type == pygame.MOUSEWHEEL:
                 # zoom in/out with wheel, centered on mouse
                 # Ignore zoom while actively drawing (prevent accidental extreme zoom)
@@ -950,10 +1507,10 @@ def main():
                         rel_y = max(0.0, min(rel_y, 1.0))
                         image_scale = new_scale
                         user_zoomed = True
-                        # rescale image surface
+                        dirty.mark_all()
+                        # only the displayed size changes; the pyramid resamples visible tiles
                         new_w = max(1, int(orig_w * image_scale))
                         new_h = max(1, int(orig_h * image_scale))
-                        image = pygame.transform.smoothscale(original_image, (new_w, new_h))
                         # keep mouse point stable
                         new_x = int(mx - rel_x * new_w)
                         new_y = int(my - rel_y * new_h)
@@ -968,348 +1525,145 @@ def main():
                         image_rect = pygame.Rect(new_x, new_y, new_w, new_h)
 
                 pass
-
-        screen.fill(BG_COLOR)
-
-        # (sidebar drawn after image and grid)
-
-        # draw image (may overlap sidebar by design)
-        if image:
-            screen.blit(image, image_rect)
-
-        # create a label font that scales with image zoom so labels grow/shrink with zoom
-            # use a fixed base font and scale rendered surfaces to avoid per-glyph jitter
-            try:
-                base_label_size = 20
-                # prefer a monospace/tabular-number font so digits render uniformly
-                monos = ['Consolas', 'Segoe UI Mono', 'Courier New', 'DejaVu Sans Mono']
-                fpath = None
-                for name in monos:
+            elif event.type == IMAGE_PREVIEW:
+                # low-resolution preview of a pending load: show it right away
+                if load_job is not None and event.job_id == load_job.job_id:
+                    image = event.pyramid
+                    fit_image(event.size)
+                    load_fitted = True
+                    dirty.mark_all()
+            elif index_refresher is not None and event.type == index_refresher.event_type:
+                if browser is not None:
+                    browser.reload()
+                    if event.name is None:
+                        browser.busy = False
+                    dirty.mark_all()
+            elif writer is not None and event.type == writer.event_type:
+                if event.error is not None:
+                    print('Save failed:', event.error)
+                elif journal is not None and event.tag and event.tag[0] == journal.session:
+                    # the snapshot holds the journal up to this record
                     try:
-                        m = pygame.font.match_font(name)
-                        if m:
-                            fpath = m
-                            break
-                    except Exception:
-                        continue
-                if fpath:
-                    base_label_font = pygame.font.Font(fpath, base_label_size)
-                else:
-                    base_label_font = pygame.font.SysFont(None, base_label_size)
-            except Exception:
-                base_label_font = font
-            # compute text scale factor applied to base surfaces
-            text_scale = image_scale * label_scale
-
-        # draw scale/measurement objects over image
-        if scale_object:
-            scale_object.draw(screen, image_rect, image_scale, base_label_font, pixels_per_meter=pixels_per_meter, label_scale=text_scale)
-        for obj in objects:
-            obj.draw(screen, image_rect, image_scale, base_label_font, pixels_per_meter=pixels_per_meter, label_scale=text_scale)
-
-        # draw selection highlight/handles
-        if selected_obj:
-            try:
-                HCOL = (255,220,80)
-                if isinstance(selected_obj, ScaleLine) or isinstance(selected_obj, MeasureLine):
-                    x1 = image_rect.x + int(selected_obj.p1[0] * image_scale)
-                    y1 = image_rect.y + int(selected_obj.p1[1] * image_scale)
-                    x2 = image_rect.x + int(selected_obj.p2[0] * image_scale)
-                    y2 = image_rect.y + int(selected_obj.p2[1] * image_scale)
-                    if obj_dragging:
-                        # draw the whole line in highlight color and draw arrows/caps depending on type
-                        pygame.draw.line(screen, HCOL, (x1, y1), (x2, y2), max(2, int(selected_obj.width) + 2))
-                        if isinstance(selected_obj, MeasureLine):
-                            draw_arrow_ends(screen, (x1, y1), (x2, y2), HCOL, size=max(6, int(selected_obj.width*3)), width=max(1, selected_obj.width))
-                        else:
-                            # scale line: show perpendicular caps
-                            draw_perp_cap(screen, (x1, y1), (x2, y2), HCOL, length=12, width=max(1, selected_obj.width))
+                        journal.compacted(event.tag[1])
+                    except Exception as e:
+                        print('Autosave compaction failed:', e)
+                if event.message:
+                    show_popup(event.message)
+            elif detect_job is not None and event.type == detect_job.event_type:
+                if event.job_id == detect_job.job_id:
+                    detect_job = None
+                    if event.error is not None or event.result is None:
+                        print("Wall detection failed:", event.error)
+                        show_popup("Wall detection failed")
+                    elif event.path == image_path:
+                        proposals = event.result
+                        proposal_view = 'all'
+                        show_popup(f"Found {len(proposals['lines'])} walls and {len(proposals['rooms'])} rooms: "
+                                   "Enter accepts, Tab picks lines/rooms, C discards", duration_ms=6000)
+                    dirty.mark_all()
+            elif event.type == IMAGE_LOADED:
+                if load_job is not None and event.job_id == load_job.job_id:
+                    load_job = None
+                    if event.error is not None or event.image is None:
+                        print("Failed to load image:", event.error)
+                        show_popup(f"Failed to load {os.path.basename(event.path)}")
                     else:
-                        # selection not moving: show highlight and endpoint handles (small squares)
-                        pygame.draw.line(screen, HCOL, (x1, y1), (x2, y2), max(2, int(selected_obj.width) + 2))
-                        pygame.draw.rect(screen, HCOL, (x1-4, y1-4, 8, 8))
-                        pygame.draw.rect(screen, HCOL, (x2-4, y2-4, 8, 8))
-                elif isinstance(selected_obj, Rectangle):
-                    rx = image_rect.x + int(min(selected_obj.p1[0], selected_obj.p2[0]) * image_scale)
-                    ry = image_rect.y + int(min(selected_obj.p1[1], selected_obj.p2[1]) * image_scale)
-                    rw = int(abs(selected_obj.p2[0] - selected_obj.p1[0]) * image_scale)
-                    rh = int(abs(selected_obj.p2[1] - selected_obj.p1[1]) * image_scale)
-                    pygame.draw.rect(screen, HCOL, (rx, ry, rw, rh), max(2, selected_obj.width + 1))
-                    # corner handles
-                    for cx, cy in ((rx, ry), (rx+rw, ry), (rx, ry+rh), (rx+rw, ry+rh)):
-                        pygame.draw.rect(screen, HCOL, (cx-4, cy-4, 8, 8))
-            except Exception:
-                pass
-
-        # draw preview while dragging to add scale/measure/rect
-        if 'drawing' in locals() and drawing and mode in ('setting_scale', 'add_measure', 'add_rect'):
-            sx1, sy1 = draw_start
-            sx2, sy2 = draw_current
-            # anti-aliased preview line/rect
-            try:
-                if mode == 'add_rect':
-                    rx = min(sx1, sx2)
-                    ry = min(sy1, sy2)
-                    rw = abs(sx2 - sx1)
-                    rh = abs(sy2 - sy1)
-                    pygame.draw.rect(screen, (255, 150, 50), (rx, ry, rw, rh), 2)
-                else:
-                    pygame.draw.aaline(screen, (255, 150, 50), (sx1, sy1), (sx2, sy2))
-            except Exception:
-                if mode == 'add_rect':
-                    pygame.draw.rect(screen, (255, 150, 50), (min(sx1, sx2), min(sy1, sy2), abs(sx2 - sx1), abs(sy2 - sy1)), 2)
-                else:
-                    pygame.draw.line(screen, (255, 150, 50), (sx1, sy1), (sx2, sy2), 1)
-            # preview caps/arrows instead of end dots
-            if mode == 'setting_scale':
-                draw_perp_cap(screen, (sx1, sy1), (sx2, sy2), (255, 150, 50), length=8, width=3)
-            elif mode == 'add_measure':
-                draw_arrow_ends(screen, (sx1, sy1), (sx2, sy2), (255, 150, 50), size=8, width=2)
-                # show live measurement during preview
-                # compute original-image pixel distance
-                ox1 = (sx1 - image_rect.x) / image_scale
-                oy1 = (sy1 - image_rect.y) / image_scale
-                ox2 = (sx2 - image_rect.x) / image_scale
-                oy2 = (sy2 - image_rect.y) / image_scale
-                dp = math.hypot(ox2 - ox1, oy2 - oy1)
-                if pixels_per_meter:
-                    meters = dp / pixels_per_meter
-                else:
-                    meters = None
-                if meters is not None:
-                    txt = f"{meters:.2f} m"
-                else:
-                    txt = f"{int(round(dp))} px"
-                try:
-                    # render from base font and smoothscale to avoid jitter
-                    base_shadow = base_label_font.render(txt, True, (10,10,10))
-                    base_img = base_label_font.render(txt, True, (255,220,80))
-                    s = max(0.01, float(text_scale))
-                    tw = max(1, int(base_img.get_width() * s))
-                    th = max(1, int(base_img.get_height() * s))
-                    try:
-                        shadow = pygame.transform.smoothscale(base_shadow, (tw, th))
-                        img = pygame.transform.smoothscale(base_img, (tw, th))
-                    except Exception:
-                        shadow = pygame.transform.scale(base_shadow, (tw, th))
-                        img = pygame.transform.scale(base_img, (tw, th))
-                    midx = (sx1 + sx2)//2
-                    midy = (sy1 + sy2)//2
-                    screen.blit(shadow, (midx - shadow.get_width()//2 + 1, midy - shadow.get_height()//2 + 1))
-                    screen.blit(img, (midx - img.get_width()//2, midy - img.get_height()//2))
-                except Exception:
-                    pass
-            elif mode == 'add_rect':
-                # show live rectangle dimensions in meters if scale known. Use original-image coords
-                ox1 = (sx1 - image_rect.x) / image_scale
-                oy1 = (sy1 - image_rect.y) / image_scale
-                ox2 = (sx2 - image_rect.x) / image_scale
-                oy2 = (sy2 - image_rect.y) / image_scale
-                disp_w = abs(sx2 - sx1)
-                disp_h = abs(sy2 - sy1)
-                rect_orig_w = abs(ox2 - ox1)
-                rect_orig_h = abs(oy2 - oy1)
-                # prefer meters if scale known, otherwise show pixels
-                if pixels_per_meter:
-                    wtxt = f"{(rect_orig_w / pixels_per_meter):.2f} m"
-                    htxt = f"{(rect_orig_h / pixels_per_meter):.2f} m"
-                else:
-                    wtxt = f"{int(round(rect_orig_w))} px"
-                    htxt = f"{int(round(rect_orig_h))} px"
-                try:
-                    # scaled rendering for width label
-                    base_wshadow = base_label_font.render(wtxt, True, (10,10,10))
-                    base_wimg = base_label_font.render(wtxt, True, (255,220,80))
-                    s_w = max(0.01, float(text_scale))
-                    tw = max(1, int(base_wimg.get_width() * s_w))
-                    th = max(1, int(base_wimg.get_height() * s_w))
-                    try:
-                        wshadow = pygame.transform.smoothscale(base_wshadow, (tw, th))
-                        wimg = pygame.transform.smoothscale(base_wimg, (tw, th))
-                    except Exception:
-                        wshadow = pygame.transform.scale(base_wshadow, (tw, th))
-                        wimg = pygame.transform.scale(base_wimg, (tw, th))
-                    tx = min(sx1, sx2) + disp_w//2
-                    ty = min(sy1, sy2) - max(14, base_label_font.get_linesize())
-                    screen.blit(wshadow, (tx - wshadow.get_width()//2 + 1, ty + 1))
-                    screen.blit(wimg, (tx - wimg.get_width()//2, ty))
-
-                    # scaled rendering for height label
-                    base_hshadow = base_label_font.render(htxt, True, (10,10,10))
-                    base_himg = base_label_font.render(htxt, True, (255,220,80))
-                    s_h = max(0.01, float(text_scale))
-                    tw2 = max(1, int(base_himg.get_width() * s_h))
-                    th2 = max(1, int(base_himg.get_height() * s_h))
-                    try:
-                        hshadow = pygame.transform.smoothscale(base_hshadow, (tw2, th2))
-                        himg = pygame.transform.smoothscale(base_himg, (tw2, th2))
-                    except Exception:
-                        hshadow = pygame.transform.scale(base_hshadow, (tw2, th2))
-                        himg = pygame.transform.scale(base_himg, (tw2, th2))
-                    lx = min(sx1, sx2) - max(34, base_label_font.get_linesize() + 6)
-                    ly = min(sy1, sy2) + disp_h//2
-                    screen.blit(hshadow, (lx + 1, ly - hshadow.get_height()//2 + 1))
-                    screen.blit(himg, (lx, ly - himg.get_height()//2))
-                except Exception:
-                    pass
+                        # swap in the full-resolution pyramid; keep the preview's zoom/pan
+                        original_image = event.image
+                        prev_path = image_path
+                        image_path = event.path
+                        if journal is not None and image_path != prev_path:
+                            # the project now refers to another image
+                            autosave_snapshot()
+                        if image_path != prev_path:
+                            discard_proposals()
+                        image = event.pyramid
+                        if not load_fitted or image.get_size() != (orig_w, orig_h):
+                            fit_image(image.get_size())
+                        show_popup(load_done_msg or f"Loaded {os.path.basename(event.path)}")
+                    dirty.mark_all()
 
-        # draw grid (aligned to image)
-        if image and pixels_per_meter and grid_visible:
-            # pixels_per_meter is relative to original image pixels; scale to display
-            spacing_px = pixels_per_meter * image_scale * grid_spacing_m
-            if spacing_px >= 4:  # avoid insane dense grids
-                ox, oy = image_rect.topleft
-                w, h = image_rect.size
-                # align grid to image origin, apply manual offset in pixels
-                step = spacing_px
-                # compute starting x/y using offset so dragging shifts grid
-                try:
-                    ox_offset = grid_offset_px[0]
-                    oy_offset = grid_offset_px[1]
-                except Exception:
-                    ox_offset = 0.0
-                    oy_offset = 0.0
-                start_x = ox + (ox_offset % step) - step
-                x = start_x
-                while x < ox + w:
-                    if int(x) >= SIDEBAR_WIDTH + 2:
-                        try:
-                            pygame.draw.aaline(screen, GRID_COLOR, (int(x), oy), (int(x), oy + h))
-                        except Exception:
-                            pygame.draw.line(screen, GRID_COLOR, (int(x), oy), (int(x), oy + h), 1)
-                    x += step
-                start_y = oy + (oy_offset % step) - step
-                y = start_y
-                while y < oy + h:
-                    try:
-                        pygame.draw.aaline(screen, GRID_COLOR, (ox, int(y)), (ox + w, int(y)))
-                    except Exception:
-                        pygame.draw.line(screen, GRID_COLOR, (ox, int(y)), (ox + w, int(y)), 1)
-                    y += step
-                # finished grid draw
+        # the resize stopped: redraw with the smooth resample
+        if resize_debounce.settled(pygame.time.get_ticks()):
+            dirty.mark_all()
 
-            # draw scale preview (if in setting mode and one point clicked)
-            # (hint will be drawn after the sidebar to ensure visibility)
+        # hide an expired popup
+        if quicksave_popup_until and pygame.time.get_ticks() >= quicksave_popup_until:
+            quicksave_popup_until = 0
+            dirty.mark(popup_rect())
 
-        # draw sidebar on top so it never gets overlapped
-        sidebar_rect = pygame.Rect(0, 0, SIDEBAR_WIDTH, win_h)
-        pygame.draw.rect(screen, SIDEBAR_COLOR, sidebar_rect)
-        controls = (
-            "Controls:\n"
-            "O: Open image\n"
-            "S: Set scale (drag line)\n"
-            "L: Add measurement (drag line)\n"
-            "D: Add rectangle (drag)\n"
-            "Q: Quicksave current project\n"
-            "Hold Shift: snap H/V\n"
-            "G: Grid spacing (cm)\n"
-            "V: Toggle grid\n"
-            "C: Cancel current operation\n"
-            "P: Save project | J: Load project\n"
-            "K: Open projects folder\n"
-            "Delete: Delete selected object\n"
-            "Ctrl+Z / Ctrl+Y: Undo / Redo\n"
-            "Esc: Quit\n"
-        )
-        # draw current mode and controls with padding
-        mode_name = "Normal"
-        if mode == 'setting_scale':
-            mode_name = "Adding scale"
-        elif mode == 'add_measure':
-            mode_name = "Adding line"
-        elif mode == 'add_rect':
-            mode_name = "Adding rectangle"
-        base_y = 10
-        draw_text(screen, f"Mode: {mode_name}", (10, base_y), sidebar_font)
-        draw_text(screen, controls, (10, base_y + 30 + TEXT_PADDING), sidebar_font)
-        # place cancel button below controls to avoid overlap
-        controls_lines = controls.count('\n') + 1
-        controls_height = controls_lines * sidebar_font.get_linesize()
-        cancel_y = base_y + 30 + TEXT_PADDING + controls_height + 8
-        if mode in ('setting_scale', 'add_measure', 'add_rect'):
-            cancel_rect = pygame.Rect(10, cancel_y, SIDEBAR_WIDTH - 20, 30)
-            pygame.draw.rect(screen, (100, 40, 40), cancel_rect)
-            draw_text(screen, "Cancel (C)", (cancel_rect.x + 8, cancel_rect.y + 6), sidebar_font, color=(220,220,220))
+        profiler.lap('events')
+        if dirty:
+            if show_hud:
+                dirty.mark(profiler.hud_rect(font, win_w))
+            rects = dirty.take()
+            objects_drawn = 0
+            labels_before = label_renderer.rendered
+            label_time_before = label_renderer.render_time
+            for r in rects:
+                screen.set_clip(r)
+                render_scene()
+            screen.set_clip(None)
+            if show_hud:
+                profiler.draw_hud(screen, font, win_w)
+            profiler.mark()
+            pygame.display.update(rects)
+            profiler.lap('flip')
+            profiler.end_frame(objects=objects_drawn, labels=label_renderer.rendered - labels_before,
+                               label_time=label_renderer.render_time - label_time_before, rects=len(rects))
+            clock.tick(60)
+            frame_count += 1
+            if startup is not None:
+                startup.mark('first frame')
+                startup.emit()
+                running = False
         else:
-            # place hint below the controls block to avoid overlap
-            hint_y = cancel_y
-            draw_text(screen, "Drag inside image to pan.", (10, hint_y), sidebar_font)
-
-        # draw current scale indicator in sidebar (below controls)
-        scale_y = cancel_y + 44
-        if pixels_per_meter:
-            px_len = pixels_per_meter * image_scale * 1.0
-            # cap the drawn length so it doesn't overflow the sidebar
-            max_len = max(0, SIDEBAR_WIDTH - 20)
-            draw_len = min(int(px_len), max_len)
-            sx = 10
-            sy = scale_y
-            draw_text(screen, f"1.0 m = {px_len:.1f} px", (sx, sy), sidebar_font)
-            draw_text(screen, f"Grid spacing: {grid_spacing_m*100:.0f} cm", (sx, sy + 30), sidebar_font)
-
-        # draw line-width slider
-        slider_y = scale_y + 70
-        slider_x = 10
-        slider_w = SIDEBAR_WIDTH - 20
-        slider_h = 18
-        slider_rect = pygame.Rect(slider_x, slider_y, slider_w, slider_h)
-        # track
-        pygame.draw.rect(screen, (70,70,70), slider_rect)
-        # knob position
-        rel = (object_line_width - SLIDER_MIN) / float(SLIDER_MAX - SLIDER_MIN)
-        knob_x = slider_x + int(rel * (slider_w - 10))
-        knob_rect = pygame.Rect(knob_x, slider_y - 4, 10, slider_h + 8)
-        pygame.draw.rect(screen, (200,200,200), knob_rect)
-        draw_text(screen, f"Line width: {object_line_width}", (slider_x, slider_y - 22), sidebar_font)
-        # label-size slider below line-width
-        label_slider_y = slider_y + slider_h + 34
-        label_slider_x = slider_x
-        label_slider_w = slider_w
-        label_slider_h = slider_h
-        label_slider_rect = pygame.Rect(label_slider_x, label_slider_y, label_slider_w, label_slider_h)
-        pygame.draw.rect(screen, (70,70,70), label_slider_rect)
-        # knob for label scale
-        lrel = (label_scale - LABEL_SCALE_MIN) / float(LABEL_SCALE_MAX - LABEL_SCALE_MIN)
-        lknob_x = label_slider_x + int(lrel * (label_slider_w - 10))
-        lknob_rect = pygame.Rect(lknob_x, label_slider_y - 4, 10, label_slider_h + 8)
-        pygame.draw.rect(screen, (200,200,200), lknob_rect)
-        draw_text(screen, f"Label scale: {label_scale:.2f}x", (label_slider_x, label_slider_y - 22), sidebar_font)
-        # hint to open projects folder
-        draw_text(screen, "K: Open projects folder", (slider_x, label_slider_y + label_slider_h + 8), sidebar_font)
+            profiler.end_frame(drew=False)
 
-        # draw drag hint after sidebar so it is not overlapped by the image
-        if mode == 'setting_scale' and drawing:
-            draw_text(screen, "Drag and release to set scale; hold Shift to snap", (SIDEBAR_WIDTH + 10, win_h - 50), font)
-        # transient quicksave popup (top center of image area)
+    # fold the journal into a last snapshot and let queued saves finish before the window goes away
+    if journal is not None and journal.pending() > 0:
+        autosave_snapshot()
+    if index_refresher is not None:
+        index_refresher.cancel()
+    if detect_job is not None:
+        detect_job.cancel()
+    if writer is not None:
+        writer.close()
+    close_journal()
+    if autosave_enabled and (writer is None or not writer.is_alive()):
+        clear_active(get_projects_root())
+    if profile_from_env and profiler.frames:
         try:
-            now = pygame.time.get_ticks()
-        except Exception:
-            now = 0
-        if quicksave_popup_until and now and now < quicksave_popup_until:
-            try:
-                popup_txt = quicksave_msg or 'Quicksaved'
-                popup_img = sidebar_font.render(popup_txt, True, (255,255,255))
-                pad = 8
-                pw = popup_img.get_width() + pad*2
-                ph = popup_img.get_height() + pad*2
-                px = SIDEBAR_WIDTH + max(0, (win_w - SIDEBAR_WIDTH - pw)//2)
-                py = 8
-                pygame.draw.rect(screen, (30,30,30), (px, py, pw, ph))
-                screen.blit(popup_img, (px + pad, py + pad))
-            except Exception:
-                pass
-        # flip display
-
-        pygame.display.flip()
-        clock.tick(60)
-        if frame_count < 3:
-            pass
-        frame_count += 1
-
+            print("Profile saved to", profiler.dump())
+        except Exception as e:
+            print("Profile dump failed:", e)
     pygame.quit()
     # main exiting
 
 if __name__ == '__main__':
+    # `flaner render ...` renders projects headlessly (see batch_render.py)
+    if len(sys.argv) > 1 and sys.argv[1] == 'render':
+        import batch_render
+        sys.exit(batch_render.main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'convert':
+        import project_binary
+        sys.exit(project_binary.main(sys.argv[2:]))
+    # `flaner report ...` exports measurements of saved projects (see report.py)
+    if len(sys.argv) > 1 and sys.argv[1] == 'report':
+        import report
+        sys.exit(report.main(sys.argv[2:]))
+    # `flaner rescale ...` changes the scale of many projects at once (see rescale.py)
+    if len(sys.argv) > 1 and sys.argv[1] == 'rescale':
+        import rescale
+        sys.exit(rescale.main(sys.argv[2:]))
+    # `flaner --startup-profile` times the imports and every step up to the first frame
+    if len(sys.argv) > 1 and sys.argv[1] == '--startup-profile':
+        import startup
+        sys.exit(startup.run_profile(os.path.abspath(__file__), sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == '--startup-child':
+        import startup
+        main(startup.StartupTimer(STARTUP_T0))
+        sys.exit(0)
     try:
         main()
     except Exception:
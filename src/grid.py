@@ -0,0 +1,143 @@
+import math
+import pygame
+
+GRID_COLOR = (0, 200, 200)
+# below this on-screen spacing the grid is skipped (avoid insane dense grids)
+MIN_SPACING_PX = 4
+# extra pixels rasterized around the visible area so small pans reuse the layer
+LAYER_MARGIN = 256
+
+
+def _grid_params(image_scale, pixels_per_meter, grid_spacing_m, grid_offset_px):
+    # pixels_per_meter is relative to original image pixels; scale to display
+    step = pixels_per_meter * image_scale * grid_spacing_m
+    # compute starting x/y using offset so dragging shifts grid
+    try:
+        ox_offset = grid_offset_px[0]
+        oy_offset = grid_offset_px[1]
+    except Exception:
+        ox_offset = 0.0
+        oy_offset = 0.0
+    return step, ox_offset, oy_offset
+
+
+def _line_positions(first, step, lo, hi):
+    """Integer positions of `first + k*step` (k >= 0) that fall in [lo, hi)."""
+    k = max(0, int(math.floor((lo - first) / step)))
+    v = first + k * step
+    while v < hi:
+        iv = int(v)
+        if iv >= lo:
+            yield iv
+        v += step
+
+
+def _draw_lines(target, area, dest, step, ox_offset, oy_offset, color):
+    """Draw the grid lines inside `area` (image-relative) with area.topleft at `dest`."""
+    dx = dest[0] - area.x
+    dy = dest[1] - area.y
+    top = dest[1]
+    bottom = dest[1] + area.h - 1
+    left = dest[0]
+    right = dest[0] + area.w - 1
+    # align grid to image origin, apply manual offset in pixels; lines are
+    # axis-aligned on whole pixels, so a plain line matches an aaline exactly
+    for x in _line_positions((ox_offset % step) - step, step, area.left, area.right):
+        pygame.draw.line(target, color, (x + dx, top), (x + dx, bottom), 1)
+    for y in _line_positions((oy_offset % step) - step, step, area.top, area.bottom):
+        pygame.draw.line(target, color, (left, y + dy), (right, y + dy), 1)
+
+
+def _visible_area(image_rect, viewport, min_x):
+    # window ∩ image, in image-relative coordinates; nothing left of min_x
+    vis = image_rect.clip(viewport)
+    if vis.left < min_x:
+        vis.width = max(0, vis.right - min_x)
+        vis.left = min_x
+    if vis.w <= 0 or vis.h <= 0:
+        return None
+    return vis.move(-image_rect.x, -image_rect.y)
+
+
+def draw_grid(surface, image_rect, image_scale, pixels_per_meter, grid_spacing_m, grid_offset_px=(0.0, 0.0), min_x=0, color=GRID_COLOR):
+    """Draw grid lines every `grid_spacing_m` meters, aligned to the image origin.
+
+    Only lines inside the surface clip are drawn. `grid_offset_px` shifts the
+    grid in display pixels; nothing is drawn left of `min_x` (e.g. under the
+    sidebar).
+    """
+    step, ox_offset, oy_offset = _grid_params(image_scale, pixels_per_meter, grid_spacing_m, grid_offset_px)
+    if step < MIN_SPACING_PX:
+        return
+    area = _visible_area(image_rect, surface.get_clip(), min_x)
+    if area is None:
+        return
+    dest = (image_rect.x + area.x, image_rect.y + area.y)
+    _draw_lines(surface, area, dest, step, ox_offset, oy_offset, color)
+
+
+def nearest_intersection(sx, sy, image_rect, image_scale, pixels_per_meter, grid_spacing_m, grid_offset_px=(0.0, 0.0)):
+    """Screen position of the grid intersection nearest to (sx, sy), or None when the grid is not drawn."""
+    if not pixels_per_meter or not grid_spacing_m:
+        return None
+    step, ox_offset, oy_offset = _grid_params(image_scale, pixels_per_meter, grid_spacing_m, grid_offset_px)
+    if step < MIN_SPACING_PX:
+        return None
+    # same lattice as _draw_lines, unrounded
+    fx = ox_offset % step
+    fy = oy_offset % step
+    gx = fx + round((sx - image_rect.x - fx) / step) * step
+    gy = fy + round((sy - image_rect.y - fy) / step) * step
+    if not (0 <= gx < image_rect.w and 0 <= gy < image_rect.h):
+        return None
+    return image_rect.x + gx, image_rect.y + gy
+
+
+class GridLayer:
+    """Grid pre-rendered into a cached layer that covers the visible image area.
+
+    The layer is keyed by everything that moves the lines relative to the
+    image, so pans (and partial redraws) only blit; it is re-rasterized when
+    the key changes or the view leaves the cached area.
+    """
+    def __init__(self, color=GRID_COLOR, margin=LAYER_MARGIN):
+        self.color = color
+        self.margin = int(margin)
+        self._key = None
+        self._area = None
+        self._layer = None
+
+    def invalidate(self):
+        self._key = None
+        self._area = None
+        self._layer = None
+
+    def _rasterize(self, area, step, ox_offset, oy_offset):
+        # 8-bit layer with a colorkey: a quarter of the memory of a 32-bit one
+        layer = pygame.Surface(area.size, 0, 8)
+        key = (255, 0, 255) if tuple(self.color[:3]) != (255, 0, 255) else (0, 0, 0)
+        layer.set_palette([key, self.color[:3]] + [key] * 254)
+        layer.fill(0)
+        layer.set_colorkey(0, pygame.RLEACCEL)
+        _draw_lines(layer, area, (0, 0), step, ox_offset, oy_offset, self.color)
+        return layer
+
+    def draw(self, surface, image_rect, image_scale, pixels_per_meter, grid_spacing_m, grid_offset_px=(0.0, 0.0), min_x=0, viewport=None):
+        """Blit the grid over the window ∩ image area (`viewport` defaults to the whole surface)."""
+        step, ox_offset, oy_offset = _grid_params(image_scale, pixels_per_meter, grid_spacing_m, grid_offset_px)
+        if step < MIN_SPACING_PX:
+            return
+        if viewport is None:
+            viewport = surface.get_rect()
+        need = _visible_area(image_rect, viewport, min_x)
+        if need is None:
+            return
+        key = (pixels_per_meter, image_scale, grid_spacing_m, ox_offset, oy_offset, image_rect.size)
+        if key != self._key or not self._area.contains(need):
+            m = self.margin
+            area = need.inflate(2 * m, 2 * m).clip(pygame.Rect((0, 0), image_rect.size))
+            self._layer = self._rasterize(area, step, ox_offset, oy_offset)
+            self._area = area
+            self._key = key
+        src = need.move(-self._area.x, -self._area.y)
+        surface.blit(self._layer, (image_rect.x + need.x, image_rect.y + need.y), src)
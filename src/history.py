@@ -0,0 +1,285 @@
+from collections import deque
+
+# history is bounded by an estimate of the memory it holds, not by a count
+UNDO_BUDGET_BYTES = 4 * 1024 * 1024
+# rough per-command and per-object costs used for the budget
+COMMAND_BYTES = 120
+OBJECT_BYTES = 400
+
+
+def _object_record(scene, obj):
+    # journal record carrying the current state of one object
+    if obj is scene.scale_object:
+        return {'op': 'scale', 'obj': obj.to_dict()}
+    return {'op': 'set', 'pos': scene.position(obj), 'obj': obj.to_dict()}
+
+
+class Command:
+    """A reversible scene edit that stores only what changed.
+
+    Commands are recorded after the edit was applied, so `redo` re-applies
+    and `undo` applies the inverse.
+    """
+    def redo(self, scene):
+        raise NotImplementedError()
+
+    def undo(self, scene):
+        raise NotImplementedError()
+
+    def merge(self, other):
+        # fold `other` (a later edit in the same gesture) into this command
+        return False
+
+    def size(self):
+        return COMMAND_BYTES
+
+    def journal(self, scene, undone):
+        # autosave records describing the scene change just applied (see journal.py)
+        return []
+
+
+class AddObject(Command):
+    def __init__(self, obj, pos=None):
+        self.obj = obj
+        self.pos = pos
+
+    def redo(self, scene):
+        scene.add(self.obj, self.pos)
+
+    def undo(self, scene):
+        self.pos = scene.remove(self.obj)
+
+    def size(self):
+        return COMMAND_BYTES + OBJECT_BYTES
+
+    def journal(self, scene, undone):
+        if undone:
+            return [{'op': 'delete', 'pos': self.pos}]
+        return [{'op': 'add', 'pos': scene.position(self.obj), 'obj': self.obj.to_dict()}]
+
+
+class DeleteObject(Command):
+    def __init__(self, obj, pos):
+        self.obj = obj
+        self.pos = pos
+
+    def redo(self, scene):
+        self.pos = scene.remove(self.obj)
+
+    def undo(self, scene):
+        scene.add(self.obj, self.pos)
+
+    def size(self):
+        return COMMAND_BYTES + OBJECT_BYTES
+
+    def journal(self, scene, undone):
+        if undone:
+            return [{'op': 'add', 'pos': scene.position(self.obj), 'obj': self.obj.to_dict()}]
+        return [{'op': 'delete', 'pos': self.pos}]
+
+
+class AddObjects(Command):
+    # a batch appended in one go (e.g. accepted wall proposals); undoes as one step
+    def __init__(self, objs):
+        self.objs = list(objs)
+        self.positions = []
+
+    def redo(self, scene):
+        for obj, pos in zip(self.objs, self.positions):
+            scene.add(obj, pos)
+
+    def undo(self, scene):
+        self.positions = [scene.remove(obj) for obj in reversed(self.objs)][::-1]
+
+    def size(self):
+        return COMMAND_BYTES + OBJECT_BYTES * len(self.objs)
+
+    def journal(self, scene, undone):
+        if undone:
+            return [{'op': 'delete', 'pos': pos} for pos in reversed(self.positions)]
+        return [{'op': 'add', 'pos': scene.position(obj), 'obj': obj.to_dict()} for obj in self.objs]
+
+
+class MoveBy(Command):
+    def __init__(self, obj, dx, dy):
+        self.obj = obj
+        self.dx = dx
+        self.dy = dy
+
+    def redo(self, scene):
+        self.obj.move_by(self.dx, self.dy)
+        scene.moved(self.obj)
+
+    def undo(self, scene):
+        self.obj.move_by(-self.dx, -self.dy)
+        scene.moved(self.obj)
+
+    def merge(self, other):
+        if isinstance(other, MoveBy) and other.obj is self.obj:
+            self.dx += other.dx
+            self.dy += other.dy
+            return True
+        return False
+
+    def journal(self, scene, undone):
+        return [_object_record(scene, self.obj)]
+
+
+class MoveHandle(Command):
+    # handle moves may re-canonicalize endpoints, so keep both endpoint pairs
+    def __init__(self, obj, before, after):
+        self.obj = obj
+        self.before = before
+        self.after = after
+
+    def _set(self, scene, pts):
+        self.obj.p1, self.obj.p2 = pts
+        scene.moved(self.obj)
+
+    def redo(self, scene):
+        self._set(scene, self.after)
+
+    def undo(self, scene):
+        self._set(scene, self.before)
+
+    def merge(self, other):
+        if isinstance(other, MoveHandle) and other.obj is self.obj:
+            self.after = other.after
+            return True
+        return False
+
+    def journal(self, scene, undone):
+        return [_object_record(scene, self.obj)]
+
+
+class SetScale(Command):
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+
+    def redo(self, scene):
+        scene.set_scale(self.new)
+
+    def undo(self, scene):
+        scene.set_scale(self.old)
+
+    def size(self):
+        return COMMAND_BYTES + OBJECT_BYTES * ((self.old is not None) + (self.new is not None))
+
+    def journal(self, scene, undone):
+        obj = scene.scale_object
+        return [{'op': 'scale', 'obj': obj.to_dict() if obj is not None else None}]
+
+
+class SetWidth(Command):
+    def __init__(self, old_widths, new_width):
+        # old_widths: list of (obj, width) captured before the change
+        self.old_widths = old_widths
+        self.new_width = new_width
+
+    def redo(self, scene):
+        for obj, _w in self.old_widths:
+            obj.width = self.new_width
+
+    def undo(self, scene):
+        for obj, w in self.old_widths:
+            obj.width = w
+
+    def merge(self, other):
+        if isinstance(other, SetWidth) and len(other.old_widths) == len(self.old_widths):
+            self.new_width = other.new_width
+            return True
+        return False
+
+    def size(self):
+        return COMMAND_BYTES + 16 * len(self.old_widths)
+
+    def journal(self, scene, undone):
+        if undone:
+            return [_object_record(scene, obj) for obj, _w in self.old_widths]
+        return [{'op': 'width', 'width': self.new_width}]
+
+
+class History:
+    """Undo/redo journal of commands bounded by a memory budget.
+
+    Commands recorded between `begin_gesture` and `end_gesture` are merged
+    into one entry where possible, so a whole drag undoes in one step.
+    `listener(cmd, undone)` is called after every recorded, undone or redone
+    command (e.g. to journal it).
+    """
+    def __init__(self, budget_bytes=UNDO_BUDGET_BYTES, listener=None):
+        self.budget_bytes = int(budget_bytes)
+        self.listener = listener
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.bytes_used = 0
+        self._gesture = False
+        self._gesture_cmd = None
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def begin_gesture(self):
+        self._gesture = True
+        self._gesture_cmd = None
+
+    def end_gesture(self):
+        self._gesture = False
+        self._gesture_cmd = None
+
+    def record(self, cmd):
+        """Push an already-applied command, merging it into the open gesture if possible."""
+        self._notify(cmd, False)
+        top = self.undo_stack[-1] if self.undo_stack else None
+        if self._gesture and top is not None and top is self._gesture_cmd:
+            before = top.size()
+            if top.merge(cmd):
+                self.bytes_used += top.size() - before
+                return
+        self.undo_stack.append(cmd)
+        self.bytes_used += cmd.size()
+        for c in self.redo_stack:
+            self.bytes_used -= c.size()
+        self.redo_stack.clear()
+        if self._gesture:
+            self._gesture_cmd = cmd
+        # drop the oldest entries once over budget (always keep the newest)
+        while self.bytes_used > self.budget_bytes and len(self.undo_stack) > 1:
+            self.bytes_used -= self.undo_stack.popleft().size()
+
+    def undo(self, scene):
+        if not self.undo_stack:
+            return None
+        self.end_gesture()
+        cmd = self.undo_stack.pop()
+        cmd.undo(scene)
+        self.redo_stack.append(cmd)
+        self._notify(cmd, True)
+        return cmd
+
+    def redo(self, scene):
+        if not self.redo_stack:
+            return None
+        self.end_gesture()
+        cmd = self.redo_stack.pop()
+        cmd.redo(scene)
+        self.undo_stack.append(cmd)
+        self._notify(cmd, False)
+        return cmd
+
+    def _notify(self, cmd, undone):
+        if self.listener is not None:
+            try:
+                self.listener(cmd, undone)
+            except Exception:
+                pass
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.bytes_used = 0
+        self.end_gesture()
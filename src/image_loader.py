@@ -0,0 +1,128 @@
+import itertools
+import threading
+import pygame
+from pyramid import ImagePyramid
+from pixel_cache import source_key
+
+# posted from the worker thread; both carry `job_id`
+IMAGE_PREVIEW = pygame.event.custom_type()  # attrs: pyramid, size
+IMAGE_LOADED = pygame.event.custom_type()   # attrs: path, image, pyramid, error
+PREVIEW_MAX_SIDE = 1024
+
+_job_ids = itertools.count(1)
+# PIL.Image once imported, False when Pillow is not available
+_pil_image = None
+
+
+def _pil():
+    # optional: Pillow can decode JPEGs at reduced resolution (draft mode) for a quick preview;
+    # imported on the first preview so startup does not pay for it
+    global _pil_image
+    if _pil_image is None:
+        try:
+            from PIL import Image
+            _pil_image = Image
+        except Exception:
+            _pil_image = False
+    return _pil_image
+
+
+def decode_preview(path, max_side=PREVIEW_MAX_SIDE):
+    """Return (surface, full_size) using the decoder's reduced-resolution path, or None."""
+    pil_image = _pil()
+    if not pil_image:
+        return None
+    with pil_image.open(path) as im:
+        # only JPEG has a draft path; anything else would cost a full decode
+        if im.format != 'JPEG':
+            return None
+        full_size = im.size
+        im.draft('RGB', (max_side, max_side))
+        im = im.convert('RGBA')
+        im.thumbnail((max_side, max_side))
+        frombytes = getattr(pygame.image, 'frombytes', None) or pygame.image.fromstring
+        return frombytes(im.tobytes(), im.size, 'RGBA'), full_size
+
+
+def load_full(path):
+    """Decode `path` into a 32-bit surface with alpha."""
+    img = pygame.image.load(path)
+    try:
+        return img.convert_alpha()
+    except Exception:
+        # no display (or unsupported format): convert without one
+        if img.get_bitsize() == 32 and img.get_flags() & pygame.SRCALPHA:
+            return img
+        out = pygame.Surface(img.get_size(), pygame.SRCALPHA, 32)
+        out.blit(img, (0, 0))
+        return out
+
+
+class ImageLoadJob(threading.Thread):
+    """Decodes an image off the UI thread.
+
+    Posts IMAGE_PREVIEW with a low-resolution pyramid when a reduced decode is
+    available, then IMAGE_LOADED with the full image and its pyramid (or an
+    error). A cancelled job stops at the next stage and posts nothing more.
+    With a `cache` (see pixel_cache.PixelCache) a cached image is mapped
+    instead of decoded, and a decoded one is stored after IMAGE_LOADED.
+    """
+    def __init__(self, path, cache=None):
+        super().__init__(daemon=True)
+        self.path = path
+        self.cache = cache
+        self.job_id = next(_job_ids)
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def _post(self, etype, **attrs):
+        if self.cancelled:
+            return
+        try:
+            pygame.event.post(pygame.event.Event(etype, job_id=self.job_id, **attrs))
+        except Exception:
+            pass
+
+    def run(self):
+        key = None
+        if self.cache is not None:
+            try:
+                key = source_key(self.path)
+                img = self.cache.load(self.path, key)
+            except Exception:
+                img = None
+            if img is not None:
+                # no decode at all, so no preview either
+                if not self.cancelled:
+                    self._post(IMAGE_LOADED, path=self.path, image=img, pyramid=ImagePyramid(img), error=None)
+                return
+        try:
+            preview = decode_preview(self.path)
+        except Exception:
+            preview = None
+        if preview is not None and not self.cancelled:
+            surf, full_size = preview
+            self._post(IMAGE_PREVIEW, pyramid=ImagePyramid(surf, source_size=full_size), size=full_size)
+        if self.cancelled:
+            return
+        try:
+            img = load_full(self.path)
+            if self.cancelled:
+                return
+            pyr = ImagePyramid(img)
+            self._post(IMAGE_LOADED, path=self.path, image=img, pyramid=pyr, error=None)
+        except Exception as e:
+            self._post(IMAGE_LOADED, path=self.path, image=None, pyramid=None, error=e)
+            return
+        if key is not None and not self.cancelled:
+            # the image is already on screen; the next open of this file maps it instead
+            try:
+                self.cache.store(self.path, img, key)
+            except Exception as e:
+                print('Pixel cache write failed:', e)
@@ -0,0 +1,88 @@
+import pygame
+
+# generous room around an object's endpoints for arrows, caps, handles and labels
+DECORATION_MARGIN = 40
+# label extent in display pixels at text scale 1.0 (base font is 20 px)
+LABEL_EXTENT = 120
+# above this share of the screen a single full redraw is cheaper than many rects
+FULL_REDRAW_RATIO = 0.6
+MAX_RECTS = 12
+
+
+class DirtyRegions:
+    """Collects screen rectangles that must be redrawn before the next update."""
+    def __init__(self, size):
+        self.screen_rect = pygame.Rect(0, 0, size[0], size[1])
+        self.rects = []
+        self.full = True
+
+    def resize(self, size):
+        self.screen_rect = pygame.Rect(0, 0, size[0], size[1])
+        self.mark_all()
+
+    def mark_all(self):
+        self.full = True
+        self.rects = []
+
+    def mark(self, rect):
+        if self.full or rect is None:
+            return
+        r = pygame.Rect(rect).clip(self.screen_rect)
+        if r.w > 0 and r.h > 0:
+            self.rects.append(r)
+
+    def __bool__(self):
+        return self.full or bool(self.rects)
+
+    def take(self):
+        """Return the merged list of rects to redraw and reset the collector."""
+        if self.full:
+            rects = [self.screen_rect.copy()]
+        else:
+            rects = _merge(self.rects)
+            area = sum(r.w * r.h for r in rects)
+            screen_area = self.screen_rect.w * self.screen_rect.h
+            if len(rects) > MAX_RECTS or area > screen_area * FULL_REDRAW_RATIO:
+                rects = [self.screen_rect.copy()]
+        self.full = False
+        self.rects = []
+        return rects
+
+
+def _merge(rects):
+    # repeatedly union overlapping rects so every area is redrawn once
+    out = []
+    for r in rects:
+        r = r.copy()
+        merged = True
+        while merged:
+            merged = False
+            for i, o in enumerate(out):
+                if r.colliderect(o) or r.contains(o) or o.contains(r):
+                    r.union_ip(o)
+                    out.pop(i)
+                    merged = True
+                    break
+        out.append(r)
+    return out
+
+
+def screen_rect_for_points(p1, p2, margin):
+    # bounding screen rect of two screen points, grown by `margin` on each side
+    x0 = min(p1[0], p2[0])
+    y0 = min(p1[1], p2[1])
+    w = abs(p2[0] - p1[0])
+    h = abs(p2[1] - p1[1])
+    return pygame.Rect(int(x0 - margin), int(y0 - margin), int(w + 2 * margin + 1), int(h + 2 * margin + 1))
+
+
+def decoration_margin(width, text_scale):
+    return DECORATION_MARGIN + int(width) * 3 + int(LABEL_EXTENT * max(0.0, text_scale))
+
+
+def object_screen_rect(obj, image_rect, image_scale, text_scale):
+    """Screen rect covering everything `obj.draw` and the selection overlay may paint."""
+    x0, y0, x1, y1 = obj.bounds()
+    p1 = (image_rect.x + x0 * image_scale, image_rect.y + y0 * image_scale)
+    p2 = (image_rect.x + x1 * image_scale, image_rect.y + y1 * image_scale)
+    return screen_rect_for_points(p1, p2, decoration_margin(getattr(obj, 'width', 1), text_scale))
@@ -0,0 +1,198 @@
+import glob
+import json
+import os
+import time
+import uuid
+
+# one journal file per session: journal-<session>.jsonl next to autosave.json
+JOURNAL_PATTERN = 'journal-{}.jsonl'
+# compact (snapshot + truncate) after this many records or seconds
+COMPACT_RECORDS = 500
+COMPACT_SECONDS = 120.0
+# in the projects root while a journal is open; left behind by a crash
+ACTIVE_MARKER = '.autosave-active.json'
+# unsaved work (no project folder yet) is journaled here; hidden from the project index
+AUTOSAVE_FOLDER = '.autosave'
+
+
+def journal_path(proj_dir, session):
+    return os.path.join(proj_dir, JOURNAL_PATTERN.format(session))
+
+
+def autosave_file(proj_dir):
+    """Path of the autosave snapshot in `proj_dir` if it is newer than the saved project, else None."""
+    from project_loader import AUTOSAVE_FILE, project_file
+    path = os.path.join(proj_dir, AUTOSAVE_FILE)
+    try:
+        mtime = os.path.getmtime(path)
+    except Exception:
+        return None
+    saved = project_file(proj_dir)
+    try:
+        # an explicit save after the snapshot holds everything the snapshot had
+        if saved is not None and os.path.getmtime(saved) > mtime:
+            return None
+    except Exception:
+        pass
+    return path
+
+
+class SceneJournal:
+    """Append-only log of scene edits that belongs to an autosave.json snapshot.
+
+    Every line is one record with a growing `seq`. A snapshot stores the
+    session and the last seq it contains (`journal_session`, `journal_seq`),
+    so replay applies only the newer records of that session. A new session
+    writes to its own file, so an older snapshot's journal stays usable until
+    a snapshot of the new session is on disk. The saved project.json is
+    never touched; only P and quicksave write it.
+    """
+    def __init__(self, proj_dir):
+        self.proj_dir = proj_dir
+        self.session = uuid.uuid4().hex
+        self.path = journal_path(proj_dir, self.session)
+        self.seq = 0
+        self.snapshot_seq = 0
+        self.snapshot_time = time.monotonic()
+        self._confirmed = False
+        os.makedirs(proj_dir, exist_ok=True)
+        self._fh = open(self.path, 'w', encoding='utf-8')
+
+    def append(self, records):
+        """Append records (dicts with an `op`) and flush; a few hundred bytes per edit."""
+        if not records or self._fh is None:
+            return
+        for rec in records:
+            self.seq += 1
+            rec = dict(rec)
+            rec['seq'] = self.seq
+            self._fh.write(json.dumps(rec, separators=(',', ':')))
+            self._fh.write('\n')
+        self._fh.flush()
+
+    def pending(self):
+        # records not yet covered by a snapshot on disk
+        return self.seq - self.snapshot_seq
+
+    def needs_compaction(self):
+        pending = self.pending()
+        return pending >= COMPACT_RECORDS or (pending > 0 and time.monotonic() - self.snapshot_time >= COMPACT_SECONDS)
+
+    def snapshot_fields(self):
+        """Fields for an autosave.json that contains everything up to the current record."""
+        self.snapshot_time = time.monotonic()
+        return {'journal_session': self.session, 'journal_seq': self.seq}
+
+    def compacted(self, seq):
+        """A snapshot up to `seq` is on disk: drop the records it contains."""
+        if self._fh is None:
+            return
+        if not self._confirmed:
+            # the project now points at this session; older journals are obsolete
+            self._confirmed = True
+            for p in glob.glob(os.path.join(self.proj_dir, JOURNAL_PATTERN.format('*'))):
+                if p != self.path:
+                    try:
+                        os.remove(p)
+                    except Exception:
+                        pass
+        if seq <= self.snapshot_seq:
+            return
+        self._fh.close()
+        keep = [rec for rec in _read_lines(self.path) if rec.get('seq', 0) > seq]
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            for rec in keep:
+                fh.write(json.dumps(rec, separators=(',', ':')))
+                fh.write('\n')
+        os.replace(tmp, self.path)
+        self._fh = open(self.path, 'a', encoding='utf-8')
+        self.snapshot_seq = seq
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def _read_lines(path):
+    out = []
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    out.append(json.loads(line))
+                except Exception:
+                    # a crash can leave a torn last line
+                    break
+    except Exception:
+        pass
+    return out
+
+
+def read_journal(proj_dir, session, after_seq=0):
+    """Records of `session` newer than `after_seq` (the ones its snapshot lacks)."""
+    if not session:
+        return []
+    return [rec for rec in _read_lines(journal_path(proj_dir, session)) if rec.get('seq', 0) > after_seq]
+
+
+def apply_records(scene, records, object_from_dict, grid=None):
+    """Replay journal records onto `scene`; grid records update the returned `grid` dict."""
+    grid = dict(grid or {})
+    for rec in records:
+        op = rec.get('op')
+        try:
+            if op == 'add':
+                scene.add(object_from_dict(rec['obj']), rec.get('pos'))
+            elif op == 'delete':
+                scene.remove(scene.objects[rec['pos']])
+            elif op == 'set':
+                obj = scene.objects[rec['pos']]
+                new = object_from_dict(rec['obj'])
+                obj.p1, obj.p2 = new.p1, new.p2
+                obj.width = new.width
+                scene.moved(obj)
+            elif op == 'scale':
+                scene.set_scale(object_from_dict(rec['obj']) if rec.get('obj') else None)
+            elif op == 'width':
+                if scene.scale_object is not None:
+                    scene.scale_object.width = rec['width']
+                for obj in scene.objects:
+                    obj.width = rec['width']
+            elif op == 'grid':
+                grid['spacing_m'] = rec.get('spacing_m', grid.get('spacing_m'))
+                grid['offset_px'] = rec.get('offset_px', grid.get('offset_px'))
+                grid['offset_scale'] = rec.get('offset_scale', grid.get('offset_scale'))
+        except Exception:
+            # a record that no longer applies (e.g. after a torn write) is skipped
+            continue
+    return grid
+
+
+def mark_active(root, proj_dir):
+    try:
+        with open(os.path.join(root, ACTIVE_MARKER), 'w', encoding='utf-8') as fh:
+            json.dump({'dir': proj_dir}, fh)
+    except Exception:
+        pass
+
+
+def clear_active(root):
+    try:
+        os.remove(os.path.join(root, ACTIVE_MARKER))
+    except Exception:
+        pass
+
+
+def read_active(root):
+    """Project folder of a session that did not shut down cleanly, or None."""
+    try:
+        with open(os.path.join(root, ACTIVE_MARKER), 'r', encoding='utf-8') as fh:
+            d = json.load(fh).get('dir')
+        if not d:
+            return None
+        from project_loader import project_file
+        return d if autosave_file(d) or project_file(d) else None
+    except Exception:
+        return None
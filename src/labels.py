@@ -0,0 +1,114 @@
+import math
+import time
+from collections import OrderedDict
+import pygame
+
+LABEL_COLOR = (255, 220, 80)
+SHADOW_COLOR = (10, 10, 10)
+BASE_LABEL_SIZE = 20
+# prefer a monospace/tabular-number font so digits render uniformly
+MONO_FONTS = ['Consolas', 'Segoe UI Mono', 'Courier New', 'DejaVu Sans Mono']
+# label scales are snapped to powers of this step so zooming reuses cached surfaces
+SCALE_STEP = 1.05
+LABEL_CACHE_SIZE = 2048
+# labels are rasterized by a font of the quantized pixel size, within these limits
+MIN_FONT_PX = 4
+MAX_FONT_PX = 200
+
+
+def resolve_label_font_path():
+    """Path of the preferred monospace font, or None for pygame's default font."""
+    for name in MONO_FONTS:
+        try:
+            m = pygame.font.match_font(name)
+            if m:
+                return m
+        except Exception:
+            continue
+    return None
+
+
+def resolve_label_font(size=BASE_LABEL_SIZE):
+    """Return the preferred monospace font at `size`, falling back to the default font."""
+    fpath = resolve_label_font_path()
+    if fpath:
+        try:
+            return pygame.font.Font(fpath, size)
+        except Exception:
+            pass
+    return pygame.font.SysFont(None, size)
+
+
+class LabelRenderer:
+    """Renders dimension labels once and serves them from a bounded LRU cache.
+
+    A label at `scale` is drawn by a real font of the quantized pixel size
+    `font_px(scale)` (fonts are opened once per size), so text stays sharp at
+    every zoom and nothing is resampled. Entries are keyed by (text, colour,
+    pixel size) and hold the final (shadow, text) surface pair, so drawing a
+    label that was already seen is just two blits.
+    """
+    def __init__(self, font=None, max_entries=LABEL_CACHE_SIZE):
+        # an explicitly passed font stands for the default face at BASE_LABEL_SIZE
+        self._font_path = resolve_label_font_path() if font is None else None
+        self.font = font if font is not None else self._open(BASE_LABEL_SIZE)
+        self._fonts = {BASE_LABEL_SIZE: self.font}
+        self.max_entries = int(max_entries)
+        self._cache = OrderedDict()
+        # profiling counters: labels served, and time spent when `timed` is set
+        self.rendered = 0
+        self.render_time = 0.0
+        self.timed = False
+
+    def _open(self, size):
+        if self._font_path:
+            try:
+                return pygame.font.Font(self._font_path, size)
+            except Exception:
+                self._font_path = None
+        return pygame.font.SysFont(None, size)
+
+    def get_linesize(self):
+        return self.font.get_linesize()
+
+    def bucket(self, scale):
+        s = max(0.01, float(scale))
+        return int(round(math.log(s) / math.log(SCALE_STEP)))
+
+    def font_px(self, scale):
+        """Pixel size of the font used for labels at `scale`."""
+        px = int(round(BASE_LABEL_SIZE * SCALE_STEP ** self.bucket(scale)))
+        return max(MIN_FONT_PX, min(MAX_FONT_PX, px))
+
+    def font_for(self, px):
+        font = self._fonts.get(px)
+        if font is None:
+            font = self._fonts[px] = self._open(px)
+        return font
+
+    def render(self, text, scale=1.0, color=LABEL_COLOR):
+        """Return the (shadow, text) surfaces for `text` drawn at `scale`."""
+        self.rendered += 1
+        if not self.timed:
+            return self._render(text, scale, color)
+        t0 = time.perf_counter()
+        try:
+            return self._render(text, scale, color)
+        finally:
+            self.render_time += time.perf_counter() - t0
+
+    def _render(self, text, scale, color):
+        key = (text, tuple(color), self.font_px(scale))
+        hit = self._cache.get(key)
+        if hit is not None:
+            self._cache.move_to_end(key)
+            return hit
+        font = self.font_for(key[2])
+        pair = (font.render(text, True, SHADOW_COLOR), font.render(text, True, color))
+        self._cache[key] = pair
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return pair
+
+    def clear(self):
+        self._cache.clear()
@@ -0,0 +1,107 @@
+import numpy as np
+import pygame
+
+from labels import BASE_LABEL_SIZE
+from objects.base import DETAIL_LINE, DETAIL_DECOR, DETAIL_FULL
+
+# below DETAIL_LINE: too small to draw one by one; rasterized together by `draw_merged`
+DETAIL_MERGED = 0
+# screen extent (larger of |dx|, |dy|, in pixels) an object needs for each level
+MERGE_PX = 12
+DECORATION_PX = 24
+LABEL_PX = 48
+# labels smaller than this many pixels are unreadable and skipped
+MIN_LABEL_PX = 7
+# at most this many objects are drawn one by one per frame; the smaller rest are merged
+DRAW_BUDGET = 1000
+
+
+def detail_levels(screen_pts, text_scale=1.0, budget=DRAW_BUDGET):
+    """Detail level per row of an (n, 4) array of screen endpoints.
+
+    Objects shorter than MERGE_PX are merged, shorter than DECORATION_PX are
+    drawn without arrows/caps, and labels need LABEL_PX of object and a text
+    size of at least MIN_LABEL_PX. Beyond `budget` objects only the largest
+    are drawn one by one.
+    """
+    ext = np.maximum(np.abs(screen_pts[:, 2] - screen_pts[:, 0]), np.abs(screen_pts[:, 3] - screen_pts[:, 1]))
+    full = DETAIL_FULL if BASE_LABEL_SIZE * text_scale >= MIN_LABEL_PX else DETAIL_DECOR
+    levels = np.full(len(ext), full, dtype=np.int8)
+    levels[ext < LABEL_PX] = DETAIL_DECOR
+    levels[ext < DECORATION_PX] = DETAIL_LINE
+    merge_px = MERGE_PX
+    if budget is not None and len(ext) > budget:
+        # extent of the budget-th largest object
+        merge_px = max(merge_px, np.partition(ext, len(ext) - budget)[len(ext) - budget])
+    levels[ext < merge_px] = DETAIL_MERGED
+    return levels
+
+
+def _segments(screen_pts, boxes):
+    # segment endpoints (m, 4) and the row each belongs to; boxes become their four edges
+    seg = screen_pts[~boxes]
+    owner = np.flatnonzero(~boxes)
+    if boxes.any():
+        b = screen_pts[boxes]
+        x1, y1, x2, y2 = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+        edges = np.concatenate([
+            np.stack((x1, y1, x2, y1), axis=1), np.stack((x2, y1, x2, y2), axis=1),
+            np.stack((x2, y2, x1, y2), axis=1), np.stack((x1, y2, x1, y1), axis=1)])
+        seg = np.concatenate((seg, edges))
+        owner = np.concatenate((owner, np.tile(np.flatnonzero(boxes), 4)))
+        # back to row order, so drawing order matches the scene
+        order = np.argsort(owner, kind='stable')
+        seg, owner = seg[order], owner[order]
+    return seg, owner
+
+
+def _sample(seg, clip):
+    # pixel positions along each segment (one sample per pixel of its bucket), inside `clip`
+    ext = np.maximum(np.abs(seg[:, 2] - seg[:, 0]), np.abs(seg[:, 3] - seg[:, 1]))
+    # segments are grouped by length (powers of two) so short ones are not oversampled
+    bucket = np.ceil(np.log2(np.maximum(ext, 1))).astype(np.int64)
+    xs, ys, idx = [], [], []
+    for b in np.unique(bucket).tolist():
+        sel = np.flatnonzero(bucket == b)
+        t = np.linspace(0.0, 1.0, (1 << b) + 1, dtype=np.float32)
+        s = seg[sel].astype(np.float32)
+        xs.append((s[:, 0:1] + (s[:, 2:3] - s[:, 0:1]) * t + 0.5).astype(np.int32).ravel())
+        ys.append((s[:, 1:2] + (s[:, 3:4] - s[:, 1:2]) * t + 0.5).astype(np.int32).ravel())
+        idx.append(np.repeat(sel, len(t)))
+    xs, ys, idx = np.concatenate(xs), np.concatenate(ys), np.concatenate(idx)
+    # keep the original segment order (buckets interleave rows)
+    order = np.argsort(idx, kind='stable')
+    xs, ys, idx = xs[order], ys[order], idx[order]
+    inside = ((xs - clip.left).astype(np.uint32) < clip.width) & ((ys - clip.top).astype(np.uint32) < clip.height)
+    return xs[inside], ys[inside], idx[inside]
+
+
+def draw_merged(surface, screen_pts, colors, boxes):
+    """Rasterize many small objects as 1-pixel outlines in a single array pass.
+
+    `boxes` marks rows drawn as rectangles; the rest are segments. Returns
+    the number of pixels written.
+    """
+    if not len(screen_pts):
+        return 0
+    seg, owner = _segments(screen_pts, np.asarray(boxes, dtype=bool))
+    xs, ys, idx = _sample(seg, surface.get_clip())
+    if not len(xs):
+        return 0
+    rows = owner[idx]
+    packed = (colors[:, 0].astype(np.int64) << 16) | (colors[:, 1].astype(np.int64) << 8) | colors[:, 2]
+    uniq, inverse = np.unique(packed, return_inverse=True)
+    try:
+        mapped = np.array([surface.map_rgb(((c >> 16) & 255, (c >> 8) & 255, c & 255)) for c in uniq.tolist()],
+                          dtype=np.int64)
+        px = pygame.surfarray.pixels2d(surface)
+        try:
+            # samples are in row order and written in sequence, so the top-most object wins a shared pixel
+            px[xs, ys] = mapped[inverse.ravel()[rows]].astype(px.dtype)
+        finally:
+            del px
+    except Exception:
+        # surfaces that cannot be viewed as an array (e.g. 24-bit)
+        for x, y, r in zip(xs.tolist(), ys.tolist(), rows.tolist()):
+            surface.set_at((x, y), colors[r].tolist())
+    return len(xs)
@@ -1,7 +1,118 @@
+# `detail` levels for `draw` (see lod.py): geometry only, plus arrows/caps, plus labels
+DETAIL_LINE = 1
+DETAIL_DECOR = 2
+DETAIL_FULL = 3
+
+
 class CanvasObject:
-    """Base class for drawable objects tied to the original image coordinates."""
-    def draw(self, surface, image_rect, image_scale, font):
+    """Base class for drawable objects tied to the original image coordinates.
+
+    While an object is part of a scene its fields live in a row of the scene's
+    `ObjectStore` and the attributes below are views over that row; detached
+    objects (previews, deleted objects kept for undo) hold them directly.
+    """
+    # 'segment' (hit along the line) or 'box' (hit anywhere inside)
+    shape = 'segment'
+    _store = None
+    _row = -1
+    _p1 = (0, 0)
+    _p2 = (0, 0)
+    _width = 1
+    _color = (255, 255, 255)
+    _meters = None
+
+    def draw(self, surface, image_rect, image_scale, labels, detail=DETAIL_FULL):
         raise NotImplementedError()
 
+    def _detached_values(self):
+        return (self._p1, self._p2, self._width, self._color, self._meters)
+
+    def _restore_values(self, values):
+        self._p1, self._p2, self._width, self._color, self._meters = values
+
+    @property
+    def p1(self):
+        if self._store is None:
+            return self._p1
+        return tuple(self._store.pts[self._row, 0:2].tolist())
+
+    @p1.setter
+    def p1(self, value):
+        if self._store is None:
+            self._p1 = tuple(value)
+        else:
+            self._store.pts[self._row, 0:2] = value
+            self._store.touch()
+
+    @property
+    def p2(self):
+        if self._store is None:
+            return self._p2
+        return tuple(self._store.pts[self._row, 2:4].tolist())
+
+    @p2.setter
+    def p2(self, value):
+        if self._store is None:
+            self._p2 = tuple(value)
+        else:
+            self._store.pts[self._row, 2:4] = value
+            self._store.touch()
+
+    @property
+    def width(self):
+        if self._store is None:
+            return self._width
+        return int(self._store.width[self._row])
+
+    @width.setter
+    def width(self, value):
+        if self._store is None:
+            self._width = value
+        else:
+            self._store.width[self._row] = int(value)
+            self._store.touch()
+
+    @property
+    def color(self):
+        if self._store is None:
+            return self._color
+        return tuple(self._store.color[self._row].tolist())
+
+    @color.setter
+    def color(self, value):
+        if self._store is None:
+            self._color = value
+        else:
+            self._store.color[self._row] = tuple(value)[:3]
+
+    @property
+    def meters(self):
+        if self._store is None:
+            return self._meters
+        m = float(self._store.meters[self._row])
+        return None if m != m else m
+
+    @meters.setter
+    def meters(self, value):
+        if self._store is None:
+            self._meters = value
+        else:
+            self._store.meters[self._row] = float('nan') if value is None else float(value)
+
+    def screen_points(self, image_rect, image_scale):
+        """(x1, y1, x2, y2) on screen; attached objects read the store's per-frame transform."""
+        if self._store is not None:
+            return tuple(self._store.screen_points(image_rect, image_scale)[self._row].tolist())
+        x1, y1 = self.p1
+        x2, y2 = self.p2
+        return (image_rect.x + int(x1 * image_scale), image_rect.y + int(y1 * image_scale),
+                image_rect.x + int(x2 * image_scale), image_rect.y + int(y2 * image_scale))
+
+    def bounds(self):
+        # axis-aligned box (xmin, ymin, xmax, ymax) in original-image pixels
+        x1, y1 = self.p1
+        x2, y2 = self.p2
+        return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
     def to_dict(self):
         return {}
@@ -1,5 +1,5 @@
 import math
-from .base import CanvasObject
+from .base import CanvasObject, DETAIL_DECOR, DETAIL_FULL
 import pygame
 
 class MeasureLine(CanvasObject):
@@ -27,11 +27,8 @@ class MeasureLine(CanvasObject):
             except Exception:
                 pass
 
-    def draw(self, surface, image_rect, image_scale, font, pixels_per_meter=None, width=None, label_scale=1.0):
-        x1 = image_rect.x + int(self.p1[0] * image_scale)
-        y1 = image_rect.y + int(self.p1[1] * image_scale)
-        x2 = image_rect.x + int(self.p2[0] * image_scale)
-        y2 = image_rect.y + int(self.p2[1] * image_scale)
+    def draw(self, surface, image_rect, image_scale, labels, pixels_per_meter=None, width=None, label_scale=1.0, detail=DETAIL_FULL):
+        x1, y1, x2, y2 = self.screen_points(image_rect, image_scale)
         draw_w = int(self.width if width is None else width)
         # anti-aliased thin line for smoothness, otherwise regular line with width
         try:
@@ -41,6 +38,8 @@ class MeasureLine(CanvasObject):
                 pygame.draw.line(surface, self.color, (x1, y1), (x2, y2), draw_w)
         except Exception:
             pygame.draw.line(surface, self.color, (x1, y1), (x2, y2), max(1, draw_w))
+        if detail < DETAIL_DECOR:
+            return
         # arrows (point outward)
         # arrows (size scales with line width)
         arrow_size = max(6, int(draw_w * 3))
@@ -48,6 +47,8 @@ class MeasureLine(CanvasObject):
         self.draw_arrow(surface, self.color, (x2, y2), (x1, y1), size=arrow_size)
         # arrow at p2 pointing away from p1
         self.draw_arrow(surface, self.color, (x1, y1), (x2, y2), size=arrow_size)
+        if detail < DETAIL_FULL:
+            return
         # text: compute lengths from original-image coordinates (stable across pan/zoom)
         midx = (x1 + x2) // 2
         midy = (y1 + y2) // 2
@@ -73,20 +74,9 @@ class MeasureLine(CanvasObject):
         # offset in display pixels; scale with line width so label stays readable
         base_offset = max(4, draw_w * 3)
 
-        # render text using base font then smoothscale so the whole string scales uniformly
+        # cached label surfaces, already scaled uniformly for the whole string
         try:
-            base_shadow = font.render(txt, True, (10, 10, 10))
-            base_img = font.render(txt, True, (255, 220, 80))
-            # target scale in both axes
-            s = max(0.01, float(label_scale))
-            tw = max(1, int(base_img.get_width() * s))
-            th = max(1, int(base_img.get_height() * s))
-            try:
-                shadow = pygame.transform.smoothscale(base_shadow, (tw, th))
-                img_s = pygame.transform.smoothscale(base_img, (tw, th))
-            except Exception:
-                shadow = pygame.transform.scale(base_shadow, (tw, th))
-                img_s = pygame.transform.scale(base_img, (tw, th))
+            shadow, img_s = labels.render(txt, label_scale)
             # position label so its nearest edge to the line is at base_offset from the line
             padding = 4
             center_offset = base_offset + img_s.get_height() // 2 + padding
@@ -97,15 +87,19 @@ class MeasureLine(CanvasObject):
         except Exception:
             pass
 
+    @classmethod
+    def from_dict(cls, d):
+        p1 = tuple(d.get('p1', (0, 0)))
+        p2 = tuple(d.get('p2', (0, 0)))
+        width = int(d.get('width', 2))
+        return cls(p1, p2, d.get('meters'), width=width)
+
     def to_dict(self):
         return {"type": "measure", "p1": self.p1, "p2": self.p2, "meters": self.meters, "width": self.width}
 
     def hit_test(self, sx, sy, image_rect, image_scale, tol=8):
         # screen coords
-        x1 = image_rect.x + int(self.p1[0] * image_scale)
-        y1 = image_rect.y + int(self.p1[1] * image_scale)
-        x2 = image_rect.x + int(self.p2[0] * image_scale)
-        y2 = image_rect.y + int(self.p2[1] * image_scale)
+        x1, y1, x2, y2 = self.screen_points(image_rect, image_scale)
         # compute distance from point to segment
         px = sx - x1
         py = sy - y1
@@ -130,10 +124,7 @@ class MeasureLine(CanvasObject):
 
     def hit_test_handle(self, sx, sy, image_rect, image_scale, tol=8):
         # return 0 if near p1, 1 if near p2, else None
-        x1 = image_rect.x + int(self.p1[0] * image_scale)
-        y1 = image_rect.y + int(self.p1[1] * image_scale)
-        x2 = image_rect.x + int(self.p2[0] * image_scale)
-        y2 = image_rect.y + int(self.p2[1] * image_scale)
+        x1, y1, x2, y2 = self.screen_points(image_rect, image_scale)
         d1 = (sx - x1) ** 2 + (sy - y1) ** 2
         d2 = (sx - x2) ** 2 + (sy - y2) ** 2
         if d1 <= tol * tol:
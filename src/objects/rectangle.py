@@ -1,21 +1,20 @@
 import pygame
-import json
+from .base import CanvasObject, DETAIL_FULL
+
+class Rectangle(CanvasObject):
+    shape = 'box'
+    type = 'rect'
 
-class Rectangle:
     def __init__(self, p1, p2, color=(255,200,50), width=2):
         # p1,p2 are in original image coordinates
         self.p1 = tuple(p1)
         self.p2 = tuple(p2)
         self.color = color
         self.width = width
-        self.type = 'rect'
 
-    def draw(self, surface, image_rect, image_scale, font=None, pixels_per_meter=None, label_scale=1.0):
+    def draw(self, surface, image_rect, image_scale, labels=None, pixels_per_meter=None, label_scale=1.0, detail=DETAIL_FULL):
         # convert to screen coords
-        x1 = int(image_rect.x + self.p1[0] * image_scale)
-        y1 = int(image_rect.y + self.p1[1] * image_scale)
-        x2 = int(image_rect.x + self.p2[0] * image_scale)
-        y2 = int(image_rect.y + self.p2[1] * image_scale)
+        x1, y1, x2, y2 = self.screen_points(image_rect, image_scale)
         rx = min(x1, x2)
         ry = min(y1, y2)
         rw = abs(x2 - x1)
@@ -25,7 +24,7 @@ class Rectangle:
         except Exception:
             pygame.draw.rect(surface, self.color, (rx, ry, rw, rh), self.width)
         # draw dimensions (width on top edge, height on left edge)
-        if font is not None:
+        if labels is not None and detail >= DETAIL_FULL:
             # Compute original-image pixel dimensions directly to avoid rounding shifts
             orig_w = abs(self.p2[0] - self.p1[0])
             orig_h = abs(self.p2[1] - self.p1[1])
@@ -39,19 +38,9 @@ class Rectangle:
 
             # width label at midpoint of top edge
             wx = rx + rw // 2
-            wy = ry - max(12, font.get_linesize())
+            wy = ry - max(12, labels.get_linesize())
             try:
-                base_wshadow = font.render(width_txt, True, (10,10,10))
-                base_wimg = font.render(width_txt, True, (255,220,80))
-                s = max(0.01, float(label_scale))
-                tw = max(1, int(base_wimg.get_width() * s))
-                th = max(1, int(base_wimg.get_height() * s))
-                try:
-                    wshadow = pygame.transform.smoothscale(base_wshadow, (tw, th))
-                    wimg = pygame.transform.smoothscale(base_wimg, (tw, th))
-                except Exception:
-                    wshadow = pygame.transform.scale(base_wshadow, (tw, th))
-                    wimg = pygame.transform.scale(base_wimg, (tw, th))
+                wshadow, wimg = labels.render(width_txt, label_scale)
                 # position so nearest edge is base_offset from rect
                 base_offset = max(4, self.width * 3)
                 padding = 4
@@ -62,20 +51,10 @@ class Rectangle:
                 pass
 
             # height label at midpoint of left edge (draw vertically by rendering normally and positioning)
-            hx = rx - max(30, font.get_linesize() + 6)
+            hx = rx - max(30, labels.get_linesize() + 6)
             hy = ry + rh // 2
             try:
-                base_hshadow = font.render(height_txt, True, (10,10,10))
-                base_himg = font.render(height_txt, True, (255,220,80))
-                s2 = max(0.01, float(label_scale))
-                tw2 = max(1, int(base_himg.get_width() * s2))
-                th2 = max(1, int(base_himg.get_height() * s2))
-                try:
-                    hshadow = pygame.transform.smoothscale(base_hshadow, (tw2, th2))
-                    himg = pygame.transform.smoothscale(base_himg, (tw2, th2))
-                except Exception:
-                    hshadow = pygame.transform.scale(base_hshadow, (tw2, th2))
-                    himg = pygame.transform.scale(base_himg, (tw2, th2))
+                hshadow, himg = labels.render(height_txt, label_scale)
                 base_offset_h = max(4, self.width * 3)
                 padding_h = 4
                 # left label midpoint; shift horizontally so nearest edge is base_offset_h from rect
@@ -105,10 +84,7 @@ class Rectangle:
 
     def hit_test(self, sx, sy, image_rect, image_scale, tol=8):
         # screen rect
-        x1 = int(image_rect.x + self.p1[0] * image_scale)
-        y1 = int(image_rect.y + self.p1[1] * image_scale)
-        x2 = int(image_rect.x + self.p2[0] * image_scale)
-        y2 = int(image_rect.y + self.p2[1] * image_scale)
+        x1, y1, x2, y2 = self.screen_points(image_rect, image_scale)
         rx = min(x1, x2)
         ry = min(y1, y2)
         rw = abs(x2 - x1)
@@ -124,10 +100,7 @@ class Rectangle:
 
     def hit_test_handle(self, sx, sy, image_rect, image_scale, tol=8):
         # corners: 0=(x1,y1),1=(x2,y1),2=(x1,y2),3=(x2,y2)
-        x1 = int(image_rect.x + self.p1[0] * image_scale)
-        y1 = int(image_rect.y + self.p1[1] * image_scale)
-        x2 = int(image_rect.x + self.p2[0] * image_scale)
-        y2 = int(image_rect.y + self.p2[1] * image_scale)
+        x1, y1, x2, y2 = self.screen_points(image_rect, image_scale)
         rx = min(x1, x2)
         ry = min(y1, y2)
         rw = abs(x2 - x1)
@@ -1,5 +1,5 @@
 import math
-from .base import CanvasObject
+from .base import CanvasObject, DETAIL_DECOR, DETAIL_FULL
 import pygame
 
 class ScaleLine(CanvasObject):
@@ -20,12 +20,9 @@ class ScaleLine(CanvasObject):
             return None
         return dist / self.meters
 
-    def draw(self, surface, image_rect, image_scale, font, pixels_per_meter=None, width=None, label_scale=1.0):
+    def draw(self, surface, image_rect, image_scale, labels, pixels_per_meter=None, width=None, label_scale=1.0, detail=DETAIL_FULL):
         # Map original-image coords to display coords
-        x1 = image_rect.x + int(self.p1[0] * image_scale)
-        y1 = image_rect.y + int(self.p1[1] * image_scale)
-        x2 = image_rect.x + int(self.p2[0] * image_scale)
-        y2 = image_rect.y + int(self.p2[1] * image_scale)
+        x1, y1, x2, y2 = self.screen_points(image_rect, image_scale)
         # choose width
         draw_w = int(self.width if width is None else width)
         # anti-aliased thin line, otherwise normal line with width
@@ -36,6 +33,8 @@ class ScaleLine(CanvasObject):
                 pygame.draw.line(surface, self.color, (x1, y1), (x2, y2), draw_w)
         except Exception:
             pygame.draw.line(surface, self.color, (x1, y1), (x2, y2), max(1, draw_w))
+        if detail < DETAIL_DECOR:
+            return
         # draw perpendicular end caps
         def draw_perp_cap(surf, x_a, y_a, x_b, y_b, length=10):
             dx = x_b - x_a
@@ -62,6 +61,8 @@ class ScaleLine(CanvasObject):
 
         draw_perp_cap(surface, x1, y1, x2, y2, length=12)
         draw_perp_cap(surface, x2, y2, x1, y1, length=12)
+        if detail < DETAIL_FULL:
+            return
         # label with meters, offset from the line so it's visible beside the cap
         midx = (x1 + x2) // 2
         midy = (y1 + y2) // 2
@@ -79,17 +80,7 @@ class ScaleLine(CanvasObject):
         lx = int(midx + px * offset)
         ly = int(midy + py * offset)
         try:
-            base_shadow = font.render(txt, True, (10, 10, 10))
-            base_img = font.render(txt, True, (255, 220, 80))
-            s = max(0.01, float(label_scale))
-            tw = max(1, int(base_img.get_width() * s))
-            th = max(1, int(base_img.get_height() * s))
-            try:
-                shadow = pygame.transform.smoothscale(base_shadow, (tw, th))
-                img_s = pygame.transform.smoothscale(base_img, (tw, th))
-            except Exception:
-                shadow = pygame.transform.scale(base_shadow, (tw, th))
-                img_s = pygame.transform.scale(base_img, (tw, th))
+            shadow, img_s = labels.render(txt, label_scale)
             # offset so nearest edge stays base_offset from the line
             base_offset = max(4, draw_w * 3)
             padding = 4
@@ -102,10 +93,7 @@ class ScaleLine(CanvasObject):
             pass
 
     def hit_test(self, sx, sy, image_rect, image_scale, tol=8):
-        x1 = image_rect.x + int(self.p1[0] * image_scale)
-        y1 = image_rect.y + int(self.p1[1] * image_scale)
-        x2 = image_rect.x + int(self.p2[0] * image_scale)
-        y2 = image_rect.y + int(self.p2[1] * image_scale)
+        x1, y1, x2, y2 = self.screen_points(image_rect, image_scale)
         dx = x2 - x1
         dy = y2 - y1
         seg_len2 = dx*dx + dy*dy
@@ -126,10 +114,7 @@ class ScaleLine(CanvasObject):
         self.p2 = (self.p2[0] + dx_orig, self.p2[1] + dy_orig)
 
     def hit_test_handle(self, sx, sy, image_rect, image_scale, tol=8):
-        x1 = image_rect.x + int(self.p1[0] * image_scale)
-        y1 = image_rect.y + int(self.p1[1] * image_scale)
-        x2 = image_rect.x + int(self.p2[0] * image_scale)
-        y2 = image_rect.y + int(self.p2[1] * image_scale)
+        x1, y1, x2, y2 = self.screen_points(image_rect, image_scale)
         d1 = (sx - x1) ** 2 + (sy - y1) ** 2
         d2 = (sx - x2) ** 2 + (sy - y2) ** 2
         if d1 <= tol * tol:
@@ -144,5 +129,15 @@ class ScaleLine(CanvasObject):
         elif idx == 1:
             self.p2 = (self.p2[0] + dx_orig, self.p2[1] + dy_orig)
 
+    @classmethod
+    def from_dict(cls, d):
+        p1 = tuple(d.get('p1', (0, 0)))
+        p2 = tuple(d.get('p2', (0, 0)))
+        width = int(d.get('width', 2))
+        if d.get('meters') is None:
+            # a scale line without its length cannot scale anything
+            raise ValueError("scale line has no 'meters'")
+        return cls(p1, p2, d['meters'], width=width)
+
     def to_dict(self):
         return {"type": "scale", "p1": self.p1, "p2": self.p2, "meters": self.meters, "width": self.width}
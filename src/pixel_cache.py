@@ -0,0 +1,173 @@
+import hashlib
+import mmap
+import os
+import struct
+
+import pygame
+
+# kept in the projects root, next to the project folders (like the browser's .index)
+CACHE_FOLDER = '.pixelcache'
+CACHE_EXT = '.px'
+MAGIC = b'FLPX'
+CACHE_VERSION = 1
+# magic, version, header size, pixel format, width, height, key; padded to HEADER_SIZE
+_HEADER = struct.Struct('<4sHH4sII16s')
+HEADER_SIZE = 64
+# FLANER_PIXEL_CACHE_MB limits the folder (least recently used entries go first); 0 turns the cache off
+CACHE_ENV = 'FLANER_PIXEL_CACHE_MB'
+DEFAULT_MAX_MB = 4096
+# smaller images decode quickly enough; caching them would only cost disk space
+MIN_PIXELS = 4_000_000
+# bytes of the source file read from each end for the key
+KEY_SAMPLE = 64 * 1024
+# rows converted per write, so storing never holds a second full copy of the image
+WRITE_ROWS = 256
+
+
+def source_key(path):
+    """16-byte key of an image file: its size and mtime plus a hash of its first and last bytes.
+
+    Project saves copy the plan image with its mtime, so every copy of one
+    scan shares one cache entry.
+    """
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{st.st_size}:{st.st_mtime_ns}".encode('ascii'))
+    with open(path, 'rb') as fh:
+        h.update(fh.read(KEY_SAMPLE))
+        if st.st_size > KEY_SAMPLE:
+            fh.seek(max(KEY_SAMPLE, st.st_size - KEY_SAMPLE))
+            h.update(fh.read(KEY_SAMPLE))
+    return h.digest()
+
+
+def _pixel_format():
+    # the byte order of the usual 32-bit display format, so cached surfaces blit without conversion
+    try:
+        pygame.image.tobytes(pygame.Surface((1, 1), pygame.SRCALPHA, 32), 'BGRA')
+        return 'BGRA'
+    except Exception:
+        return 'RGBA'
+
+
+class PixelCache:
+    """Decoded plan images stored as raw 32-bit pixels, memory-mapped on later opens.
+
+    Each entry is `<key>.px` (see `source_key`): a small header and the rows
+    of the image, which `load` maps copy-on-write and wraps with
+    `pygame.image.frombuffer`, so reopening a plan reads pages on demand
+    instead of decoding it. Entries are touched on every hit and the least
+    recently used ones are removed once the folder exceeds `max_bytes`.
+    """
+    def __init__(self, folder, max_bytes=DEFAULT_MAX_MB << 20, min_pixels=MIN_PIXELS):
+        self.folder = folder
+        self.max_bytes = int(max_bytes)
+        self.min_pixels = int(min_pixels)
+
+    @classmethod
+    def for_root(cls, root, environ=None):
+        """The cache of a projects root, sized from FLANER_PIXEL_CACHE_MB; None when turned off."""
+        value = (environ if environ is not None else os.environ).get(CACHE_ENV, '').strip()
+        try:
+            mb = float(value) if value else DEFAULT_MAX_MB
+        except ValueError:
+            mb = DEFAULT_MAX_MB
+        if mb <= 0:
+            return None
+        return cls(os.path.join(root, CACHE_FOLDER), max_bytes=int(mb * (1 << 20)))
+
+    def entry_path(self, key):
+        return os.path.join(self.folder, key.hex() + CACHE_EXT)
+
+    def load(self, path, key=None):
+        """Surface of `path` from the cache, or None on a miss (or an unusable entry)."""
+        try:
+            key = key or source_key(path)
+            entry = self.entry_path(key)
+            with open(entry, 'rb') as fh:
+                m = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_COPY)
+        except Exception:
+            return None
+        try:
+            magic, version, header_size, fmt, w, h, stored_key = _HEADER.unpack_from(m, 0)
+            if (magic != MAGIC or version != CACHE_VERSION or stored_key != key
+                    or len(m) != header_size + w * h * 4):
+                raise ValueError('stale or damaged pixel cache entry')
+            # the surface keeps the mapping alive; pages are read as they are drawn
+            surf = pygame.image.frombuffer(memoryview(m)[header_size:], (w, h), fmt.decode('ascii'))
+        except Exception:
+            m.close()
+            self._remove(entry)
+            return None
+        try:
+            # the mtime is the LRU clock
+            os.utime(entry)
+        except Exception:
+            pass
+        return surf
+
+    def store(self, path, surface, key=None):
+        """Write `surface` as the entry of `path` (large images only); returns the entry path or None."""
+        w, h = surface.get_size()
+        if w * h < self.min_pixels or w * h * 4 + HEADER_SIZE > self.max_bytes:
+            return None
+        key = key or source_key(path)
+        entry = self.entry_path(key)
+        fmt = _pixel_format()
+        os.makedirs(self.folder, exist_ok=True)
+        tmp = entry + '.tmp'
+        try:
+            with open(tmp, 'wb') as fh:
+                header = _HEADER.pack(MAGIC, CACHE_VERSION, HEADER_SIZE, fmt.encode('ascii'), w, h, key)
+                fh.write(header.ljust(HEADER_SIZE, b'\0'))
+                for y in range(0, h, WRITE_ROWS):
+                    rows = surface.subsurface((0, y, w, min(WRITE_ROWS, h - y)))
+                    fh.write(pygame.image.tobytes(rows, fmt))
+            os.replace(tmp, entry)
+        except Exception:
+            self._remove(tmp)
+            raise
+        self.evict(keep=entry)
+        return entry
+
+    def entries(self):
+        """(mtime, size, path) of every entry, least recently used first."""
+        out = []
+        try:
+            names = os.listdir(self.folder)
+        except Exception:
+            return out
+        for name in names:
+            if not name.endswith(CACHE_EXT):
+                continue
+            p = os.path.join(self.folder, name)
+            try:
+                st = os.stat(p)
+            except Exception:
+                continue
+            out.append((st.st_mtime, st.st_size, p))
+        out.sort()
+        return out
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the folder fits `max_bytes`; returns bytes freed."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _mtime, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            # an entry mapped by a running session can still be unlinked (POSIX) or stays (Windows)
+            if self._remove(p):
+                total -= size
+                freed += size
+        return freed
+
+    def _remove(self, p):
+        try:
+            os.remove(p)
+            return True
+        except Exception:
+            return False
@@ -0,0 +1,140 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+
+import pygame
+
+PHASES = ('events', 'image', 'objects', 'labels', 'grid', 'sidebar', 'flip')
+# frames kept for the statistics and the dump
+HISTORY_FRAMES = 600
+HUD_COLOR = (230, 230, 230)
+HUD_BG = (0, 0, 0, 170)
+HUD_PAD = 6
+# widest HUD line, so the box keeps its size while the numbers change
+HUD_TEMPLATE = "frame p50 888.8  p95 888.8  max 8888.8 ms  (888 frames)"
+# FLANER_PROFILE=1 turns recording and the HUD on at start; a .csv/.json value is also the dump path
+PROFILE_ENV = 'FLANER_PROFILE'
+DEFAULT_DUMP = 'flaner-profile.csv'
+
+
+def _percentile(sorted_vals, q):
+    if not sorted_vals:
+        return 0.0
+    i = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[i]
+
+
+class FrameProfiler:
+    """Per-phase frame timings kept in a ring buffer.
+
+    `begin_frame` starts a frame, `mark` resets the lap clock and `lap(phase)`
+    adds the time since the last mark/lap to `phase` (phases may be entered
+    several times per frame, e.g. once per redrawn rect). Label time is
+    measured by the LabelRenderer and reported separately from `objects`.
+    Everything is a no-op while `enabled` is False.
+    """
+    def __init__(self, enabled=False, size=HISTORY_FRAMES, dump_path=None):
+        self.enabled = bool(enabled)
+        self.frames = deque(maxlen=int(size))
+        self.dump_path = dump_path or DEFAULT_DUMP
+        self._cur = None
+        self._frame_start = 0.0
+        self._last = 0.0
+        self._index = 0
+
+    @classmethod
+    def from_env(cls, environ=None):
+        value = (environ if environ is not None else os.environ).get(PROFILE_ENV, '').strip()
+        if not value or value == '0':
+            return cls(enabled=False)
+        dump_path = value if value.lower().endswith(('.csv', '.json')) else None
+        return cls(enabled=True, dump_path=dump_path)
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self._cur = dict.fromkeys(PHASES, 0.0)
+        self._frame_start = self._last = time.perf_counter()
+
+    def mark(self):
+        if self._cur is not None:
+            self._last = time.perf_counter()
+
+    def lap(self, phase):
+        if self._cur is None:
+            return
+        now = time.perf_counter()
+        self._cur[phase] = self._cur.get(phase, 0.0) + (now - self._last)
+        self._last = now
+
+    def end_frame(self, drew=True, objects=0, labels=0, label_time=0.0, rects=0):
+        """Close the frame; frames where nothing was redrawn are not recorded."""
+        cur = self._cur
+        self._cur = None
+        if cur is None or not drew:
+            return
+        # labels are drawn from inside the object pass; report them on their own
+        cur['labels'] = label_time
+        cur['objects'] = max(0.0, cur['objects'] - label_time)
+        self._index += 1
+        rec = {'frame': self._index, 'total': time.perf_counter() - self._frame_start}
+        rec.update(cur)
+        rec.update({'objects_drawn': int(objects), 'labels_drawn': int(labels), 'rects': int(rects)})
+        self.frames.append(rec)
+
+    def stats(self):
+        """p50/p95/max of the frame time and every phase, in milliseconds."""
+        out = {'frames': len(self.frames)}
+        for key in ('total',) + PHASES:
+            vals = sorted(r.get(key, 0.0) * 1000.0 for r in self.frames)
+            out[key] = (_percentile(vals, 0.5), _percentile(vals, 0.95), vals[-1] if vals else 0.0)
+        last = self.frames[-1] if self.frames else {}
+        out['objects_drawn'] = last.get('objects_drawn', 0)
+        out['labels_drawn'] = last.get('labels_drawn', 0)
+        return out
+
+    def dump(self, path=None):
+        """Write the recorded frames as CSV or JSON (by extension); returns the path."""
+        path = path or self.dump_path
+        rows = list(self.frames)
+        fields = ['frame', 'total'] + list(PHASES) + ['objects_drawn', 'labels_drawn', 'rects']
+        if path.lower().endswith('.json'):
+            with open(path, 'w', encoding='utf-8') as fh:
+                json.dump({'phases_unit': 'seconds', 'summary_ms': self.stats(), 'frames': rows}, fh, indent=1)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as fh:
+                w = csv.DictWriter(fh, fieldnames=fields, extrasaction='ignore')
+                w.writeheader()
+                w.writerows(rows)
+        return path
+
+    def hud_lines(self):
+        st = self.stats()
+        p50, p95, mx = st['total']
+        lines = [
+            f"frame p50 {p50:.1f}  p95 {p95:.1f}  max {mx:.1f} ms  ({st['frames']} frames)",
+            f"objects {st['objects_drawn']}  labels {st['labels_drawn']}",
+        ]
+        for ph in PHASES:
+            a, b, c = st[ph]
+            lines.append(f"{ph:<8} {a:6.2f} {b:6.2f} {c:6.2f}")
+        return lines
+
+    def hud_rect(self, font, right, top=0):
+        w = font.size(HUD_TEMPLATE)[0] + 2 * HUD_PAD
+        h = font.get_linesize() * (2 + len(PHASES)) + 2 * HUD_PAD
+        return pygame.Rect(right - w, top, w, h)
+
+    def draw_hud(self, surface, font, right, top=0):
+        """Draw the statistics box with its top-right corner at (right, top)."""
+        rect = self.hud_rect(font, right, top)
+        bg = pygame.Surface(rect.size, pygame.SRCALPHA)
+        bg.fill(HUD_BG)
+        surface.blit(bg, rect.topleft)
+        y = rect.y + HUD_PAD
+        for line in self.hud_lines():
+            surface.blit(font.render(line, True, HUD_COLOR), (rect.x + HUD_PAD, y))
+            y += font.get_linesize()
+        return rect
@@ -0,0 +1,216 @@
+"""Compact binary project files (project.flnb).
+
+Layout (little endian, every block 8-byte aligned):
+
+    header   magic b'FLNB', format version u16, record size u16,
+             meta length u32, section count u32                    16 bytes
+    meta     UTF-8 JSON with the top-level fields (image, version,
+             grid, journal_*), padded to 8
+    sections one per object type:
+             type name (16 bytes, NUL padded), record count u32, 0 u32
+             followed by `count` RECORD_DTYPE records
+
+Every record stores `index`, the object's position in the project's object
+list, so the sections can be read with `numpy.frombuffer` as whole arrays and
+scattered back into list order without parsing objects one by one. Colour is
+stored for every type and meters is NaN when unset, so each type round-trips
+through its `to_dict` form.
+
+Convert with `python flaner.py convert SRC [DST]` (direction by extension;
+a project folder converts its newest project file to the other format).
+"""
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from project_loader import (OBJECT_TYPES, SCHEMA_VERSION, PROJECT_FILE, BINARY_FILE,
+                            ProjectFormatError, check_version, project_file, object_from_dict)
+from store import shape_code
+
+MAGIC = b'FLNB'
+BINARY_VERSION = 1
+_HEADER = struct.Struct('<4sHHII')
+_SECTION = struct.Struct('<16sII')
+RECORD_DTYPE = np.dtype([
+    ('pts', '<f8', (4,)),    # x1, y1, x2, y2 in original-image pixels
+    ('meters', '<f8'),       # NaN: None
+    ('index', '<u4'),        # position in the object list
+    ('width', '<i4'),
+    ('color', 'u1', (3,)),
+    ('_pad', 'u1'),
+])
+
+
+def _pad8(n):
+    return (-n) % 8
+
+
+def encode(fields, objects):
+    """Bytes of a binary project from top-level `fields` and `to_dict` dicts."""
+    sections = {}   # type name -> list of record tuples, in first-seen order
+    for i, d in enumerate(objects):
+        name = d.get('type')
+        if name not in OBJECT_TYPES:
+            continue
+        p1, p2, width, color, meters = object_from_dict(d)._detached_values()
+        sections.setdefault(name, []).append((
+            (p1[0], p1[1], p2[0], p2[1]),
+            np.nan if meters is None else float(meters),
+            i, int(width), tuple(color)[:3], 0))
+    meta = dict(fields)
+    meta.pop('objects', None)
+    meta.setdefault('version', SCHEMA_VERSION)
+    meta_bytes = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+    parts = [_HEADER.pack(MAGIC, BINARY_VERSION, RECORD_DTYPE.itemsize, len(meta_bytes), len(sections)),
+             meta_bytes, b'\0' * _pad8(len(meta_bytes))]
+    for name, rows in sections.items():
+        parts.append(_SECTION.pack(name.encode('ascii')[:16], len(rows), 0))
+        parts.append(np.array(rows, dtype=RECORD_DTYPE).tobytes())
+    return b''.join(parts)
+
+
+def write_binary(path, fields, objects):
+    """Write `encode(fields, objects)` via a temp file and rename."""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(encode(fields, objects))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def decode(buf):
+    """Parse a binary project; returns (fields, names, records).
+
+    `records` is one RECORD_DTYPE array in object-list order and `names[i]`
+    the type of `records[i]`; sections of unknown types are left out.
+    """
+    view = memoryview(buf)
+    if len(view) < _HEADER.size:
+        raise ProjectFormatError('truncated binary project')
+    magic, version, rec_size, meta_len, count = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ProjectFormatError('not a binary project file')
+    if version > BINARY_VERSION or rec_size != RECORD_DTYPE.itemsize:
+        raise ProjectFormatError(f"unsupported binary project version {version}")
+    off = _HEADER.size
+    fields = json.loads(bytes(view[off:off + meta_len]).decode('utf-8'))
+    check_version(fields)
+    off += meta_len + _pad8(meta_len)
+    arrays, kinds, names = [], [], []
+    for _ in range(count):
+        raw_name, n, _reserved = _SECTION.unpack_from(view, off)
+        off += _SECTION.size
+        if off + n * rec_size > len(view):
+            raise ProjectFormatError('truncated binary project')
+        name = raw_name.rstrip(b'\0').decode('ascii')
+        if name in OBJECT_TYPES:
+            arrays.append(np.frombuffer(view, dtype=RECORD_DTYPE, count=n, offset=off))
+            kinds.append(np.full(n, len(names), dtype=np.int32))
+            names.append(name)
+        off += n * rec_size
+    if not arrays:
+        return fields, [], np.zeros(0, dtype=RECORD_DTYPE)
+    records = np.concatenate(arrays)
+    kinds = np.concatenate(kinds)
+    order = np.argsort(records['index'], kind='stable')
+    return fields, [names[k] for k in kinds[order].tolist()], records[order]
+
+
+def read_binary(path):
+    with open(path, 'rb') as fh:
+        return decode(fh.read())
+
+
+def _build(cls, p, width, color, meters):
+    # a detached object filled from a record, without going through from_dict
+    obj = cls.__new__(cls)
+    obj._restore_values(((p[0], p[1]), (p[2], p[3]), width, tuple(color), None if meters != meters else meters))
+    return obj
+
+
+def load_binary(path):
+    """Read a project.flnb; returns (fields, scale_object, objects, columns).
+
+    `columns` (pts, width, color, meters, shape) hold the rows of `objects`
+    for `Scene.replace`, which then fills its store without per-object inserts.
+    """
+    fields, names, records = read_binary(path)
+    pts = records['pts'].tolist()
+    width = records['width'].tolist()
+    color = records['color'].tolist()
+    meters = records['meters'].tolist()
+    scale_object = None
+    objects = []
+    keep = []
+    for i, name in enumerate(names):
+        cls = OBJECT_TYPES[name]
+        obj = _build(cls, pts[i], width[i], color[i], meters[i])
+        if name == 'scale':
+            scale_object = obj
+        else:
+            objects.append(obj)
+            keep.append(i)
+    rows = records[np.asarray(keep, dtype=np.int64)]
+    shapes = np.array([shape_code(o) for o in objects], dtype=np.int8)
+    columns = (rows['pts'], rows['width'], rows['color'], rows['meters'], shapes)
+    return fields, scale_object, objects, columns
+
+
+def to_dicts(path):
+    """(fields, object dicts) of a binary project, as `to_dict` writes them."""
+    fields, scale_object, objects, _ = load_binary(path)
+    out = [scale_object.to_dict()] if scale_object is not None else []
+    out.extend(o.to_dict() for o in objects)
+    return fields, out
+
+
+def json_to_binary(src, dst):
+    with open(src, 'r', encoding='utf-8') as fh:
+        data = json.load(fh)
+    check_version(data)
+    write_binary(dst, data, data.get('objects') or [])
+
+
+def binary_to_json(src, dst):
+    from project_writer import write_json_atomic
+    fields, objects = to_dicts(src)
+    data = dict(fields)
+    data['objects'] = objects
+    write_json_atomic(dst, data)
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ('-h', '--help') or len(argv) > 2:
+        print("usage: flaner convert SRC [DST]   (project.json <-> project.flnb, or a project folder)")
+        return 0 if argv and argv[0] in ('-h', '--help') else 2
+    src = argv[0]
+    if os.path.isdir(src):
+        folder = src
+        src = project_file(folder)
+        if src is None:
+            print(f"{folder}: no project file")
+            return 1
+    if len(argv) > 1:
+        dst = argv[1]
+    else:
+        name = BINARY_FILE if not src.endswith('.flnb') else PROJECT_FILE
+        dst = os.path.join(os.path.dirname(src), name)
+    try:
+        if src.endswith('.flnb'):
+            binary_to_json(src, dst)
+        else:
+            json_to_binary(src, dst)
+    except Exception as e:
+        print(f"{src}: {e}")
+        return 1
+    print(f"{src} -> {dst} ({os.path.getsize(src)} -> {os.path.getsize(dst)} bytes)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
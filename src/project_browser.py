@@ -0,0 +1,190 @@
+import os
+import time
+
+import pygame
+
+BG_COLOR = (22, 22, 22)
+CARD_COLOR = (44, 44, 44)
+SELECTED_COLOR = (255, 220, 80)
+TEXT_COLOR = (230, 230, 230)
+DIM_COLOR = (150, 150, 150)
+MARGIN = 20
+GAP = 14
+CARD_PAD = 8
+HEADER_H = 56
+SCROLL_STEP = 60
+
+
+def describe(entry):
+    """Second and third card lines: object counts / scale and modification time."""
+    if entry.get('error'):
+        return 'cannot read project', ''
+    counts = entry.get('counts') or {}
+    parts = [f"{counts.get('measure', 0)} lines", f"{counts.get('rect', 0)} rects"]
+    if entry.get('scale_m'):
+        parts.append(f"scale {entry['scale_m']:g} m")
+    try:
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.get('mtime', 0)))
+    except Exception:
+        when = ''
+    return ', '.join(parts), when
+
+
+class ProjectBrowser:
+    """Full-window overlay listing the entries of a `ProjectIndex` as cards.
+
+    Only cached thumbnails are shown, so opening it never decodes a plan
+    image. Typing filters by folder name; arrows, wheel and clicks move
+    through the cards. `handle` returns ('open', folder), ('folder', None)
+    for the folder dialog, ('close', None) or None.
+    """
+    def __init__(self, index, font, title_font, thumb_size):
+        self.index = index
+        self.font = font
+        self.title_font = title_font
+        self.thumb_size = thumb_size
+        self.entries = []
+        self.filter = ''
+        self.selected = 0
+        self.scroll = 0
+        self.busy = False
+        self._rect = pygame.Rect(0, 0, 0, 0)
+        self._thumbs = {}   # (thumb file, stamp) -> Surface or None
+        self.reload()
+
+    def reload(self):
+        """Pick up index changes (e.g. after INDEX_UPDATED)."""
+        name = self.current()['name'] if self.current() else None
+        needle = self.filter.lower()
+        self.entries = [e for e in self.index.snapshot() if needle in e['name'].lower()]
+        self.selected = 0
+        for i, e in enumerate(self.entries):
+            if e['name'] == name:
+                self.selected = i
+                break
+
+    def current(self):
+        if 0 <= self.selected < len(self.entries):
+            return self.entries[self.selected]
+        return None
+
+    # -- layout ------------------------------------------------------------
+
+    def card_size(self):
+        line = self.font.get_linesize()
+        return self.thumb_size[0] + 2 * CARD_PAD, self.thumb_size[1] + 3 * line + 3 * CARD_PAD
+
+    def columns(self):
+        cw = self.card_size()[0]
+        return max(1, (self._rect.width - 2 * MARGIN + GAP) // (cw + GAP))
+
+    def card_rect(self, i):
+        cw, ch = self.card_size()
+        cols = self.columns()
+        x = self._rect.x + MARGIN + (i % cols) * (cw + GAP)
+        y = self._rect.y + HEADER_H + (i // cols) * (ch + GAP) - self.scroll
+        return pygame.Rect(x, y, cw, ch)
+
+    def max_scroll(self):
+        ch = self.card_size()[1]
+        rows = (len(self.entries) + self.columns() - 1) // self.columns()
+        return max(0, rows * (ch + GAP) + HEADER_H + MARGIN - self._rect.height)
+
+    def ensure_visible(self):
+        if not self.entries:
+            return
+        r = self.card_rect(self.selected)
+        top = self._rect.y + HEADER_H
+        if r.top < top:
+            self.scroll -= top - r.top
+        elif r.bottom > self._rect.bottom - MARGIN:
+            self.scroll += r.bottom - (self._rect.bottom - MARGIN)
+        self.scroll = max(0, min(self.scroll, self.max_scroll()))
+
+    # -- input -------------------------------------------------------------
+
+    def handle(self, event):
+        if event.type == pygame.KEYDOWN:
+            n = len(self.entries)
+            cols = self.columns()
+            if event.key == pygame.K_ESCAPE:
+                return ('close', None)
+            if event.key == pygame.K_RETURN:
+                entry = self.current()
+                return ('open', os.path.join(self.index.root, entry['name'])) if entry else None
+            if event.key == pygame.K_o and event.mod & pygame.KMOD_CTRL:
+                return ('folder', None)
+            step = {pygame.K_LEFT: -1, pygame.K_RIGHT: 1, pygame.K_UP: -cols, pygame.K_DOWN: cols}.get(event.key)
+            if step is not None and n:
+                self.selected = max(0, min(n - 1, self.selected + step))
+                self.ensure_visible()
+            elif event.key == pygame.K_BACKSPACE:
+                self.filter = self.filter[:-1]
+                self.reload()
+                self.scroll = 0
+            elif event.unicode and event.unicode.isprintable() and not event.mod & pygame.KMOD_CTRL:
+                self.filter += event.unicode
+                self.reload()
+                self.scroll = 0
+        elif event.type == pygame.MOUSEWHEEL:
+            self.scroll = max(0, min(self.scroll - event.y * SCROLL_STEP, self.max_scroll()))
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            for i in range(len(self.entries)):
+                if self.card_rect(i).collidepoint(event.pos):
+                    if i == self.selected or getattr(event, 'clicks', 1) > 1:
+                        return ('open', os.path.join(self.index.root, self.entries[i]['name']))
+                    self.selected = i
+                    break
+        return None
+
+    # -- drawing -----------------------------------------------------------
+
+    def _thumb(self, entry):
+        path = self.index.thumb_path(entry)
+        if path is None:
+            return None
+        key = (path, tuple(entry.get('stamp') or ()))
+        if key not in self._thumbs:
+            try:
+                self._thumbs[key] = pygame.image.load(path).convert()
+            except Exception:
+                self._thumbs[key] = None
+        return self._thumbs[key]
+
+    def draw(self, surface, rect):
+        self._rect = pygame.Rect(rect)
+        self.scroll = max(0, min(self.scroll, self.max_scroll()))
+        surface.fill(BG_COLOR, self._rect)
+        title = f"Projects ({len(self.entries)})"
+        if self.filter:
+            title += f"  filter: {self.filter}"
+        if self.busy:
+            title += "  indexing..."
+        surface.blit(self.title_font.render(title, True, TEXT_COLOR), (rect.x + MARGIN, rect.y + 12))
+        hint = "Enter/click: open   type: filter   Ctrl+O: other folder   Esc: close"
+        surface.blit(self.font.render(hint, True, DIM_COLOR), (rect.x + MARGIN, rect.y + 12 + self.title_font.get_linesize()))
+        clip = surface.get_clip()
+        surface.set_clip(pygame.Rect(rect.x, rect.y + HEADER_H, rect.width, rect.height - HEADER_H).clip(clip))
+        line = self.font.get_linesize()
+        for i, entry in enumerate(self.entries):
+            r = self.card_rect(i)
+            if r.bottom < rect.y + HEADER_H:
+                continue
+            if r.top > rect.bottom:
+                break
+            pygame.draw.rect(surface, CARD_COLOR, r)
+            if i == self.selected:
+                pygame.draw.rect(surface, SELECTED_COLOR, r, 2)
+            thumb = self._thumb(entry)
+            tx, ty = r.x + CARD_PAD, r.y + CARD_PAD
+            if thumb is not None:
+                tw, th = thumb.get_size()
+                surface.blit(thumb, (tx + (self.thumb_size[0] - tw) // 2, ty + (self.thumb_size[1] - th) // 2))
+            y = ty + self.thumb_size[1] + CARD_PAD
+            summary, when = describe(entry)
+            for text, color in ((entry['name'], TEXT_COLOR), (summary, DIM_COLOR), (when, DIM_COLOR)):
+                if text:
+                    # long names are cut at the card edge
+                    surface.blit(self.font.render(text, True, color), (tx, y), pygame.Rect(0, 0, self.thumb_size[0], line))
+                y += line
+        surface.set_clip(clip)
@@ -0,0 +1,224 @@
+import json
+import os
+import threading
+
+import pygame
+
+from image_loader import decode_preview, load_full
+from project_loader import OBJECT_TYPES, project_file, load_project
+from project_writer import write_json_atomic
+
+# posted from the refresher for every (re)indexed or removed project; attrs: name
+INDEX_UPDATED = pygame.event.custom_type()
+# kept in the projects root, next to the project folders
+INDEX_FOLDER = '.index'
+INDEX_FILE = 'index.json'
+INDEX_VERSION = 1
+THUMB_SIZE = (240, 160)
+# the index file is rewritten after this many refreshed entries (and at the end)
+SAVE_EVERY = 20
+
+
+def project_stamp(proj_dir, entry=None):
+    """What an entry depends on: project file name, mtime and size, plus the image mtime."""
+    path = project_file(proj_dir)
+    if path is None:
+        return None
+    st = os.stat(path)
+    stamp = [os.path.basename(path), st.st_mtime_ns, st.st_size, None]
+    image = (entry or {}).get('image')
+    if image:
+        try:
+            stamp[3] = os.stat(os.path.join(proj_dir, image)).st_mtime_ns
+        except Exception:
+            pass
+    return stamp
+
+
+def make_thumbnail(image_path, out_path, size=THUMB_SIZE):
+    """Write a thumbnail PNG of the plan image; returns its size."""
+    preview = None
+    try:
+        preview = decode_preview(image_path, max(size))
+    except Exception:
+        preview = None
+    img = preview[0] if preview else load_full(image_path)
+    iw, ih = img.get_size()
+    scale = min(size[0] / iw, size[1] / ih, 1.0)
+    tw, th = max(1, int(iw * scale)), max(1, int(ih * scale))
+    try:
+        thumb = pygame.transform.smoothscale(img, (tw, th))
+    except Exception:
+        thumb = pygame.transform.scale(img, (tw, th))
+    tmp = out_path + '.tmp.png'
+    pygame.image.save(thumb, tmp)
+    os.replace(tmp, out_path)
+    return tw, th
+
+
+class ProjectIndex:
+    """Metadata and thumbnails of every project folder under `root`.
+
+    Entries live in `<root>/.index/index.json` and are keyed by folder name;
+    each holds the object counts, the scale, the modification time and the
+    file name of a cached thumbnail. `refresh` compares the mtimes recorded in
+    each entry with the folder and only re-reads projects that changed, so
+    the index can be shown right away and updated in the background.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.folder = os.path.join(root, INDEX_FOLDER)
+        self.path = os.path.join(self.folder, INDEX_FILE)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                data = json.load(fh)
+            if data.get('version') == INDEX_VERSION:
+                self.entries = {e['name']: e for e in data.get('projects', []) if e.get('name')}
+        except Exception:
+            self.entries = {}
+
+    def save(self):
+        os.makedirs(self.folder, exist_ok=True)
+        with self._lock:
+            projects = list(self.entries.values())
+        write_json_atomic(self.path, {'version': INDEX_VERSION, 'projects': projects})
+
+    def snapshot(self):
+        """Entries, most recently modified first."""
+        with self._lock:
+            entries = list(self.entries.values())
+        entries.sort(key=lambda e: e.get('mtime', 0), reverse=True)
+        return entries
+
+    def thumb_path(self, entry):
+        return os.path.join(self.folder, entry['thumb']) if entry.get('thumb') else None
+
+    def project_dirs(self):
+        try:
+            names = os.listdir(self.root)
+        except Exception:
+            return {}
+        out = {}
+        for name in names:
+            if name.startswith('.'):
+                continue
+            d = os.path.join(self.root, name)
+            if os.path.isdir(d) and project_file(d):
+                out[name] = d
+        return out
+
+    def stale(self):
+        """(names to re-index, names whose folder is gone), newest folders first."""
+        dirs = self.project_dirs()
+        with self._lock:
+            entries = dict(self.entries)
+        changed = []
+        for name, d in dirs.items():
+            entry = entries.get(name)
+            try:
+                stamp = project_stamp(d, entry)
+            except Exception:
+                continue
+            if entry is None or entry.get('stamp') != stamp:
+                changed.append((stamp[1] if stamp else 0, name))
+        changed.sort(reverse=True)
+        return [name for _, name in changed], [name for name in entries if name not in dirs]
+
+    def build_entry(self, name):
+        """Read project `name` and render its thumbnail; returns the entry."""
+        d = os.path.join(self.root, name)
+        fields, scale_object, objects = load_project(project_file(d))
+        names = {cls: kind for kind, cls in OBJECT_TYPES.items()}
+        counts = {}
+        for obj in objects:
+            kind = names.get(type(obj), '?')
+            counts[kind] = counts.get(kind, 0) + 1
+        entry = {
+            'name': name,
+            'image': fields.get('image'),
+            'counts': counts,
+            'scale_m': scale_object.meters if scale_object is not None else None,
+            'pixels_per_meter': scale_object.pixels_per_meter if scale_object is not None else None,
+            'thumb': None,
+        }
+        entry['stamp'] = project_stamp(d, entry)
+        entry['mtime'] = max(entry['stamp'][1], entry['stamp'][3] or 0) / 1e9
+        image = os.path.join(d, entry['image'] or '')
+        if entry['image'] and os.path.isfile(image):
+            os.makedirs(self.folder, exist_ok=True)
+            thumb = name + '.png'
+            try:
+                make_thumbnail(image, os.path.join(self.folder, thumb))
+                entry['thumb'] = thumb
+            except Exception:
+                pass
+        return entry
+
+    def remove(self, name):
+        with self._lock:
+            entry = self.entries.pop(name, None)
+        path = self.thumb_path(entry) if entry else None
+        if path:
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+    def refresh(self, on_update=None, cancelled=None):
+        """Bring the index up to date; `on_update(name)` follows every change."""
+        changed, gone = self.stale()
+        for name in gone:
+            self.remove(name)
+            if on_update:
+                on_update(name)
+        done = 0
+        for name in changed:
+            if cancelled and cancelled():
+                break
+            try:
+                entry = self.build_entry(name)
+            except Exception as e:
+                entry = {'name': name, 'error': str(e), 'counts': {}, 'thumb': None,
+                         'stamp': project_stamp(os.path.join(self.root, name))}
+                entry['mtime'] = entry['stamp'][1] / 1e9 if entry['stamp'] else 0
+            with self._lock:
+                self.entries[name] = entry
+            done += 1
+            if on_update:
+                on_update(name)
+            if done % SAVE_EVERY == 0:
+                self.save()
+        if done or gone:
+            self.save()
+        return done + len(gone)
+
+
+class IndexRefresher(threading.Thread):
+    """Runs `ProjectIndex.refresh` on a worker thread, posting INDEX_UPDATED."""
+    event_type = INDEX_UPDATED
+
+    def __init__(self, index):
+        super().__init__(daemon=True)
+        self.index = index
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _post(self, name):
+        try:
+            pygame.event.post(pygame.event.Event(self.event_type, name=name))
+        except Exception:
+            pass
+
+    def run(self):
+        try:
+            self.index.refresh(self._post, self._cancel.is_set)
+        except Exception as e:
+            print('Project index refresh failed:', e)
+        self._post(None)
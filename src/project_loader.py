@@ -0,0 +1,232 @@
+import json
+import os
+
+from objects.scale_line import ScaleLine
+from objects.measure_line import MeasureLine
+from objects.rectangle import Rectangle
+
+# written as `version` in project.json; files without it are version 0 (same layout)
+SCHEMA_VERSION = 1
+PROJECT_FILE = 'project.json'
+# optional compact form of the same project (see project_binary.py)
+BINARY_FILE = 'project.flnb'
+# autosave snapshot of unsaved edits; never replaces the saved project file (see journal.py)
+AUTOSAVE_FILE = 'autosave.json'
+# objects built per batch while streaming
+BATCH_SIZE = 2000
+READ_CHUNK = 64 * 1024
+
+_WS = ' \t\r\n'
+_decoder = json.JSONDecoder()
+
+# saved `type` -> class with a `from_dict` classmethod
+OBJECT_TYPES = {}
+
+
+def register_object_type(name, cls):
+    OBJECT_TYPES[name] = cls
+
+
+register_object_type('scale', ScaleLine)
+register_object_type('measure', MeasureLine)
+register_object_type('rect', Rectangle)
+
+
+class ProjectFormatError(ValueError):
+    pass
+
+
+def object_from_dict(d):
+    """Build an object from its `to_dict` form; raises ProjectFormatError for unknown types and bad fields."""
+    cls = OBJECT_TYPES.get(d.get('type'))
+    if cls is None:
+        raise ProjectFormatError(f"unknown object type {d.get('type')!r}")
+    try:
+        return cls.from_dict(d)
+    except Exception as e:
+        raise ProjectFormatError(f"bad {d.get('type')} object: {e}") from e
+
+
+def project_file(proj_dir):
+    """Path of the project file in `proj_dir` (the newer of json/flnb), or None."""
+    found = []
+    for name in (PROJECT_FILE, BINARY_FILE):
+        path = os.path.join(proj_dir, name)
+        try:
+            found.append((os.path.getmtime(path), name == PROJECT_FILE, path))
+        except Exception:
+            continue
+    # on equal mtimes the JSON file wins
+    return max(found)[2] if found else None
+
+
+def check_version(fields):
+    version = fields.get('version', 0)
+    if not isinstance(version, int) or version > SCHEMA_VERSION:
+        raise ProjectFormatError(f"unsupported project version {version!r} (this build reads up to {SCHEMA_VERSION})")
+    return version
+
+
+class ProjectReader:
+    """Streams a project.json without loading the whole document first.
+
+    `read_header` returns the top-level fields that precede `objects` (the
+    writer puts `objects` last, so that is everything but the objects);
+    `batches` then yields lists of built objects as the array is read. Fields
+    after the array, if any, are added to `fields` once it is exhausted.
+    Objects of unknown type or with bad fields are skipped; `skipped` counts
+    them and `first_error` says why the first one was.
+    """
+    def __init__(self, path, chunk_size=READ_CHUNK):
+        self.path = path
+        self.fields = {}
+        self.skipped = 0
+        self.first_error = None
+        self._fh = open(path, 'r', encoding='utf-8')
+        self._chunk = int(chunk_size)
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._state = 'start'
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    # -- low level scanning ------------------------------------------------
+
+    def _fill(self):
+        if self._eof:
+            return False
+        data = self._fh.read(self._chunk)
+        if not data:
+            self._eof = True
+            return False
+        if self._pos > self._chunk:
+            # drop what has been consumed
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        self._buf += data
+        return True
+
+    def _peek(self):
+        while True:
+            buf = self._buf
+            while self._pos < len(buf) and buf[self._pos] in _WS:
+                self._pos += 1
+            if self._pos < len(buf):
+                return buf[self._pos]
+            if not self._fill():
+                raise ProjectFormatError('unexpected end of file')
+
+    def _expect(self, ch):
+        if self._peek() != ch:
+            raise ProjectFormatError(f"expected {ch!r} at offset {self._pos}")
+        self._pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+                # a number that ends with the buffer may continue in the next chunk
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise ProjectFormatError(f"invalid JSON at offset {self._pos}")
+            self._fill()
+
+    def _read_fields(self):
+        # top-level `"key": value` pairs up to `objects` or the closing brace
+        while True:
+            ch = self._peek()
+            if ch == '}':
+                self._pos += 1
+                self._state = 'done'
+                return
+            if ch == ',':
+                self._pos += 1
+                continue
+            key = self._value()
+            self._expect(':')
+            if key == 'objects':
+                self._expect('[')
+                self._state = 'objects'
+                return
+            self.fields[key] = self._value()
+
+    # -- public ------------------------------------------------------------
+
+    def read_header(self):
+        """Top-level fields before the object array; checks the schema version."""
+        if self._state == 'start':
+            self._expect('{')
+            self._read_fields()
+            check_version(self.fields)
+        return self.fields
+
+    def batches(self, size=BATCH_SIZE, build=object_from_dict):
+        """Yield lists of up to `size` objects until the array is exhausted.
+
+        `build` turns each saved dict into an item (default: the object);
+        items it raises for are counted in `skipped`.
+        """
+        self.read_header()
+        batch = []
+        while self._state == 'objects':
+            ch = self._peek()
+            if ch == ']':
+                self._pos += 1
+                self._state = 'fields'
+                break
+            if ch == ',':
+                self._pos += 1
+                continue
+            item = self._value()
+            try:
+                batch.append(build(item))
+            except Exception as e:
+                self.skipped += 1
+                if self.first_error is None:
+                    self.first_error = str(e)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        if self._state == 'fields':
+            self._read_fields()
+            check_version(self.fields)
+        self.close()
+
+
+def split_scale(objects, scale_object=None):
+    """Separate the scale line (the last one wins) from the other objects."""
+    others = []
+    for obj in objects:
+        if isinstance(obj, ScaleLine):
+            scale_object = obj
+        else:
+            others.append(obj)
+    return scale_object, others
+
+
+def load_project(path):
+    """Read a whole project file; returns (fields, scale_object, objects)."""
+    if path.endswith('.flnb'):
+        from project_binary import load_binary
+        fields, scale_object, objects, _ = load_binary(path)
+        return fields, scale_object, objects
+    reader = ProjectReader(path)
+    try:
+        scale_object = None
+        objects = []
+        for batch in reader.batches():
+            scale_object, others = split_scale(batch, scale_object)
+            objects.extend(others)
+        return reader.fields, scale_object, objects
+    finally:
+        reader.close()
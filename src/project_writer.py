@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+import threading
+import pygame
+from project_loader import PROJECT_FILE, BINARY_FILE, AUTOSAVE_FILE, SCHEMA_VERSION
+# posted when a queued save finished; attrs: proj_dir, message, error, tag
+PROJECT_SAVED = pygame.event.custom_type()
+
+
+def write_json_atomic(path, data):
+    """Write `data` to `path` via a temp file and rename, so readers never see a partial file."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh, indent=2)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def image_up_to_date(src, dst):
+    """True when `dst` already holds `src` (same file, or same size and mtime)."""
+    try:
+        if os.path.samefile(src, dst):
+            return True
+    except Exception:
+        pass
+    try:
+        s = os.stat(src)
+        d = os.stat(dst)
+    except Exception:
+        return False
+    # copies are made with copy2, which carries the mtime over
+    return s.st_size == d.st_size and int(s.st_mtime) == int(d.st_mtime)
+
+
+def copy_image(src, dst):
+    """Copy the plan image unless `dst` is already current; returns True if it copied."""
+    if image_up_to_date(src, dst):
+        return False
+    tmp = dst + '.tmp'
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    return True
+
+
+def save_project(proj_dir, image_path, objects, extra=None, binary=False, autosave=False):
+    """Write a project folder: the image (when changed) and project.json (project.flnb if `binary`).
+
+    With `autosave` the objects go to autosave.json and the saved project
+    file is left alone; a regular save drops an older autosave.json.
+    """
+    os.makedirs(proj_dir, exist_ok=True)
+    img_name = os.path.basename(image_path)
+    copy_image(image_path, os.path.join(proj_dir, img_name))
+    data = {'version': SCHEMA_VERSION, 'image': img_name}
+    data.update(extra or {})
+    # objects last, so a streaming reader has every other field before the first object
+    if autosave:
+        data['objects'] = objects
+        write_json_atomic(os.path.join(proj_dir, AUTOSAVE_FILE), data)
+        return
+    if binary:
+        from project_binary import write_binary
+        write_binary(os.path.join(proj_dir, BINARY_FILE), data, objects)
+    else:
+        data['objects'] = objects
+        write_json_atomic(os.path.join(proj_dir, PROJECT_FILE), data)
+    try:
+        os.remove(os.path.join(proj_dir, AUTOSAVE_FILE))
+    except Exception:
+        pass
+
+
+class ProjectWriter(threading.Thread):
+    """Saves projects on a background thread.
+
+    `submit` takes a snapshot of the objects (plain dicts) and returns right
+    away. Requests for the same folder that pile up before the writer gets to
+    them are merged, so only the newest snapshot is written. Each finished
+    save posts PROJECT_SAVED carrying the request's `tag`. With `binary` the
+    projects are written as project.flnb. Autosaves are queued apart from
+    regular saves of the same folder, so neither replaces the other.
+    """
+    event_type = PROJECT_SAVED
+
+    def __init__(self, binary=False):
+        super().__init__(daemon=True)
+        self.binary = bool(binary)
+        self._cond = threading.Condition()
+        self._pending = {}   # (proj_dir, autosave) -> (image_path, objects, message, extra, tag)
+        self._order = []     # (proj_dir, autosave) keys in submission order
+        self._closed = False
+
+    def submit(self, proj_dir, image_path, objects, message=None, extra=None, tag=None, autosave=False):
+        """Queue a save; `extra` adds top-level project.json fields (autosave.json with `autosave`)."""
+        key = (proj_dir, bool(autosave))
+        with self._cond:
+            if key not in self._pending:
+                self._order.append(key)
+            elif message is None:
+                # a silent save merged over an explicit one keeps its popup
+                message = self._pending[key][2]
+            self._pending[key] = (image_path, objects, message, extra, tag)
+            self._cond.notify()
+
+    def close(self, timeout=10.0):
+        """Finish the queued saves (up to `timeout` seconds) and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self.is_alive():
+            self.join(timeout)
+
+    def _post(self, **attrs):
+        try:
+            pygame.event.post(pygame.event.Event(PROJECT_SAVED, **attrs))
+        except Exception:
+            pass
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not self._order and not self._closed:
+                    self._cond.wait()
+                if not self._order:
+                    return
+                key = self._order.pop(0)
+                image_path, objects, message, extra, tag = self._pending.pop(key)
+            proj_dir, autosave = key
+            try:
+                save_project(proj_dir, image_path, objects, extra, self.binary, autosave)
+                self._post(proj_dir=proj_dir, message=message, error=None, tag=tag)
+            except Exception as e:
+                self._post(proj_dir=proj_dir, message=f"Save failed: {e}", error=e, tag=tag)
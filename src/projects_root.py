@@ -0,0 +1,36 @@
+import os
+
+
+def get_projects_root():
+    """Return the projects root folder.
+
+    Priority order:
+    - Environment variable `FLANER_PROJECTS` (if set)
+    - On Windows: `~/Documents/Flaner/projects` (user-accessible)
+    - On other OS: XDG_DATA_HOME or ~/.local/share/Flaner/projects
+    If creation fails, fall back to a `projects` folder in the current working dir.
+    """
+    try:
+        # allow overriding the location for portability/debugging
+        env = os.getenv('FLANER_PROJECTS')
+        if env:
+            root = env
+        elif os.name == 'nt':
+            # prefer Documents so the folder is easy to open in Explorer
+            docs = os.path.join(os.path.expanduser('~'), 'Documents')
+            root = os.path.join(docs, 'Flaner', 'projects')
+        else:
+            # use XDG data home or fallback to ~/.local/share
+            xdg = os.getenv('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+            root = os.path.join(xdg, 'Flaner', 'projects')
+
+        os.makedirs(root, exist_ok=True)
+        return root
+    except Exception:
+        # final fallback to cwd/projects
+        fallback = os.path.join(os.getcwd(), 'projects')
+        try:
+            os.makedirs(fallback, exist_ok=True)
+        except Exception:
+            pass
+        return fallback
@@ -0,0 +1,119 @@
+import math
+from collections import OrderedDict
+import pygame
+
+TILE_SIZE = 512
+# stop halving once a level fits inside this many pixels on its longest side
+MIN_LEVEL_SIZE = 256
+# scaled tiles kept for the current zoom so pans only blit
+SCALED_TILE_LIMIT = 96
+
+
+class ImagePyramid:
+    """Multi-resolution tiled view of the original image.
+
+    Level 0 is the original surface, every further level is half the size of
+    the previous one. Drawing picks the coarsest level that still has at least
+    the on-screen resolution and only resamples the tiles that intersect the
+    visible part of `image_rect`, so zoom cost depends on the window size and
+    not on the image size.
+    """
+    def __init__(self, original, tile_size=TILE_SIZE, source_size=None):
+        # source_size: full image size when `original` is a reduced preview of it
+        self.original = original
+        self.tile_size = int(tile_size)
+        ow, oh = source_size or original.get_size()
+        self.size = (ow, oh)
+        # levels: list of (surface, scale_x, scale_y) relative to the full image
+        w0, h0 = original.get_size()
+        self.levels = [(original, w0 / ow, h0 / oh)]
+        surf = original
+        while max(surf.get_size()) > MIN_LEVEL_SIZE:
+            w, h = surf.get_size()
+            nw, nh = max(1, w // 2), max(1, h // 2)
+            try:
+                surf = pygame.transform.smoothscale(surf, (nw, nh))
+            except Exception:
+                surf = pygame.transform.scale(surf, (nw, nh))
+            self.levels.append((surf, nw / ow, nh / oh))
+        # cache of resampled tiles for the current (image_scale, smooth) pair
+        self._scaled = OrderedDict()
+        self._scaled_key = None
+
+    def get_size(self):
+        return self.size
+
+    def pick_level(self, image_scale):
+        # coarsest level whose resolution is still >= the display resolution
+        best = 0
+        for i, (_surf, sx, sy) in enumerate(self.levels):
+            if sx >= image_scale and sy >= image_scale:
+                best = i
+            else:
+                break
+        return best
+
+    def draw(self, surface, image_rect, image_scale, clip=None, smooth=True):
+        """Blit the part of the image visible inside `clip` (default: surface clip)."""
+        if image_scale <= 0:
+            return
+        if clip is None:
+            clip = surface.get_clip()
+        visible = image_rect.clip(clip)
+        if visible.w <= 0 or visible.h <= 0:
+            return
+        key = (image_scale, smooth)
+        if key != self._scaled_key:
+            self._scaled.clear()
+            self._scaled_key = key
+        level = self.pick_level(image_scale)
+        src, lsx, lsy = self.levels[level]
+        lw, lh = src.get_size()
+        # screen pixels per level pixel; > 1 only when zoomed past the original
+        rx = image_scale / lsx
+        ry = image_scale / lsy
+        # keep resampled tiles around tile_size on screen when upscaling
+        tw = self.tile_size if rx <= 1 else max(8, int(math.ceil(self.tile_size / rx)))
+        th = self.tile_size if ry <= 1 else max(8, int(math.ceil(self.tile_size / ry)))
+        # visible region in level pixel coordinates
+        lx0 = max(0, int((visible.left - image_rect.x) / rx))
+        ly0 = max(0, int((visible.top - image_rect.y) / ry))
+        lx1 = min(lw, int(math.ceil((visible.right - image_rect.x) / rx)))
+        ly1 = min(lh, int(math.ceil((visible.bottom - image_rect.y) / ry)))
+        for ty in range(ly0 // th, (max(ly0, ly1 - 1)) // th + 1):
+            for tx in range(lx0 // tw, (max(lx0, lx1 - 1)) // tw + 1):
+                sx0 = tx * tw
+                sy0 = ty * th
+                sx1 = min(lw, sx0 + tw)
+                sy1 = min(lh, sy0 + th)
+                if sx1 <= sx0 or sy1 <= sy0:
+                    continue
+                # round both edges so neighbouring tiles share them exactly
+                dx0 = image_rect.x + int(round(sx0 * rx))
+                dy0 = image_rect.y + int(round(sy0 * ry))
+                dx1 = image_rect.x + int(round(sx1 * rx))
+                dy1 = image_rect.y + int(round(sy1 * ry))
+                dw = dx1 - dx0
+                dh = dy1 - dy0
+                if dw <= 0 or dh <= 0:
+                    continue
+                tkey = (level, tx, ty, tw, th)
+                tile = self._scaled.get(tkey)
+                if tile is None:
+                    tile = self._resample(src.subsurface((sx0, sy0, sx1 - sx0, sy1 - sy0)), (dw, dh), smooth)
+                    self._scaled[tkey] = tile
+                    if len(self._scaled) > SCALED_TILE_LIMIT:
+                        self._scaled.popitem(last=False)
+                else:
+                    self._scaled.move_to_end(tkey)
+                surface.blit(tile, (dx0, dy0))
+
+    def _resample(self, tile, size, smooth):
+        if tile.get_size() == size:
+            return tile
+        if smooth:
+            try:
+                return pygame.transform.smoothscale(tile, size)
+            except Exception:
+                pass
+        return pygame.transform.scale(tile, size)
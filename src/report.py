@@ -0,0 +1,385 @@
+"""Measurement reports: line lengths, rectangle sizes and areas of saved projects.
+
+Usage (from the `src` folder, or with `src` on PYTHONPATH):
+
+    python flaner.py report PROJECT_OR_FOLDER [...] -o report.csv|report.json|report.md
+        [--summary] [--jobs N]
+
+Folders are expanded like `flaner render` does. Every project is read
+straight into arrays (no scene objects are built) and measured in one
+vectorized pass, so whole project libraries can be reported in one run.
+CSV and JSON list every object (or, with --summary, the totals per colour);
+Markdown is a per-project summary for people.
+"""
+import argparse
+import csv
+import inspect
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from project_loader import OBJECT_TYPES, ProjectReader, check_version, project_file
+
+REPORT_VERSION = 1
+KIND_SCALE = 0
+KIND_MEASURE = 1
+KIND_RECT = 2
+KINDS = {'scale': KIND_SCALE, 'measure': KIND_MEASURE, 'rect': KIND_RECT}
+KIND_NAMES = ('scale', 'measure', 'rect')
+FORMATS = ('csv', 'json', 'md')
+# numbers in the reports are rounded to this many decimals
+DECIMALS = 4
+OBJECT_COLUMNS = ('index', 'type', 'color', 'length_m', 'width_m', 'height_m', 'area_m2',
+                  'length_px', 'width_px', 'height_px')
+SUMMARY_COLUMNS = ('color', 'measures', 'length_m', 'rects', 'area_m2')
+
+_default_colors = {}
+
+
+def _default_color(name):
+    # the colour an object gets when its saved dict has none (measure lines never save one)
+    if name not in _default_colors:
+        param = inspect.signature(OBJECT_TYPES[name].__init__).parameters.get('color')
+        _default_colors[name] = tuple(param.default) if param is not None else (0, 0, 0)
+    return _default_colors[name]
+
+
+def _row(d):
+    # one saved object -> (kind, x1, y1, x2, y2, r, g, b, meters); unknown types raise and are skipped
+    name = d.get('type')
+    kind = KINDS[name]
+    (x1, y1), (x2, y2) = d['p1'], d['p2']
+    r, g, b = tuple(d.get('color') or _default_color(name))[:3]
+    meters = d.get('meters')
+    return (kind, x1, y1, x2, y2, r, g, b, np.nan if meters is None else meters)
+
+
+def read_columns(path):
+    """Read a project file into arrays; returns (fields, kinds, pts, colors, meters).
+
+    Rows keep the saved object order; `pts` are (x1, y1, x2, y2) in
+    original-image pixels and `meters` is NaN where none was saved.
+    """
+    if path.endswith('.flnb'):
+        from project_binary import read_binary
+        fields, names, records = read_binary(path)
+        kinds = np.array([KINDS.get(n, -1) for n in names], dtype=np.int8)
+        keep = kinds >= 0
+        return (fields, kinds[keep], records['pts'][keep].astype(np.float64),
+                records['color'][keep], records['meters'][keep].astype(np.float64))
+    reader = ProjectReader(path)
+    try:
+        rows = []
+        for batch in reader.batches(build=_row):
+            rows.extend(batch)
+        fields = reader.fields
+    finally:
+        reader.close()
+    check_version(fields)
+    a = np.array(rows, dtype=np.float64).reshape(-1, 9)
+    return fields, a[:, 0].astype(np.int8), a[:, 1:5], a[:, 5:8].astype(np.uint8), a[:, 8]
+
+
+def measure(kinds, pts, meters):
+    """Measurements of every row in one pass; returns (pixels_per_meter, scale_m, columns).
+
+    The last scale line sets the scale (as in the app). Without one, measure
+    lines report their saved `meters` and rectangles only pixel sizes.
+    `columns` holds per-row arrays for the non-scale rows, NaN where a
+    value does not apply.
+    """
+    ppm = scale_m = None
+    scale_rows = np.flatnonzero(kinds == KIND_SCALE)
+    if len(scale_rows):
+        r = scale_rows[-1]
+        m = meters[r]
+        px = float(np.hypot(pts[r, 2] - pts[r, 0], pts[r, 3] - pts[r, 1]))
+        if m == m and m > 0 and px > 0:
+            ppm = px / float(m)
+            scale_m = float(m)
+    rows = np.flatnonzero(kinds != KIND_SCALE)
+    k = kinds[rows]
+    p = pts[rows]
+    dx = np.abs(p[:, 2] - p[:, 0])
+    dy = np.abs(p[:, 3] - p[:, 1])
+    is_line = k == KIND_MEASURE
+    is_rect = k == KIND_RECT
+    nan = np.full(len(rows), np.nan)
+    length_px = np.where(is_line, np.hypot(dx, dy), nan)
+    width_px = np.where(is_rect, dx, nan)
+    height_px = np.where(is_rect, dy, nan)
+    if ppm:
+        length_m = length_px / ppm
+        width_m = width_px / ppm
+        height_m = height_px / ppm
+    else:
+        length_m = np.where(is_line, meters[rows], nan)
+        width_m = height_m = nan
+    cols = {
+        'row': rows, 'kind': k,
+        'length_m': length_m, 'width_m': width_m, 'height_m': height_m, 'area_m2': width_m * height_m,
+        'length_px': length_px, 'width_px': width_px, 'height_px': height_px,
+    }
+    return ppm, scale_m, cols
+
+
+def _hex(packed):
+    return '#%06x' % int(packed)
+
+
+def by_color(kinds, colors, length_m, area_m2):
+    """Totals per colour: list of dicts (color, measures, length_m, rects, area_m2), largest area first."""
+    if not len(kinds):
+        return []
+    packed = (colors[:, 0].astype(np.int64) << 16) | (colors[:, 1].astype(np.int64) << 8) | colors[:, 2]
+    uniq, inv = np.unique(packed, return_inverse=True)
+    inv = inv.ravel()
+    n = len(uniq)
+    lines = kinds == KIND_MEASURE
+    rects = kinds == KIND_RECT
+    counts_l = np.bincount(inv, weights=lines, minlength=n)
+    counts_r = np.bincount(inv, weights=rects, minlength=n)
+    sum_l = np.bincount(inv, weights=np.nan_to_num(length_m), minlength=n)
+    sum_a = np.bincount(inv, weights=np.nan_to_num(area_m2), minlength=n)
+    # groups that have objects but no metric value (no scale) report None, not 0
+    known_l = np.bincount(inv, weights=lines & ~np.isnan(length_m), minlength=n)
+    known_a = np.bincount(inv, weights=rects & ~np.isnan(area_m2), minlength=n)
+    out = []
+    for i in range(n):
+        out.append({
+            'color': _hex(uniq[i]),
+            'measures': int(counts_l[i]),
+            'length_m': float(sum_l[i]) if known_l[i] else None,
+            'rects': int(counts_r[i]),
+            'area_m2': float(sum_a[i]) if known_a[i] else None,
+        })
+    out.sort(key=lambda g: (-(g['area_m2'] or 0.0), -(g['length_m'] or 0.0), g['color']))
+    return out
+
+
+def project_report(proj_dir, objects=True):
+    """Measure one project folder; returns a report dict (see `write_json`)."""
+    path = project_file(proj_dir)
+    if path is None:
+        raise FileNotFoundError(f"no project file in {proj_dir}")
+    fields, kinds, pts, colors, meters = read_columns(path)
+    ppm, scale_m, cols = measure(kinds, pts, meters)
+    rows = cols['row']
+    groups = by_color(cols['kind'], colors[rows], cols['length_m'], cols['area_m2'])
+    n_lines = int(np.count_nonzero(cols['kind'] == KIND_MEASURE))
+    n_rects = int(np.count_nonzero(cols['kind'] == KIND_RECT))
+    rep = {
+        'name': os.path.basename(os.path.normpath(proj_dir)),
+        'path': proj_dir,
+        'file': os.path.basename(path),
+        'image': fields.get('image'),
+        'pixels_per_meter': ppm,
+        'scale_m': scale_m,
+        'measures': n_lines,
+        'rects': n_rects,
+        'length_m': _total(cols['length_m']) if n_lines else None,
+        'area_m2': _total(cols['area_m2']) if n_rects else None,
+        'by_color': groups,
+        'objects': None,
+    }
+    if objects:
+        packed = colors[rows]
+        rep['objects'] = {
+            'index': rows.tolist(),
+            'type': [KIND_NAMES[k] for k in cols['kind'].tolist()],
+            'color': ['#%02x%02x%02x' % tuple(c) for c in packed.tolist()],
+        }
+        for key in OBJECT_COLUMNS[3:]:
+            rep['objects'][key] = _numbers(cols[key])
+    return rep
+
+
+def _total(values):
+    known = ~np.isnan(values)
+    return float(values[known].sum()) if known.any() else None
+
+
+def _numbers(values):
+    # NaN -> None, everything else rounded
+    return [None if v != v else round(v, DECIMALS) for v in values.tolist()]
+
+
+def _round(v):
+    return None if v is None else round(v, DECIMALS)
+
+
+def _report_job(args):
+    proj_dir, objects = args
+    try:
+        return project_report(proj_dir, objects)
+    except Exception as e:
+        return {'name': os.path.basename(os.path.normpath(proj_dir)), 'path': proj_dir,
+                'error': f"{type(e).__name__}: {e}"}
+
+
+def totals(reports):
+    """Totals over all reports: project counts, object counts, length, area and per-colour sums."""
+    ok = [r for r in reports if not r.get('error')]
+    colors = {}
+    for r in ok:
+        for g in r['by_color']:
+            t = colors.setdefault(g['color'], {'color': g['color'], 'measures': 0, 'length_m': None,
+                                               'rects': 0, 'area_m2': None})
+            t['measures'] += g['measures']
+            t['rects'] += g['rects']
+            for key in ('length_m', 'area_m2'):
+                if g[key] is not None:
+                    t[key] = (t[key] or 0.0) + g[key]
+    groups = sorted(colors.values(), key=lambda g: (-(g['area_m2'] or 0.0), -(g['length_m'] or 0.0), g['color']))
+
+    def _sum(key):
+        vals = [r[key] for r in ok if r[key] is not None]
+        return sum(vals) if vals else None
+
+    return {
+        'projects': len(ok),
+        'failed': len(reports) - len(ok),
+        'unscaled': sum(1 for r in ok if r['pixels_per_meter'] is None),
+        'measures': sum(r['measures'] for r in ok),
+        'rects': sum(r['rects'] for r in ok),
+        'length_m': _sum('length_m'),
+        'area_m2': _sum('area_m2'),
+        'by_color': groups,
+    }
+
+
+# -- writers ----------------------------------------------------------------
+
+def _rounded_group(g):
+    return {k: (_round(v) if k in ('length_m', 'area_m2') else v) for k, v in g.items()}
+
+
+def write_csv(reports, fh, summary=False):
+    """One row per object (or per project and colour with `summary`)."""
+    w = csv.writer(fh)
+    if summary:
+        w.writerow(('project',) + SUMMARY_COLUMNS)
+        for r in reports:
+            for g in r.get('by_color') or ():
+                g = _rounded_group(g)
+                w.writerow([r['name']] + ['' if g[c] is None else g[c] for c in SUMMARY_COLUMNS])
+        return
+    w.writerow(('project',) + OBJECT_COLUMNS)
+    for r in reports:
+        objs = r.get('objects')
+        if not objs:
+            continue
+        cols = [objs[c] for c in OBJECT_COLUMNS]
+        for values in zip(*cols):
+            w.writerow([r['name']] + ['' if v is None else v for v in values])
+
+
+def write_json(reports, fh, summary=False):
+    projects = []
+    for r in reports:
+        r = dict(r)
+        for key in ('pixels_per_meter', 'length_m', 'area_m2'):
+            if key in r:
+                r[key] = _round(r[key])
+        if 'by_color' in r:
+            r['by_color'] = [_rounded_group(g) for g in r['by_color']]
+        objs = r.pop('objects', None)
+        if objs and not summary:
+            r['objects'] = [dict(zip(OBJECT_COLUMNS, values)) for values in zip(*(objs[c] for c in OBJECT_COLUMNS))]
+        projects.append(r)
+    t = totals(reports)
+    t['length_m'] = _round(t['length_m'])
+    t['area_m2'] = _round(t['area_m2'])
+    t['by_color'] = [_rounded_group(g) for g in t['by_color']]
+    json.dump({'version': REPORT_VERSION, 'projects': projects, 'totals': t}, fh, indent=1)
+    fh.write('\n')
+
+
+def _fmt(v, unit=''):
+    return '–' if v is None else f"{v:.2f}{unit}"
+
+
+def _color_table(groups):
+    lines = ['| colour | lines | length | rectangles | area |', '|---|---:|---:|---:|---:|']
+    for g in groups:
+        lines.append(f"| `{g['color']}` | {g['measures']} | {_fmt(g['length_m'], ' m')} | {g['rects']} | "
+                     f"{_fmt(g['area_m2'], ' m²')} |")
+    return lines
+
+
+def write_markdown(reports, fh, summary=False):
+    """Per-project tables of the totals by colour, then the totals over all projects."""
+    t = totals(reports)
+    out = ['# Measurement report', '',
+           f"{t['projects']} projects, {t['measures']} measure lines ({_fmt(t['length_m'], ' m')}), "
+           f"{t['rects']} rectangles ({_fmt(t['area_m2'], ' m²')})."]
+    if t['unscaled']:
+        out.append(f"{t['unscaled']} projects have no scale; their lengths come from saved values and "
+                   f"their areas are left out.")
+    if t['failed']:
+        out.append(f"{t['failed']} projects could not be read.")
+    if t['by_color']:
+        out += ['', '## All projects', ''] + _color_table(t['by_color'])
+    for r in reports:
+        out += ['', f"## {r['name']}", '']
+        if r.get('error'):
+            out.append(f"Could not be read: {r['error']}")
+            continue
+        scale = f"scale {r['scale_m']:g} m ({r['pixels_per_meter']:.2f} px/m)" if r['pixels_per_meter'] else 'no scale'
+        out.append(f"{r['measures']} lines, {r['rects']} rectangles, {scale}. Image: `{r['image']}`.")
+        if r['by_color']:
+            out += [''] + _color_table(r['by_color'])
+    fh.write('\n'.join(out) + '\n')
+
+
+WRITERS = {'csv': write_csv, 'json': write_json, 'md': write_markdown}
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog='flaner report',
+                                 description='Export the measurements of saved Flaner projects.')
+    ap.add_argument('paths', nargs='+', help='project folders, or folders containing project folders')
+    ap.add_argument('-o', '--output', default='-', help='output file; the extension picks the format (default: stdout)')
+    ap.add_argument('--format', choices=FORMATS, help='csv, json or md (default: from --output, else csv)')
+    ap.add_argument('--summary', action='store_true', help='totals per colour instead of one row per object')
+    ap.add_argument('-j', '--jobs', type=int, default=0, help='worker processes (default: CPU count)')
+    return ap
+
+
+def main(argv=None):
+    from batch_render import find_projects
+    args = build_parser().parse_args(argv)
+    fmt = args.format
+    if fmt is None:
+        ext = os.path.splitext(args.output)[1].lower().lstrip('.')
+        fmt = {'markdown': 'md'}.get(ext, ext) if ext in FORMATS + ('markdown',) else 'csv'
+    projects = find_projects(args.paths)
+    if not projects:
+        print('No projects found.', file=sys.stderr)
+        return 1
+    # markdown never lists single objects, so they are not collected for it
+    objects = not args.summary and fmt != 'md'
+    jobs = [(d, objects) for d in projects]
+    workers = min(args.jobs or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        # projects are small units of work; hand them out in chunks to keep the IPC overhead down
+        chunk = max(1, min(64, len(jobs) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            reports = list(pool.map(_report_job, jobs, chunksize=chunk))
+    else:
+        reports = [_report_job(j) for j in jobs]
+    for r in reports:
+        if r.get('error'):
+            print(f"FAILED {r['path']}: {r['error']}", file=sys.stderr)
+    if args.output == '-':
+        WRITERS[fmt](reports, sys.stdout, args.summary)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8', newline='' if fmt == 'csv' else None) as fh:
+            WRITERS[fmt](reports, fh, args.summary)
+        ok = sum(1 for r in reports if not r.get('error'))
+        print(f"{ok} of {len(reports)} projects reported to {args.output}", file=sys.stderr)
+    return 1 if any(r.get('error') for r in reports) else 0
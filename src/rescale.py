@@ -0,0 +1,253 @@
+"""Batch scale changes for saved projects.
+
+Usage (from the `src` folder, or with `src` on PYTHONPATH):
+
+    python flaner.py rescale [PROJECT_OR_FOLDER ...] (--meters M | --dpi DPI [--ratio N] | --from PROJECT)
+        [--dry-run] [--force] [--jobs N]
+
+Without paths every project under the projects root is processed; folders
+are expanded like `flaner render` does. The operations:
+
+- `--meters M`: the scale line keeps its endpoints and now stands for M meters
+  (e.g. after re-measuring the wall it was drawn along).
+- `--dpi DPI`: pixels per meter from the scanner resolution and the drawing's
+  ratio (1:N, default 1:1). The scale line keeps its endpoints and gets the
+  matching length; projects without one get a new horizontal line at the
+  top-left corner.
+- `--from PROJECT`: the pixels per meter of another project, applied the
+  same way.
+
+Project files are rewritten via a temp file and rename; with --dry-run
+nothing is written. The folder of a session that is still open (or crashed)
+in the app is skipped unless --force is given.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+METERS_PER_INCH = 0.0254
+# a scale line created from a DPI is this long on the image, give or take (see nice_meters)
+NEW_LINE_PX = 400
+
+
+def dpi_pixels_per_meter(dpi, ratio=1.0):
+    """Image pixels per real-world meter for a plan drawn at 1:`ratio` and scanned at `dpi`."""
+    if dpi <= 0 or ratio <= 0:
+        raise ValueError('dpi and ratio must be positive')
+    return dpi / METERS_PER_INCH / ratio
+
+
+def nice_meters(ppm, target_px=NEW_LINE_PX):
+    # a round length (1, 2 or 5 x 10^k m) whose line is about target_px long
+    raw = target_px / ppm
+    base = 10 ** math.floor(math.log10(raw))
+    for step in (5, 2, 1):
+        if step * base <= raw:
+            return step * base
+    return base
+
+
+def read_project(path):
+    """(fields, object dicts) of a project file, in their saved form."""
+    if path.endswith('.flnb'):
+        from project_binary import to_dicts
+        return to_dicts(path)
+    from project_loader import check_version
+    with open(path, 'r', encoding='utf-8') as fh:
+        data = json.load(fh)
+    check_version(data)
+    objects = data.pop('objects', None) or []
+    return data, objects
+
+
+def write_project(path, fields, objects):
+    """Rewrite a project file in its own format via a temp file and rename."""
+    if path.endswith('.flnb'):
+        from project_binary import write_binary
+        write_binary(path, fields, objects)
+        return
+    from project_writer import write_json_atomic
+    data = dict(fields)
+    data['objects'] = objects
+    write_json_atomic(path, data)
+
+
+def find_scale(objects):
+    """Index of the scale line that applies (the last one, as in the app), or None."""
+    found = None
+    for i, d in enumerate(objects):
+        if d.get('type') == 'scale':
+            found = i
+    return found
+
+
+def line_pixels(d):
+    (x1, y1), (x2, y2) = d['p1'], d['p2']
+    return math.hypot(x2 - x1, y2 - y1)
+
+
+def scale_of(d):
+    """(meters, pixels per meter) of a saved scale line; ppm is None when it is degenerate."""
+    meters = d.get('meters')
+    px = line_pixels(d)
+    if not meters or meters <= 0 or px <= 0:
+        return meters, None
+    return float(meters), px / float(meters)
+
+
+def apply_scale(objects, meters=None, ppm=None):
+    """Change the scale in a list of object dicts in place; returns (old ppm, new ppm, note).
+
+    With `meters` the scale line's length changes; with `ppm` it gets the
+    length that gives `ppm` pixels per meter, or a new line is added when
+    there is none. Raises ValueError when the operation cannot apply.
+    """
+    i = find_scale(objects)
+    old = scale_of(objects[i])[1] if i is not None else None
+    if meters is not None:
+        if i is None:
+            raise ValueError('no scale line to set meters on')
+        if line_pixels(objects[i]) <= 0:
+            raise ValueError('the scale line has no length')
+        objects[i]['meters'] = float(meters)
+        return old, scale_of(objects[i])[1], ''
+    if i is not None and line_pixels(objects[i]) > 0:
+        objects[i]['meters'] = line_pixels(objects[i]) / ppm
+        return old, ppm, ''
+    m = nice_meters(ppm)
+    line = {'type': 'scale', 'p1': [0.0, 0.0], 'p2': [m * ppm, 0.0], 'meters': m, 'width': 2}
+    if i is None:
+        objects.insert(0, line)
+        note = 'added a scale line'
+    else:
+        objects[i] = line
+        note = 'replaced a zero-length scale line'
+    return old, ppm, note
+
+
+def reference_ppm(proj_dir):
+    """Pixels per meter of the project in `proj_dir`."""
+    from project_loader import project_file
+    path = project_file(proj_dir)
+    if path is None:
+        raise FileNotFoundError(f"no project file in {proj_dir}")
+    _fields, objects = read_project(path)
+    i = find_scale(objects)
+    ppm = scale_of(objects[i])[1] if i is not None else None
+    if ppm is None:
+        raise ValueError(f"{proj_dir} has no usable scale line")
+    return ppm
+
+
+def rescale_project(proj_dir, meters=None, ppm=None, dry_run=False):
+    """Apply one scale operation to a project folder; returns (old ppm, new ppm, note)."""
+    from project_loader import project_file
+    path = project_file(proj_dir)
+    if path is None:
+        raise FileNotFoundError(f"no project file in {proj_dir}")
+    fields, objects = read_project(path)
+    old, new, note = apply_scale(objects, meters=meters, ppm=ppm)
+    if old is not None and new is not None and abs(old - new) <= 1e-9 * max(old, new) and not note:
+        return old, new, 'unchanged'
+    if not dry_run:
+        write_project(path, fields, objects)
+    return old, new, note
+
+
+def _rescale_job(args):
+    proj_dir, opts = args
+    try:
+        old, new, note = rescale_project(proj_dir, **opts)
+        return proj_dir, old, new, note, None
+    except Exception as e:
+        return proj_dir, None, None, '', f"{type(e).__name__}: {e}"
+
+
+def _ppm_text(v):
+    return '-' if v is None else f"{v:.2f}"
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog='flaner rescale', description='Change the scale of many saved Flaner projects.')
+    ap.add_argument('paths', nargs='*', help='project folders, or folders containing project folders '
+                                             '(default: the projects root)')
+    op = ap.add_mutually_exclusive_group(required=True)
+    op.add_argument('--meters', type=float, help='new real-world length of the existing scale lines')
+    op.add_argument('--dpi', type=float, help='scan resolution in dots per inch')
+    op.add_argument('--from', dest='reference', metavar='PROJECT', help='copy the pixels per meter of this project')
+    ap.add_argument('--ratio', type=float, default=1.0, help='drawing ratio 1:N for --dpi (default 1)')
+    ap.add_argument('-n', '--dry-run', action='store_true', help='report the changes without writing anything')
+    ap.add_argument('--force', action='store_true', help='also rewrite a project that is open in the app')
+    ap.add_argument('-j', '--jobs', type=int, default=0, help='worker processes (default: CPU count)')
+    return ap
+
+
+def main(argv=None):
+    from batch_render import find_projects
+    from projects_root import get_projects_root
+    args = build_parser().parse_args(argv)
+    if args.meters is not None and args.meters <= 0:
+        print('--meters must be positive.', file=sys.stderr)
+        return 2
+    paths = args.paths or [get_projects_root()]
+    try:
+        if args.dpi is not None:
+            opts = {'ppm': dpi_pixels_per_meter(args.dpi, args.ratio)}
+        elif args.reference is not None:
+            opts = {'ppm': reference_ppm(args.reference)}
+        else:
+            opts = {'meters': args.meters}
+    except Exception as e:
+        print(f"Cannot determine the scale: {e}", file=sys.stderr)
+        return 2
+    opts['dry_run'] = args.dry_run
+
+    projects = find_projects(paths)
+    if args.reference is not None:
+        ref = os.path.realpath(args.reference)
+        projects = [d for d in projects if os.path.realpath(d) != ref]
+    if not args.force:
+        # a session that is open (or crashed) would write its own scale back over ours
+        from journal import read_active
+        active = read_active(get_projects_root())
+        if active:
+            active = os.path.realpath(active)
+            for d in projects:
+                if os.path.realpath(d) == active:
+                    print(f"skipped {d}: open in Flaner (use --force)", file=sys.stderr)
+            projects = [d for d in projects if os.path.realpath(d) != active]
+    if not projects:
+        print('No projects found.', file=sys.stderr)
+        return 1
+    if 'ppm' in opts:
+        print(f"target scale: {opts['ppm']:.4f} px/m", file=sys.stderr)
+
+    jobs = [(d, opts) for d in projects]
+    workers = min(args.jobs or os.cpu_count() or 1, len(jobs))
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = (f.result() for f in as_completed([pool.submit(_rescale_job, j) for j in jobs]))
+    else:
+        results = (_rescale_job(j) for j in jobs)
+    failed = changed = 0
+    verb = 'would change' if args.dry_run else 'changed'
+    try:
+        for i, (proj_dir, old, new, note, err) in enumerate(results, 1):
+            prefix = f"[{i}/{len(jobs)}]"
+            if err:
+                failed += 1
+                print(f"{prefix} FAILED {proj_dir}: {err}", file=sys.stderr)
+                continue
+            if note != 'unchanged':
+                changed += 1
+            extra = f" ({note})" if note else ''
+            print(f"{prefix} {proj_dir}: {_ppm_text(old)} -> {_ppm_text(new)} px/m{extra}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    print(f"{verb} {changed} of {len(jobs)} projects, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,165 @@
+import numpy as np
+
+from spatial import GridIndex
+from snapping import SnapIndex
+from store import ObjectStore, SHAPE_BOX
+from lod import DETAIL_MERGED, detail_levels
+
+
+class Scene:
+    """The editable plan contents: the scale line plus the other drawable objects.
+
+    Structural changes go through these methods so the column store and the
+    spatial and snap indexes stay in sync with `objects` (store row i is
+    `objects[i]`); callers that move an object in place report it with
+    `moved`. The indexes are built on first use, so loading a project does
+    not pay for them up front.
+    """
+    def __init__(self):
+        self.scale_object = None  # only one scale allowed
+        self.objects = []  # other drawable objects (MeasureLine, Rectangle)
+        self.store = ObjectStore()
+        self._index = None
+        self._snaps = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = GridIndex()
+            self._index.rebuild(self.objects)
+        return self._index
+
+    @property
+    def snaps(self):
+        # snap points of `objects`; the scale line is checked on its own
+        if self._snaps is None:
+            self._snaps = SnapIndex()
+            self._snaps.rebuild(self.objects)
+        return self._snaps
+
+    @property
+    def pixels_per_meter(self):
+        try:
+            return self.scale_object.pixels_per_meter if self.scale_object else None
+        except Exception:
+            return None
+
+    def is_empty(self):
+        return self.scale_object is None and not self.objects
+
+    def add(self, obj, pos=None):
+        if pos is None or pos >= len(self.objects):
+            self.objects.append(obj)
+            self.store.insert(obj)
+            if self._index is not None:
+                self._index.insert(obj)
+            if self._snaps is not None:
+                self._snaps.insert(obj)
+        else:
+            # re-inserting below other objects: rebuild so stacking order matches the list
+            self.objects.insert(pos, obj)
+            self.store.insert(obj, pos)
+            self._index = None
+            if self._snaps is not None:
+                self._snaps.insert(obj)
+
+    def extend(self, objs):
+        # append a batch (e.g. while a project streams in)
+        for obj in objs:
+            self.objects.append(obj)
+            self.store.insert(obj)
+            if self._index is not None:
+                self._index.insert(obj)
+            if self._snaps is not None:
+                self._snaps.insert(obj)
+
+    def remove(self, obj):
+        """Remove `obj` and return the list position it had."""
+        pos = self.store.remove(obj) if obj._store is self.store else self.objects.index(obj)
+        del self.objects[pos]
+        if self._index is not None:
+            self._index.remove(obj)
+        if self._snaps is not None:
+            self._snaps.remove(obj)
+        return pos
+
+    def position(self, obj):
+        """List position of `obj` in `objects`."""
+        return obj._row if obj._store is self.store else self.objects.index(obj)
+
+    def set_scale(self, obj):
+        """Replace the scale line and return the previous one."""
+        old = self.scale_object
+        self.scale_object = obj
+        return old
+
+    def moved(self, obj):
+        if self._index is not None and obj in self._index:
+            self._index.update(obj)
+        if self._snaps is not None and obj in self._snaps:
+            self._snaps.update(obj)
+
+    def replace(self, scale_object, objects, columns=None):
+        """Swap in new contents; `columns` (pts, width, color, meters, shape) fill the store in one go."""
+        self.scale_object = scale_object
+        self.store.clear()
+        self.objects = list(objects)
+        if columns is not None:
+            self.store.load(self.objects, *columns)
+        else:
+            for obj in self.objects:
+                self.store.insert(obj)
+        self._index = None
+        self._snaps = None
+
+    def visible_objects(self, image_rect, image_scale, viewport, text_scale=1.0):
+        """Objects (bottom to top) whose drawing may touch the screen rect `viewport`."""
+        rows = self.store.visible_rows(image_rect, image_scale, viewport, text_scale)
+        owners = self.store.owners
+        return [owners[i] for i in rows.tolist()]
+
+    def visible_detail(self, image_rect, image_scale, viewport, text_scale=1.0):
+        """Level-of-detail pass over the objects that may touch `viewport`.
+
+        Returns (pairs, merged): `pairs` lists (object, detail) bottom to top,
+        and `merged` holds the screen endpoints, colours and box flags of the
+        objects too small to draw one by one, for `lod.draw_merged`.
+        """
+        store = self.store
+        rows = store.visible_rows(image_rect, image_scale, viewport, text_scale)
+        pts = store.screen_points(image_rect, image_scale)[rows]
+        levels = detail_levels(pts, text_scale)
+        small = levels == DETAIL_MERGED
+        drawn = rows[~small]
+        owners = store.owners
+        pairs = list(zip([owners[i] for i in drawn.tolist()], levels[~small].tolist()))
+        merged_rows = rows[small]
+        return pairs, (pts[small], store.color[merged_rows], store.shape[merged_rows] == SHAPE_BOX)
+
+    def hit_test(self, sx, sy, image_rect, image_scale, tol=8):
+        """Top-most object under screen point (sx, sy); the scale line wins."""
+        if self.scale_object is not None:
+            try:
+                if self.scale_object.hit_test(sx, sy, image_rect, image_scale, tol=tol):
+                    return self.scale_object
+            except Exception:
+                pass
+        # only the objects of the index cells around the point are tested; one
+        # extra pixel covers the rounding of screen points
+        r = (tol + 1) / image_scale
+        x = (sx - image_rect.x) / image_scale
+        y = (sy - image_rect.y) / image_scale
+        near = self.index.candidates(x - r, y - r, x + r, y + r)
+        if not near:
+            return None
+        rows = np.sort(np.fromiter((self.position(o) for o in near), dtype=np.int64, count=len(near)))
+        rows = self.store.hit_rows(sx, sy, image_rect, image_scale, tol, rows)
+        return self.store.owners[int(rows[-1])] if len(rows) else None
+
+    def to_dicts(self):
+        out = []
+        if self.scale_object:
+            out.append(self.scale_object.to_dict())
+        for o in self.objects:
+            out.append(o.to_dict())
+        return out
@@ -0,0 +1,213 @@
+import math
+from collections import namedtuple
+
+import pygame
+
+from objects.rectangle import Rectangle
+
+# screen pixels within which the pointer is pulled to a snap target
+SNAP_TOLERANCE = 10
+# cell edge of the point index, in original-image pixels
+CELL_SIZE = 128
+# candidate kinds, strongest first: within the tolerance an endpoint beats a
+# midpoint, which beats a point on an edge, which beats a grid intersection
+KINDS = ('end', 'mid', 'edge', 'grid')
+_RANK = {k: i for i, k in enumerate(KINDS)}
+# half size of the on-screen marker, in screen pixels
+MARKER_RADIUS = 6
+MARKER_COLOR = (255, 230, 0)
+
+# sx, sy: screen position (float); kind: one of KINDS; obj: the owner (None for the grid)
+SnapTarget = namedtuple('SnapTarget', 'sx sy kind obj')
+
+
+def snap_points(obj):
+    """(x, y, kind) candidate points of an object in original-image pixels."""
+    try:
+        (x1, y1), (x2, y2) = obj.p1, obj.p2
+    except Exception:
+        return []
+    if isinstance(obj, Rectangle):
+        xa, xb = min(x1, x2), max(x1, x2)
+        ya, yb = min(y1, y2), max(y1, y2)
+        xm, ym = (xa + xb) / 2.0, (ya + yb) / 2.0
+        return [(xa, ya, 'end'), (xb, ya, 'end'), (xa, yb, 'end'), (xb, yb, 'end'),
+                (xm, ya, 'mid'), (xb, ym, 'mid'), (xm, yb, 'mid'), (xa, ym, 'mid')]
+    return [(x1, y1, 'end'), (x2, y2, 'end'), ((x1 + x2) / 2.0, (y1 + y2) / 2.0, 'mid')]
+
+
+def snap_segments(obj):
+    """((x1, y1), (x2, y2)) edges of an object in original-image pixels."""
+    try:
+        (x1, y1), (x2, y2) = obj.p1, obj.p2
+    except Exception:
+        return []
+    if isinstance(obj, Rectangle):
+        return [((x1, y1), (x2, y1)), ((x2, y1), (x2, y2)), ((x2, y2), (x1, y2)), ((x1, y2), (x1, y1))]
+    return [((x1, y1), (x2, y2))]
+
+
+def nearest_on_segment(x, y, a, b):
+    """Closest point to (x, y) on the segment a-b."""
+    (ax, ay), (bx, by) = a, b
+    dx, dy = bx - ax, by - ay
+    ll = dx * dx + dy * dy
+    if ll <= 0:
+        return ax, ay
+    t = max(0.0, min(1.0, ((x - ax) * dx + (y - ay) * dy) / ll))
+    return ax + t * dx, ay + t * dy
+
+
+class SnapIndex:
+    """Uniform grid over the snap points (endpoints, corners, midpoints) of objects.
+
+    Kept in step with the scene like `GridIndex`: `insert`, `update` after an
+    object moved or resized, `remove`. Only the cells of the object's old and
+    new points are touched, so an edit costs a handful of dict operations
+    whatever the size of the plan.
+    """
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = float(cell_size)
+        self._cells = {}    # (cx, cy) -> {obj: [(x, y, kind), ...]}
+        self._entries = {}  # obj -> list of cells holding its points
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, obj):
+        return obj in self._entries
+
+    def _cell(self, x, y):
+        cs = self.cell_size
+        return int(math.floor(x / cs)), int(math.floor(y / cs))
+
+    def insert(self, obj):
+        if obj in self._entries:
+            self.remove(obj)
+        cells = []
+        for pt in snap_points(obj):
+            c = self._cell(pt[0], pt[1])
+            bucket = self._cells.get(c)
+            if bucket is None:
+                bucket = self._cells[c] = {}
+            pts = bucket.get(obj)
+            if pts is None:
+                pts = bucket[obj] = []
+                cells.append(c)
+            pts.append(pt)
+        self._entries[obj] = cells
+
+    def update(self, obj):
+        self.insert(obj)
+
+    def remove(self, obj):
+        for c in self._entries.pop(obj, ()):
+            bucket = self._cells.get(c)
+            if bucket is not None:
+                bucket.pop(obj, None)
+                if not bucket:
+                    del self._cells[c]
+
+    def clear(self):
+        self._cells.clear()
+        self._entries.clear()
+
+    def rebuild(self, objs):
+        self.clear()
+        for o in objs:
+            try:
+                self.insert(o)
+            except Exception:
+                continue
+
+    def query(self, x, y, radius):
+        """(x, y, kind, obj) of the points within `radius` of (x, y)."""
+        out = []
+        r2 = radius * radius
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = self._cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for obj, pts in bucket.items():
+                    for px, py, kind in pts:
+                        if (px - x) ** 2 + (py - y) ** 2 <= r2:
+                            out.append((px, py, kind, obj))
+        return out
+
+
+def find_snap(scene, sx, sy, image_rect, image_scale, tol=SNAP_TOLERANCE, grid=None, exclude=None):
+    """Snap target for the screen point (sx, sy), or None when nothing is within `tol` screen pixels.
+
+    Candidates are the points of `scene.snaps` near the pointer, the nearest
+    point on the edges of the objects `scene.index` finds there, the scale
+    line, and with `grid` (see `grid.nearest_intersection`'s arguments after
+    the point) the nearest grid intersection. `exclude` (the object being
+    edited) is never snapped to. The strongest kind wins, then the nearest.
+    """
+    if not image_scale:
+        return None
+    x = (sx - image_rect.x) / image_scale
+    y = (sy - image_rect.y) / image_scale
+    r = tol / image_scale
+    best = None
+    best_key = None
+
+    def consider(px, py, kind, obj):
+        nonlocal best, best_key
+        d2 = (px - x) ** 2 + (py - y) ** 2
+        if d2 > r * r:
+            return
+        key = (_RANK[kind], d2)
+        if best_key is None or key < best_key:
+            best_key = key
+            best = (px, py, kind, obj)
+
+    for px, py, kind, obj in scene.snaps.query(x, y, r):
+        if obj is not exclude:
+            consider(px, py, kind, obj)
+    near = [o for o in scene.index.query_point(x, y, r) if o is not exclude]
+    scale = scene.scale_object
+    if scale is not None and scale is not exclude:
+        for px, py, kind in snap_points(scale):
+            consider(px, py, kind, scale)
+        near.append(scale)
+    # edges only matter when no point is in reach
+    if best is None or _RANK[best[2]] > _RANK['edge']:
+        for obj in near:
+            for a, b in snap_segments(obj):
+                px, py = nearest_on_segment(x, y, a, b)
+                consider(px, py, 'edge', obj)
+    if best is None and grid is not None:
+        from grid import nearest_intersection
+        hit = nearest_intersection(sx, sy, image_rect, image_scale, *grid)
+        if hit is not None and math.hypot(hit[0] - sx, hit[1] - sy) <= tol:
+            return SnapTarget(hit[0], hit[1], 'grid', None)
+    if best is None:
+        return None
+    px, py, kind, obj = best
+    return SnapTarget(image_rect.x + px * image_scale, image_rect.y + py * image_scale, kind, obj)
+
+
+def marker_rect(target):
+    """Screen rect covered by the marker of `target` (for dirty-rect invalidation)."""
+    r = MARKER_RADIUS + 2
+    return pygame.Rect(int(target.sx) - r, int(target.sy) - r, 2 * r + 2, 2 * r + 2)
+
+
+def draw_marker(surface, target, color=MARKER_COLOR):
+    """Square on endpoints and corners, triangle on midpoints, cross on edges, plus on the grid."""
+    x, y = int(round(target.sx)), int(round(target.sy))
+    r = MARKER_RADIUS
+    if target.kind == 'end':
+        pygame.draw.rect(surface, color, (x - r, y - r, 2 * r + 1, 2 * r + 1), 2)
+    elif target.kind == 'mid':
+        pygame.draw.polygon(surface, color, [(x, y - r), (x + r, y + r), (x - r, y + r)], 2)
+    elif target.kind == 'edge':
+        pygame.draw.line(surface, color, (x - r, y - r), (x + r, y + r), 2)
+        pygame.draw.line(surface, color, (x - r, y + r), (x + r, y - r), 2)
+    else:
+        pygame.draw.line(surface, color, (x - r, y), (x + r, y), 2)
+        pygame.draw.line(surface, color, (x, y - r), (x, y + r), 2)
@@ -0,0 +1,125 @@
+import math
+
+# cell edge in original-image pixels
+CELL_SIZE = 256
+# objects covering more cells than this are kept in a short always-tested list
+MAX_CELLS = 256
+
+
+class GridIndex:
+    """Uniform grid over the original-image bounding boxes of drawable objects.
+
+    Objects are registered with `insert`, re-bucketed with `update` after they
+    move or resize and dropped with `remove`. Queries return candidates
+    ordered top-most first (most recently inserted first), matching the
+    `reversed(objects)` selection order.
+    """
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = float(cell_size)
+        self._cells = {}     # (cx, cy) -> set of objects
+        self._entries = {}   # obj -> (seq, cells or None when oversized)
+        self._oversized = set()
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, obj):
+        return obj in self._entries
+
+    def _cells_for(self, bounds):
+        x0, y0, x1, y1 = bounds
+        cs = self.cell_size
+        cx0, cy0 = int(math.floor(x0 / cs)), int(math.floor(y0 / cs))
+        cx1, cy1 = int(math.floor(x1 / cs)), int(math.floor(y1 / cs))
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > MAX_CELLS:
+            return None
+        return [(cx, cy) for cy in range(cy0, cy1 + 1) for cx in range(cx0, cx1 + 1)]
+
+    def _link(self, obj, cells):
+        if cells is None:
+            self._oversized.add(obj)
+            return
+        for c in cells:
+            bucket = self._cells.get(c)
+            if bucket is None:
+                bucket = self._cells[c] = set()
+            bucket.add(obj)
+
+    def _unlink(self, obj, cells):
+        if cells is None:
+            self._oversized.discard(obj)
+            return
+        for c in cells:
+            bucket = self._cells.get(c)
+            if bucket is not None:
+                bucket.discard(obj)
+                if not bucket:
+                    del self._cells[c]
+
+    def insert(self, obj):
+        if obj in self._entries:
+            self.update(obj)
+            return
+        cells = self._cells_for(obj.bounds())
+        self._seq += 1
+        self._entries[obj] = (self._seq, cells)
+        self._link(obj, cells)
+
+    def update(self, obj):
+        entry = self._entries.get(obj)
+        if entry is None:
+            self.insert(obj)
+            return
+        seq, old_cells = entry
+        cells = self._cells_for(obj.bounds())
+        if cells == old_cells:
+            return
+        self._unlink(obj, old_cells)
+        self._entries[obj] = (seq, cells)
+        self._link(obj, cells)
+
+    def remove(self, obj):
+        entry = self._entries.pop(obj, None)
+        if entry is not None:
+            self._unlink(obj, entry[1])
+
+    def clear(self):
+        self._cells.clear()
+        self._entries.clear()
+        self._oversized.clear()
+        self._seq = 0
+
+    def rebuild(self, objs):
+        """Re-index `objs`, preserving their list order as the stacking order."""
+        self.clear()
+        for o in objs:
+            try:
+                self.insert(o)
+            except Exception:
+                continue
+
+    def candidates(self, x0, y0, x1, y1):
+        """Unordered objects of the cells the box touches (a superset of `query`)."""
+        found = set(self._oversized)
+        cs = self.cell_size
+        for cy in range(int(math.floor(y0 / cs)), int(math.floor(y1 / cs)) + 1):
+            for cx in range(int(math.floor(x0 / cs)), int(math.floor(x1 / cs)) + 1):
+                bucket = self._cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        return found
+
+    def query(self, x0, y0, x1, y1):
+        """Objects whose bounding box may intersect the box, top-most first."""
+        found = self.candidates(x0, y0, x1, y1)
+        out = []
+        for o in found:
+            bx0, by0, bx1, by1 = o.bounds()
+            if bx1 >= x0 and bx0 <= x1 and by1 >= y0 and by0 <= y1:
+                out.append(o)
+        out.sort(key=lambda o: self._entries[o][0], reverse=True)
+        return out
+
+    def query_point(self, x, y, radius=0.0):
+        return self.query(x - radius, y - radius, x + radius, y + radius)
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+
+# `flaner --startup-profile` re-runs flaner with this flag under `python -X importtime`
+CHILD_FLAG = '--startup-child'
+# prefix of the line the child prints its phase timings on
+REPORT_PREFIX = 'FLANER_STARTUP '
+# import rows listed in the report
+TOP_IMPORTS = 20
+
+
+class StartupTimer:
+    """Wall-clock marks from process start to the first presented frame.
+
+    `mark(phase)` records the time since the previous mark; `t0` is taken as
+    early as possible at the top of flaner.py, so the first phase covers the
+    module imports.
+    """
+    def __init__(self, t0):
+        self.t0 = t0
+        self._last = t0
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def total(self):
+        return self._last - self.t0
+
+    def emit(self):
+        import json
+        print(REPORT_PREFIX + json.dumps({'phases': self.phases, 'total': self.total()}), flush=True)
+
+
+def parse_importtime(text):
+    """(self us, cumulative us, depth, module) rows of `python -X importtime` output."""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len('import time:'):].split('|')
+            depth = (len(name) - len(name.lstrip())) // 2
+            rows.append((int(self_us), int(cum_us), depth, name.strip()))
+        except ValueError:
+            continue
+    return rows
+
+
+def run_profile(script, argv=()):
+    """Start flaner once under `-X importtime`, stop after the first frame and print where the time went."""
+    import json
+    import subprocess
+    env = dict(os.environ)
+    # the measurement should not pick up cached work from an earlier session
+    env.setdefault('FLANER_AUTOSAVE', '0')
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', script, CHILD_FLAG] + list(argv),
+                          env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    report = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(REPORT_PREFIX):
+            report = json.loads(line[len(REPORT_PREFIX):])
+    if report is None:
+        sys.stderr.write(proc.stderr[-4000:])
+        print('startup profile failed (exit status %d)' % proc.returncode)
+        return 1
+    rows = parse_importtime(proc.stderr)
+    print(f"startup to first frame: {report['total'] * 1000:.1f} ms  (process wall time {wall * 1000:.1f} ms)")
+    for phase, seconds in report['phases']:
+        print(f"  {phase:<14} {seconds * 1000:8.1f} ms")
+    # top-level imports (of flaner.py and of the interpreter itself), including what they pulled in
+    top = sorted((r for r in rows if r[2] == 0), key=lambda r: r[1], reverse=True)[:TOP_IMPORTS]
+    print(f"\nslowest imports (cumulative, {len(rows)} modules in total):")
+    for self_us, cum_us, depth, name in top:
+        print(f"  {name:<28} {cum_us / 1000:8.1f} ms  (self {self_us / 1000:.1f} ms)")
+    return 0
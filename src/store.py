@@ -0,0 +1,187 @@
+import numpy as np
+
+from invalidation import DECORATION_MARGIN, LABEL_EXTENT
+
+INITIAL_CAPACITY = 64
+# shape codes for the `shape` column
+SHAPE_SEGMENT = 0
+SHAPE_BOX = 1
+_SHAPES = {'segment': SHAPE_SEGMENT, 'box': SHAPE_BOX}
+
+
+def shape_code(obj):
+    return _SHAPES.get(getattr(obj, 'shape', 'segment'), SHAPE_SEGMENT)
+
+
+class ObjectStore:
+    """Columnar storage for the scene objects.
+
+    Row i holds the object at position i of the scene list: endpoints in
+    `pts` (x1, y1, x2, y2, original-image pixels) plus `width`, `color`,
+    `meters` (NaN when unset) and `shape`. Attached objects read and write
+    their row through properties (see `CanvasObject`), so the
+    original->screen transform, culling and hit tests run as array operations
+    over all rows at once.
+    """
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.n = 0
+        self.owners = []
+        self.version = 0
+        self._alloc(max(1, int(capacity)))
+        self._screen_key = None
+        self._screen = None
+
+    def _alloc(self, capacity):
+        n = self.n
+        pts = np.zeros((capacity, 4), dtype=np.float64)
+        width = np.ones(capacity, dtype=np.int32)
+        color = np.zeros((capacity, 3), dtype=np.uint8)
+        meters = np.full(capacity, np.nan, dtype=np.float64)
+        shape = np.zeros(capacity, dtype=np.int8)
+        if n:
+            pts[:n] = self.pts[:n]
+            width[:n] = self.width[:n]
+            color[:n] = self.color[:n]
+            meters[:n] = self.meters[:n]
+            shape[:n] = self.shape[:n]
+        self.pts, self.width, self.color, self.meters, self.shape = pts, width, color, meters, shape
+
+    def __len__(self):
+        return self.n
+
+    def touch(self):
+        # any edit of the columns invalidates the cached screen coordinates
+        self.version += 1
+
+    def _columns(self):
+        return (self.pts, self.width, self.color, self.meters, self.shape)
+
+    def insert(self, obj, pos=None):
+        """Attach `obj` at row `pos` (default: last), copying its fields into the columns."""
+        n = self.n
+        pos = n if pos is None or pos > n else max(0, int(pos))
+        values = obj._detached_values()
+        if n == len(self.pts):
+            self._alloc(len(self.pts) * 2)
+        if pos < n:
+            for col in self._columns():
+                col[pos + 1:n + 1] = col[pos:n].copy()
+        self.n = n + 1
+        self.owners.insert(pos, obj)
+        obj._store = self
+        self._write_row(pos, *values, shape=shape_code(obj))
+        for i in range(pos, self.n):
+            self.owners[i]._row = i
+        self.touch()
+
+    def remove(self, obj):
+        """Detach `obj`, copying its row back onto the object; returns its row."""
+        pos = obj._row
+        values = self.read_row(pos)
+        n = self.n
+        for col in self._columns():
+            col[pos:n - 1] = col[pos + 1:n].copy()
+        self.n = n - 1
+        del self.owners[pos]
+        for i in range(pos, self.n):
+            self.owners[i]._row = i
+        obj._store = None
+        obj._row = -1
+        obj._restore_values(values)
+        self.touch()
+        return pos
+
+    def clear(self):
+        for obj in list(self.owners):
+            values = self.read_row(obj._row)
+            obj._store = None
+            obj._row = -1
+            obj._restore_values(values)
+        self.owners = []
+        self.n = 0
+        self.touch()
+
+    def load(self, owners, pts, width, color, meters, shape):
+        """Replace every row with whole columns (row i belongs to `owners[i]`)."""
+        self.clear()
+        n = len(owners)
+        self._alloc(max(INITIAL_CAPACITY, n))
+        self.pts[:n] = pts
+        self.width[:n] = width
+        self.color[:n] = color
+        self.meters[:n] = meters
+        self.shape[:n] = shape
+        self.n = n
+        self.owners = list(owners)
+        for i, obj in enumerate(self.owners):
+            obj._store = self
+            obj._row = i
+        self.touch()
+
+    def _write_row(self, row, p1, p2, width, color, meters, shape=None):
+        self.pts[row] = (p1[0], p1[1], p2[0], p2[1])
+        self.width[row] = int(width)
+        self.color[row] = tuple(color)[:3]
+        self.meters[row] = np.nan if meters is None else float(meters)
+        if shape is not None:
+            self.shape[row] = shape
+
+    def read_row(self, row):
+        x1, y1, x2, y2 = self.pts[row].tolist()
+        m = float(self.meters[row])
+        return ((x1, y1), (x2, y2), int(self.width[row]), tuple(self.color[row].tolist()), None if m != m else m)
+
+    # -- per-frame vectorized queries --------------------------------------
+
+    def screen_points(self, image_rect, image_scale):
+        """Screen coordinates (n, 4) of all rows, computed once per view/edit."""
+        key = (image_rect.x, image_rect.y, image_scale, self.version)
+        if key != self._screen_key:
+            s = (self.pts[:self.n] * image_scale).astype(np.int64)
+            s[:, 0::2] += image_rect.x
+            s[:, 1::2] += image_rect.y
+            self._screen = s
+            self._screen_key = key
+        return self._screen
+
+    def visible_rows(self, image_rect, image_scale, viewport, text_scale=1.0):
+        """Rows whose drawing (line, arrows, labels) may touch `viewport`."""
+        if not self.n:
+            return np.zeros(0, dtype=np.int64)
+        s = self.screen_points(image_rect, image_scale)
+        margin = DECORATION_MARGIN + self.width[:self.n] * 3 + int(LABEL_EXTENT * max(0.0, text_scale))
+        x0 = np.minimum(s[:, 0], s[:, 2]) - margin
+        x1 = np.maximum(s[:, 0], s[:, 2]) + margin
+        y0 = np.minimum(s[:, 1], s[:, 3]) - margin
+        y1 = np.maximum(s[:, 1], s[:, 3]) + margin
+        vis = (x1 >= viewport.left) & (x0 < viewport.right) & (y1 >= viewport.top) & (y0 < viewport.bottom)
+        return np.flatnonzero(vis)
+
+    def hit_rows(self, sx, sy, image_rect, image_scale, tol=8, rows=None):
+        """Rows hit at screen point (sx, sy), bottom-most first.
+
+        Segments are hit within `tol` pixels of the line, boxes anywhere inside
+        the rectangle grown by `tol`. `rows` (ascending) limits the test to
+        those candidates.
+        """
+        if rows is None:
+            rows = np.arange(self.n, dtype=np.int64)
+        if not len(rows):
+            return np.zeros(0, dtype=np.int64)
+        s = self.screen_points(image_rect, image_scale)[rows].astype(np.float64)
+        x1, y1, x2, y2 = s[:, 0], s[:, 1], s[:, 2], s[:, 3]
+        dx = x2 - x1
+        dy = y2 - y1
+        px = sx - x1
+        py = sy - y1
+        seg_len2 = dx * dx + dy * dy
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.where(seg_len2 > 0, (px * dx + py * dy) / seg_len2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        ddx = px - t * dx
+        ddy = py - t * dy
+        seg_hit = (ddx * ddx + ddy * ddy) <= tol * tol
+        box_hit = ((np.minimum(x1, x2) - tol <= sx) & (sx <= np.maximum(x1, x2) + tol)
+                   & (np.minimum(y1, y2) - tol <= sy) & (sy <= np.maximum(y1, y2) + tol))
+        hit = np.where(self.shape[rows] == SHAPE_BOX, box_hit, seg_hit)
+        return rows[hit]
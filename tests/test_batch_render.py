@@ -0,0 +1,52 @@
+import json
+
+import pygame
+import pytest
+
+import batch_render
+from batch_render import render_project, saved_grid
+
+
+@pytest.fixture(scope='module', autouse=True)
+def headless():
+    batch_render._init_pygame()
+    yield
+    pygame.display.quit()
+
+
+def make_project(folder, grid=None):
+    folder.mkdir()
+    img = pygame.Surface((400, 300))
+    img.fill((255, 255, 255))
+    pygame.image.save(img, str(folder / 'plan.png'))
+    data = {'version': 1, 'image': 'plan.png',
+            'objects': [{'type': 'scale', 'p1': [0, 10], 'p2': [100, 10], 'meters': 1.0, 'width': 1}]}
+    if grid is not None:
+        data['grid'] = grid
+    (folder / 'project.json').write_text(json.dumps(data))
+    return str(folder)
+
+
+def render(tmp_path, d, name, **kw):
+    out = str(tmp_path / f'{name}.png')
+    render_project(d, out, **kw)
+    return pygame.image.tostring(pygame.image.load(out), 'RGB')
+
+
+def test_saved_grid_offset_follows_render_scale():
+    fields = {'grid': {'spacing_m': 1.0, 'offset_px': [10, -4], 'offset_scale': 2.0}}
+    assert saved_grid(fields, 1.0) == (1.0, (5.0, -2.0))
+    assert saved_grid({'grid': {'spacing_m': 0.25, 'offset_px': [3, 4]}}, 0.5) == (0.25, (1.5, 2.0))
+    assert saved_grid({}, 1.0) is None
+
+
+def test_render_uses_the_projects_grid(tmp_path):
+    d = make_project(tmp_path / 'metre', {'spacing_m': 1.0, 'offset_px': [30, 0], 'offset_scale': 1.0})
+    saved = render(tmp_path, d, 'saved')
+    assert saved == render(tmp_path, d, 'explicit', grid_spacing_m=1.0)
+    assert saved != render(tmp_path, d, 'half', grid_spacing_m=0.5)
+
+    plain = make_project(tmp_path / 'plain')
+    # no saved grid: 50 cm, no offset
+    assert render(tmp_path, plain, 'default') == render(tmp_path, plain, 'fifty', grid_spacing_m=0.5)
+    assert render(tmp_path, plain, 'default') != saved
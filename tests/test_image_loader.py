@@ -0,0 +1,15 @@
+import sys
+
+import image_loader
+
+
+def test_pillow_is_imported_on_first_preview(monkeypatch, tmp_path):
+    monkeypatch.setattr(image_loader, '_pil_image', None)
+    # without Pillow there is no preview, and the failed import is not retried
+    monkeypatch.setitem(sys.modules, 'PIL', None)
+    path = tmp_path / 'plan.jpg'
+    path.write_bytes(b'not decoded')
+    assert image_loader.decode_preview(str(path)) is None
+    assert image_loader._pil_image is False
+    monkeypatch.delitem(sys.modules, 'PIL')
+    assert image_loader._pil() is False
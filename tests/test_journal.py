@@ -0,0 +1,136 @@
+import json
+import os
+
+import pygame
+
+from history import History, AddObject, AddObjects, DeleteObject, MoveBy, MoveHandle, SetScale, SetWidth
+from journal import SceneJournal, apply_records, journal_path, read_journal
+from objects.measure_line import MeasureLine
+from objects.rectangle import Rectangle
+from objects.scale_line import ScaleLine
+from project_loader import AUTOSAVE_FILE, object_from_dict, split_scale
+from project_writer import PROJECT_SAVED, ProjectWriter
+from scene import Scene
+
+
+def make_scene():
+    scene = Scene()
+    scene.set_scale(ScaleLine((0, 0), (100, 0), 2.0))
+    scene.extend([MeasureLine((10, 10), (60, 10)), Rectangle((20, 20), (80, 70)), MeasureLine((5, 90), (5, 150))])
+    return scene
+
+
+def scene_from(dicts):
+    scene = Scene()
+    scale_obj, others = split_scale([object_from_dict(d) for d in dicts])
+    scene.replace(scale_obj, others)
+    return scene
+
+
+def dump(scene):
+    # tuples and lists compare unequal; compare the saved form
+    return json.loads(json.dumps(scene.to_dicts()))
+
+
+def journaled(tmp_path):
+    scene = make_scene()
+    journal = SceneJournal(str(tmp_path))
+    history = History(listener=lambda cmd, undone: journal.append(cmd.journal(scene, undone)))
+    return scene, journal, history
+
+
+def test_replay_matches_live_scene(tmp_path):
+    scene, journal, history = journaled(tmp_path)
+    snapshot = scene.to_dicts()
+
+    line = MeasureLine((200, 200), (260, 240))
+    scene.add(line)
+    history.record(AddObject(line))
+    rect = scene.objects[1]
+    rect.move_by(15, -5)
+    scene.moved(rect)
+    history.record(MoveBy(rect, 15, -5))
+    first = scene.objects[0]
+    pos = scene.remove(first)
+    history.record(DeleteObject(first, pos))
+    before = (line.p1, line.p2)
+    line.p1, line.p2 = (190, 210), (300, 250)
+    scene.moved(line)
+    history.record(MoveHandle(line, before, (line.p1, line.p2)))
+    batch = [Rectangle((400, 400), (450, 470)), MeasureLine((400, 500), (480, 500))]
+    scene.extend(batch)
+    history.record(AddObjects(batch))
+    old_widths = [(o, o.width) for o in [scene.scale_object] + scene.objects]
+    for o, _w in old_widths:
+        o.width = 4
+    history.record(SetWidth(old_widths, 4))
+    new_scale = ScaleLine((0, 0), (0, 200), 5.0)
+    history.record(SetScale(scene.set_scale(new_scale), new_scale))
+
+    history.undo(scene)   # scale
+    history.undo(scene)   # width
+    history.undo(scene)   # batch
+    history.undo(scene)   # handle
+    history.redo(scene)   # handle
+    history.redo(scene)   # batch
+    history.undo(scene)   # batch again
+    history.undo(scene)   # handle
+    history.undo(scene)   # delete: the first object goes back to position 0
+    history.redo(scene)
+
+    records = read_journal(str(tmp_path), journal.session)
+    assert len(records) == journal.seq
+    replayed = scene_from(snapshot)
+    apply_records(replayed, records, object_from_dict)
+    assert dump(replayed) == dump(scene)
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    journal = SceneJournal(str(tmp_path))
+    journal.append([{'op': 'grid', 'spacing_m': 0.5}, {'op': 'width', 'width': 3}])
+    journal.close()
+    with open(journal_path(str(tmp_path), journal.session), 'a', encoding='utf-8') as fh:
+        fh.write('{"op":"add","pos":0,"obj":{"type":"mea')
+
+    records = read_journal(str(tmp_path), journal.session)
+    assert [r['seq'] for r in records] == [1, 2]
+    grid = apply_records(make_scene(), records, object_from_dict)
+    assert grid['spacing_m'] == 0.5
+
+
+def test_compaction_keeps_records_after_snapshot(tmp_path):
+    scene = make_scene()
+    journal = SceneJournal(str(tmp_path))
+    old = journal_path(str(tmp_path), 'previous')
+    with open(old, 'w', encoding='utf-8') as fh:
+        fh.write('{"op":"width","width":9,"seq":1}\n')
+    for k in range(5):
+        journal.append([{'op': 'add', 'obj': MeasureLine((k, 0), (k, 10)).to_dict()}])
+    # a snapshot of the first three records, and two more edits while it is written
+    tag = (journal.session, journal.seq - 2)
+
+    pygame.display.init()
+    try:
+        writer = ProjectWriter()
+        writer.start()
+        image = tmp_path / 'plan.png'
+        image.write_bytes(b'png')
+        writer.submit(str(tmp_path), str(image), scene.to_dicts(), None, journal.snapshot_fields(), tag, autosave=True)
+        writer.close()
+        events = [e for e in pygame.event.get(PROJECT_SAVED) if e.tag == tag]
+    finally:
+        pygame.display.quit()
+    assert len(events) == 1 and events[0].error is None
+    assert os.path.isfile(os.path.join(str(tmp_path), AUTOSAVE_FILE))
+    assert not os.path.exists(os.path.join(str(tmp_path), 'project.json'))
+
+    # what the PROJECT_SAVED handler does for the journal's session
+    journal.compacted(events[0].tag[1])
+    assert [r['seq'] for r in read_journal(str(tmp_path), journal.session)] == [4, 5]
+    assert not os.path.exists(old)
+
+    journal.append([{'op': 'width', 'width': 2}])
+    journal.compacted(2)  # an older snapshot finishing late drops nothing
+    journal.close()
+    assert [r['seq'] for r in read_journal(str(tmp_path), journal.session)] == [4, 5, 6]
+    assert [r['seq'] for r in read_journal(str(tmp_path), journal.session, after_seq=5)] == [6]
@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+import project_binary
+from project_binary import binary_to_json, json_to_binary, load_binary, read_binary, to_dicts
+from project_loader import SCHEMA_VERSION, ProjectFormatError, load_project, object_from_dict
+from scene import Scene
+
+
+def normalized(objs):
+    # the form `to_dict` writes, through JSON so tuples and lists compare equal
+    return json.loads(json.dumps([object_from_dict(d).to_dict() for d in objs]))
+
+
+def project(with_scale=True, n=40):
+    objs = []
+    if with_scale:
+        objs.append({'type': 'scale', 'p1': [12.5, 30.0], 'p2': [512.75, 30.0], 'meters': 5.5, 'width': 3})
+    for k in range(n):
+        x = 7.0 + k * 13.3
+        objs.append({'type': 'measure', 'p1': [x, 100.125], 'p2': [x, 340.5], 'meters': (k * 0.37 if k % 2 else None), 'width': 1 + k % 4})
+        objs.append({'type': 'rect', 'p1': [x, 400], 'p2': [x + 9.75, 455.5], 'color': [k * 5 % 256, 120, 33], 'width': 2})
+    return {'version': SCHEMA_VERSION, 'image': 'plan.png', 'grid': {'spacing_m': 0.25, 'offset_px': [3, 4]}, 'objects': objs}
+
+
+def convert(tmp_path, data):
+    src = str(tmp_path / 'project.json')
+    dst = str(tmp_path / 'project.flnb')
+    with open(src, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh)
+    json_to_binary(src, dst)
+    return src, dst
+
+
+@pytest.mark.parametrize('with_scale, n', [(True, 40), (False, 40), (True, 0), (False, 0)])
+def test_json_binary_round_trip(tmp_path, with_scale, n):
+    data = project(with_scale, n)
+    src, dst = convert(tmp_path, data)
+
+    fields, dicts = to_dicts(dst)
+    assert json.loads(json.dumps(dicts)) == normalized(data['objects'])
+    assert fields == {k: v for k, v in data.items() if k != 'objects'}
+
+    # and back to JSON: the same project as the one loaded from the original file
+    back = str(tmp_path / 'back.json')
+    binary_to_json(dst, back)
+    _fields, scale_a, objs_a = load_project(src)
+    _fields, scale_b, objs_b = load_project(back)
+    assert (scale_b is None) == (not with_scale)
+    assert json.loads(json.dumps([o.to_dict() for o in objs_b])) == json.loads(json.dumps([o.to_dict() for o in objs_a]))
+
+
+@pytest.mark.parametrize('with_scale, n', [(True, 25), (False, 25), (False, 0)])
+def test_binary_columns_fill_the_scene(tmp_path, with_scale, n):
+    data = project(with_scale, n)
+    _src, dst = convert(tmp_path, data)
+
+    fields, scale_object, objects, columns = load_binary(dst)
+    scene = Scene()
+    scene.replace(scale_object, objects, columns)
+    assert json.loads(json.dumps(scene.to_dicts())) == normalized(data['objects'])
+    assert len(scene.store) == len(objects) == 2 * n
+    if n:
+        # the store rows line up with the objects
+        last = scene.objects[-1]
+        assert scene.position(last) == len(objects) - 1
+        assert tuple(scene.store.pts[len(objects) - 1]) == (last.p1[0], last.p1[1], last.p2[0], last.p2[1])
+
+
+def test_unknown_sections_and_types_are_left_out(tmp_path):
+    data = project(True, 3)
+    data['objects'].insert(2, {'type': 'stairs', 'p1': [0, 0], 'p2': [1, 1]})
+    _src, dst = convert(tmp_path, data)
+    _fields, names, records = read_binary(dst)
+    assert names == ['scale'] + ['measure', 'rect'] * 3
+    assert len(records) == 7
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    _src, dst = convert(tmp_path, project(True, 5))
+    with open(dst, 'rb') as fh:
+        buf = fh.read()
+    with pytest.raises(ProjectFormatError):
+        project_binary.decode(buf[:-10])
+    with pytest.raises(ProjectFormatError):
+        project_binary.decode(b'JSON' + buf[4:])
+
+
+def test_convert_folder(tmp_path):
+    data = project(True, 4)
+    with open(tmp_path / 'project.json', 'w', encoding='utf-8') as fh:
+        json.dump(data, fh)
+    assert project_binary.main([str(tmp_path)]) == 0
+    assert os.path.isfile(tmp_path / 'project.flnb')
+    assert json.loads(json.dumps(to_dicts(str(tmp_path / 'project.flnb'))[1])) == normalized(data['objects'])
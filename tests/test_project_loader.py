@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from project_loader import (BATCH_SIZE, READ_CHUNK, SCHEMA_VERSION, ProjectFormatError, ProjectReader,
+                            load_project, object_from_dict)
+
+
+def sample_objects(n):
+    objs = [{'type': 'scale', 'p1': [10.5, 20.25], 'p2': [410.125, 20.25], 'meters': 4.2, 'width': 2}]
+    for k in range(n):
+        # long floats so numbers straddle chunk boundaries
+        x = k * 3.141592653589793
+        objs.append({'type': 'measure', 'p1': [x, 1.0 / (k + 1)], 'p2': [x + 50, 77.7], 'meters': None, 'width': 1 + k % 3})
+        objs.append({'type': 'rect', 'p1': [x, 200], 'p2': [x + 20.5, 260], 'color': [k % 256, 200, 50], 'width': 2})
+    return objs
+
+
+def write(path, data, **kw):
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh, **kw)
+    return str(path)
+
+
+def read_all(path, chunk_size=READ_CHUNK, size=BATCH_SIZE):
+    reader = ProjectReader(path, chunk_size=chunk_size)
+    try:
+        out = []
+        for batch in reader.batches(size):
+            out.extend(o.to_dict() for o in batch)
+        return reader, json.loads(json.dumps(out))
+    finally:
+        reader.close()
+
+
+@pytest.mark.parametrize('chunk_size, size', [(1, 7), (13, 64), (4096, BATCH_SIZE), (READ_CHUNK, BATCH_SIZE), (1 << 24, 10 ** 6)])
+def test_chunk_sizes_give_identical_objects(tmp_path, chunk_size, size):
+    n = 150 if chunk_size < 100 else 2500
+    objs = sample_objects(n)
+    path = write(tmp_path / 'project.json', {'version': SCHEMA_VERSION, 'image': 'plan.png', 'grid': {'spacing_m': 0.5}, 'objects': objs})
+    expected = json.loads(json.dumps([object_from_dict(d).to_dict() for d in objs]))
+
+    reader, got = read_all(path, chunk_size, size)
+    assert got == expected
+    assert reader.fields == {'version': SCHEMA_VERSION, 'image': 'plan.png', 'grid': {'spacing_m': 0.5}}
+    assert reader.skipped == 0
+
+
+def test_fields_after_objects_are_read(tmp_path):
+    path = write(tmp_path / 'project.json', {'objects': sample_objects(3), 'image': 'plan.png', 'version': 1})
+    reader, got = read_all(path, chunk_size=5)
+    assert len(got) == 7
+    assert reader.fields == {'image': 'plan.png', 'version': 1}
+
+
+def test_pre_versioned_project_loads(tmp_path):
+    # the layout written before `version` existed: image first, indent=2, no version field
+    objs = sample_objects(2)
+    path = write(tmp_path / 'project.json', {'image': 'plan.png', 'objects': objs}, indent=2)
+
+    reader = ProjectReader(path)
+    assert reader.read_header() == {'image': 'plan.png'}
+    reader.close()
+    fields, scale_object, objects = load_project(path)
+    assert fields == {'image': 'plan.png'}
+    assert scale_object is not None and scale_object.meters == 4.2
+    assert [o.to_dict()['type'] for o in objects] == ['measure', 'rect', 'measure', 'rect']
+
+
+def test_newer_version_is_rejected(tmp_path):
+    path = write(tmp_path / 'project.json', {'version': SCHEMA_VERSION + 1, 'image': 'plan.png', 'objects': []})
+    with pytest.raises(ProjectFormatError):
+        load_project(path)
+
+
+def test_unknown_type_and_bad_scale_are_skipped(tmp_path):
+    objs = sample_objects(1)
+    objs.insert(1, {'type': 'stairs', 'p1': [0, 0], 'p2': [1, 1]})
+    objs.append({'type': 'scale', 'p1': [0, 0], 'p2': [5, 0], 'width': 2})
+    path = write(tmp_path / 'project.json', {'image': 'plan.png', 'objects': objs})
+
+    reader, got = read_all(path)
+    assert [d['type'] for d in got] == ['scale', 'measure', 'rect']
+    assert reader.skipped == 2
+    assert 'stairs' in reader.first_error
+
+    with pytest.raises(ProjectFormatError, match='stairs'):
+        object_from_dict({'type': 'stairs'})
+    with pytest.raises(ProjectFormatError, match='meters'):
+        object_from_dict({'type': 'scale', 'p1': [0, 0], 'p2': [5, 0]})
@@ -0,0 +1,96 @@
+import io
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+
+from project_binary import json_to_binary
+from report import KIND_MEASURE, KIND_RECT, by_color, project_report, write_json
+
+RED = [255, 0, 0]
+BLUE = [0, 0, 255]
+
+
+def objects(with_scale=True):
+    out = []
+    if with_scale:
+        # 200 px = 2 m: 100 px per meter
+        out.append({'type': 'scale', 'p1': [0, 0], 'p2': [0, 200], 'meters': 2.0, 'width': 2})
+    out += [
+        {'type': 'measure', 'p1': [10, 10], 'p2': [310, 410], 'meters': 3.5, 'width': 1},
+        {'type': 'rect', 'p1': [300, 100], 'p2': [200, 300], 'color': RED, 'width': 2},
+        {'type': 'rect', 'p1': [0, 0], 'p2': [50, 50], 'color': RED, 'width': 2},
+        {'type': 'rect', 'p1': [0, 0], 'p2': [100, 40], 'color': BLUE, 'width': 2},
+    ]
+    return out
+
+
+def make_project(folder, with_scale=True, binary=False):
+    folder.mkdir()
+    path = str(folder / 'project.json')
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump({'version': 1, 'image': 'plan.png', 'objects': objects(with_scale)}, fh)
+    if binary:
+        json_to_binary(path, str(folder / 'project.flnb'))
+        os.remove(path)
+    return str(folder)
+
+
+def groups(rep):
+    return {g['color']: g for g in rep['by_color']}
+
+
+def test_scaled_lengths_and_areas(tmp_path):
+    rep = project_report(make_project(tmp_path / 'p'))
+    assert rep['pixels_per_meter'] == 100.0 and rep['scale_m'] == 2.0
+    assert (rep['measures'], rep['rects']) == (1, 3)
+    # the line is 500 px: its length comes from the scale, not the saved 3.5 m
+    assert rep['length_m'] == pytest.approx(5.0)
+    assert rep['area_m2'] == pytest.approx(2.0 + 0.25 + 0.4)
+    g = groups(rep)
+    assert g['#ff0000']['rects'] == 2 and g['#ff0000']['area_m2'] == pytest.approx(2.25)
+    assert g['#0000ff']['area_m2'] == pytest.approx(0.4)
+    assert rep['by_color'][0]['color'] == '#ff0000'
+    objs = rep['objects']
+    assert objs['index'] == [1, 2, 3, 4]
+    assert objs['width_m'][1:] == [1.0, 0.5, 1.0] and objs['height_m'][1] == 2.0
+    assert objs['length_px'][0] == 500.0 and objs['area_m2'][0] is None
+
+
+def test_no_scale_falls_back_to_saved_meters(tmp_path):
+    rep = project_report(make_project(tmp_path / 'p', with_scale=False))
+    assert rep['pixels_per_meter'] is None and rep['scale_m'] is None
+    assert rep['length_m'] == pytest.approx(3.5)
+    assert rep['area_m2'] is None
+    g = groups(rep)
+    # rectangles without a scale have no area: None, not 0
+    assert g['#ff0000']['area_m2'] is None and g['#ff0000']['rects'] == 2
+    assert rep['objects']['width_px'][1] == 100.0 and rep['objects']['width_m'][1] is None
+
+
+def test_nan_area_in_a_group_is_none():
+    kinds = np.array([KIND_RECT, KIND_RECT, KIND_MEASURE], dtype=np.int8)
+    colors = np.array([RED, BLUE, BLUE], dtype=np.uint8)
+    length_m = np.array([np.nan, np.nan, 2.0])
+    area_m2 = np.array([np.nan, 1.5, np.nan])
+    g = {x['color']: x for x in by_color(kinds, colors, length_m, area_m2)}
+    assert g['#ff0000']['area_m2'] is None and g['#ff0000']['length_m'] is None
+    assert g['#0000ff']['area_m2'] == 1.5 and g['#0000ff']['length_m'] == 2.0
+    assert not math.isnan(g['#0000ff']['area_m2'])
+
+
+@pytest.mark.parametrize('with_scale', [True, False])
+def test_json_and_binary_reports_match(tmp_path, with_scale):
+    a = project_report(make_project(tmp_path / 'json', with_scale))
+    b = project_report(make_project(tmp_path / 'flnb', with_scale, binary=True))
+    assert (a['file'], b['file']) == ('project.json', 'project.flnb')
+    for rep in (a, b):
+        for key in ('name', 'path', 'file'):
+            rep.pop(key)
+    assert a == b
+    out_a, out_b = io.StringIO(), io.StringIO()
+    write_json([a], out_a)
+    write_json([b], out_b)
+    assert out_a.getvalue() == out_b.getvalue()
@@ -0,0 +1,111 @@
+import json
+import math
+import os
+import sys
+
+import pytest
+
+from project_binary import json_to_binary
+from rescale import apply_scale, dpi_pixels_per_meter, main, nice_meters, read_project, rescale_project
+
+
+def scale(p1, p2, meters):
+    return {'type': 'scale', 'p1': list(p1), 'p2': list(p2), 'meters': meters, 'width': 2}
+
+
+def measure():
+    return {'type': 'measure', 'p1': [0, 0], 'p2': [30, 40], 'meters': None, 'width': 1}
+
+
+def test_meters_changes_the_scale_line():
+    objects = [measure(), scale((0, 0), (300, 400), 5.0)]
+    old, new, note = apply_scale(objects, meters=2.5)
+    assert (old, new, note) == (100.0, 200.0, '')
+    assert objects[1]['meters'] == 2.5 and objects[1]['p2'] == [300, 400]
+
+
+def test_meters_needs_a_scale_line():
+    with pytest.raises(ValueError):
+        apply_scale([measure()], meters=2.0)
+    with pytest.raises(ValueError):
+        apply_scale([scale((5, 5), (5, 5), 1.0)], meters=2.0)
+
+
+def test_ppm_keeps_the_endpoints():
+    objects = [scale((0, 0), (0, 500), 5.0), measure()]
+    old, new, note = apply_scale(objects, ppm=250.0)
+    assert (old, new, note) == (100.0, 250.0, '')
+    assert objects[0]['meters'] == 2.0 and objects[0]['p2'] == [0, 500]
+
+
+def test_ppm_replaces_a_zero_length_line():
+    objects = [measure(), scale((7, 7), (7, 7), 1.0)]
+    old, new, note = apply_scale(objects, ppm=100.0)
+    assert old is None and new == 100.0 and note == 'replaced a zero-length scale line'
+    line = objects[1]
+    assert line['meters'] == 2 and line['p2'] == [200.0, 0.0]
+    assert len(objects) == 2
+
+
+def test_ppm_adds_a_line():
+    objects = [measure()]
+    old, new, note = apply_scale(objects, ppm=dpi_pixels_per_meter(254, 50))
+    assert old is None and note == 'added a scale line'
+    line = objects[0]
+    assert line['type'] == 'scale' and len(objects) == 2
+    assert math.isclose(line['p2'][0] / line['meters'], new)
+
+
+@pytest.mark.parametrize('ppm, meters', [(1.0, 200), (100.0, 2), (80.0, 5), (1000.0, 0.2), (3937.0, 0.1), (4000.0, 0.1)])
+def test_nice_meters(ppm, meters):
+    m = nice_meters(ppm)
+    assert math.isclose(m, meters)
+    # the line is at most NEW_LINE_PX long and not shorter than 400 / 5
+    assert 80 <= m * ppm <= 400 + 1e-9
+
+
+def write_project(folder, binary):
+    folder.mkdir()
+    data = {'version': 1, 'image': 'plan.png', 'grid': {'spacing_m': 1.0},
+            'objects': [scale((0, 0), (400, 0), 4.0), measure()]}
+    path = str(folder / 'project.json')
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh)
+    if binary:
+        json_to_binary(path, str(folder / 'project.flnb'))
+        os.remove(path)
+        path = str(folder / 'project.flnb')
+    return str(folder), path
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_dry_run_leaves_the_file_alone(tmp_path, binary):
+    d, path = write_project(tmp_path / 'p', binary)
+    with open(path, 'rb') as fh:
+        before = fh.read()
+    stamp = os.stat(path).st_mtime_ns
+    assert rescale_project(d, meters=8.0, dry_run=True) == (100.0, 50.0, '')
+    with open(path, 'rb') as fh:
+        assert fh.read() == before
+    assert os.stat(path).st_mtime_ns == stamp
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_rescale_round_trips(tmp_path, binary):
+    d, path = write_project(tmp_path / 'p', binary)
+    fields_before, objects_before = read_project(path)
+    assert rescale_project(d, ppm=50.0) == (100.0, 50.0, '')
+    fields, objects = read_project(path)
+    assert fields == fields_before
+    assert objects[0]['meters'] == 8.0
+    assert json.loads(json.dumps(objects[1:])) == json.loads(json.dumps(objects_before[1:]))
+    assert rescale_project(d, ppm=50.0) == (50.0, 50.0, 'unchanged')
+
+
+def test_main_does_not_import_the_app(tmp_path, monkeypatch, capsys):
+    d, path = write_project(tmp_path / 'p', False)
+    monkeypatch.setenv('FLANER_PROJECTS', str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'flaner', raising=False)
+    assert main([d, '--meters', '2', '--dry-run', '--jobs', '1']) == 0
+    assert 'flaner' not in sys.modules
+    assert '100.00 -> 200.00 px/m' in capsys.readouterr().out
@@ -0,0 +1,65 @@
+import random
+
+import pygame
+
+from objects.measure_line import MeasureLine
+from objects.rectangle import Rectangle
+from objects.scale_line import ScaleLine
+from scene import Scene
+
+
+def brute_force_hit(scene, sx, sy, image_rect, image_scale, tol):
+    # the scan over every row that the index replaces
+    rows = scene.store.hit_rows(sx, sy, image_rect, image_scale, tol)
+    return scene.store.owners[int(rows[-1])] if len(rows) else None
+
+
+def random_scene(rng, n):
+    scene = Scene()
+    for _ in range(n):
+        x, y = rng.uniform(0, 4000), rng.uniform(0, 3000)
+        if rng.random() < 0.5:
+            obj = Rectangle((x, y), (x + rng.uniform(-300, 300), y + rng.uniform(-300, 300)))
+        else:
+            # a few long lines end up in the index's oversized list
+            reach = 3000 if rng.random() < 0.05 else 400
+            obj = MeasureLine((x, y), (x + rng.uniform(-reach, reach), y + rng.uniform(-reach, reach)))
+        scene.add(obj)
+    return scene
+
+
+def test_hit_test_matches_full_scan():
+    rng = random.Random(7)
+    scene = random_scene(rng, 600)
+    views = [(pygame.Rect(220, 0, 4000, 3000), 1.0), (pygame.Rect(180, -40, 1000, 750), 0.25), (pygame.Rect(-900, -300, 12000, 9000), 3.0)]
+    for step in range(300):
+        if step % 50 == 0:
+            # edits in between keep the index in step with the store
+            obj = scene.objects[rng.randrange(len(scene.objects))]
+            obj.move_by(rng.uniform(-200, 200), rng.uniform(-200, 200))
+            scene.moved(obj)
+            scene.remove(scene.objects[rng.randrange(len(scene.objects))])
+            scene.add(MeasureLine((100, 100), (900, 700)), rng.randrange(len(scene.objects)))
+        image_rect, image_scale = views[step % len(views)]
+        sx = image_rect.x + rng.uniform(0, image_rect.w)
+        sy = image_rect.y + rng.uniform(0, image_rect.h)
+        tol = rng.choice((0, 3, 8, 20))
+        assert scene.hit_test(sx, sy, image_rect, image_scale, tol) is brute_force_hit(scene, sx, sy, image_rect, image_scale, tol)
+
+
+def test_hit_test_picks_top_most_and_scale_first():
+    scene = Scene()
+    image_rect = pygame.Rect(0, 0, 1000, 1000)
+    below = Rectangle((100, 100), (300, 300))
+    above = Rectangle((150, 150), (250, 250))
+    scene.add(below)
+    scene.add(above)
+    assert scene.hit_test(200, 200, image_rect, 1.0) is above
+    assert scene.hit_test(120, 120, image_rect, 1.0) is below
+    assert scene.hit_test(600, 600, image_rect, 1.0) is None
+    scene.remove(above)
+    scene.add(above, 0)
+    assert scene.hit_test(200, 200, image_rect, 1.0) is below
+    scale = ScaleLine((0, 200), (400, 200), 4.0)
+    scene.set_scale(scale)
+    assert scene.hit_test(200, 200, image_rect, 1.0) is scale
@@ -0,0 +1,123 @@
+import math
+import random
+
+import pygame
+
+from history import History, AddObject, DeleteObject, MoveBy, MoveHandle
+from objects.measure_line import MeasureLine
+from objects.rectangle import Rectangle
+from objects.scale_line import ScaleLine
+from scene import Scene
+from snapping import KINDS, SnapIndex, find_snap, nearest_on_segment, snap_points, snap_segments
+
+RANK = {k: i for i, k in enumerate(KINDS)}
+
+
+def brute_force_snap(scene, sx, sy, image_rect, image_scale, tol, grid=None, exclude=None):
+    # every point and edge of every object, then the grid lattice: what the indexes stand in for
+    x = (sx - image_rect.x) / image_scale
+    y = (sy - image_rect.y) / image_scale
+    r2 = (tol / image_scale) ** 2
+    objs = [o for o in scene.objects + [scene.scale_object] if o is not None and o is not exclude]
+    cands = [(px, py, kind) for o in objs for px, py, kind in snap_points(o)]
+    if not any((px - x) ** 2 + (py - y) ** 2 <= r2 for px, py, _k in cands):
+        cands = [nearest_on_segment(x, y, a, b) + ('edge',) for o in objs for a, b in snap_segments(o)]
+    cands = [(RANK[k], (px - x) ** 2 + (py - y) ** 2, px, py, k) for px, py, k in cands]
+    cands = [c for c in cands if c[1] <= r2]
+    if cands:
+        _rank, _d2, px, py, kind = min(cands)
+        return image_rect.x + px * image_scale, image_rect.y + py * image_scale, kind
+    if grid is None:
+        return None
+    ppm, spacing_m, offset = grid
+    step = ppm * image_scale * spacing_m
+    best = None
+    for gx in (offset[0] % step + k * step for k in range(int(image_rect.w / step) + 1)):
+        for gy in (offset[1] % step + k * step for k in range(int(image_rect.h / step) + 1)):
+            d = math.hypot(image_rect.x + gx - sx, image_rect.y + gy - sy)
+            if d <= tol and (best is None or d < best[0]):
+                best = (d, image_rect.x + gx, image_rect.y + gy)
+    return None if best is None else (best[1], best[2], 'grid')
+
+
+def same(target, expected):
+    if target is None or expected is None:
+        return target is None and expected is None
+    return target.kind == expected[2] and math.isclose(target.sx, expected[0], abs_tol=1e-6) \
+        and math.isclose(target.sy, expected[1], abs_tol=1e-6)
+
+
+def random_object(rng):
+    x, y = rng.uniform(0, 1500), rng.uniform(0, 1000)
+    if rng.random() < 0.5:
+        return Rectangle((x, y), (x + rng.uniform(-150, 150), y + rng.uniform(-150, 150)))
+    return MeasureLine((x, y), (x + rng.uniform(-200, 200), y + rng.uniform(-200, 200)))
+
+
+def test_find_snap_matches_brute_force_after_edits():
+    rng = random.Random(11)
+    scene = Scene()
+    history = History()
+    scene.set_scale(ScaleLine((20, 20), (620, 20), 6.0))
+    for _ in range(250):
+        scene.add(random_object(rng))
+    scene.snaps  # built up front, so the edits below go through the incremental updates
+    scene.index
+    views = [(pygame.Rect(300, 0, 1500, 1000), 1.0), (pygame.Rect(250, -100, 750, 500), 0.5), (pygame.Rect(-400, -200, 4500, 3000), 3.0)]
+    for step in range(400):
+        if step % 20 == 0:
+            obj = scene.objects[rng.randrange(len(scene.objects))]
+            op = rng.randrange(4)
+            if op == 0:
+                dx, dy = rng.uniform(-100, 100), rng.uniform(-100, 100)
+                obj.move_by(dx, dy)
+                scene.moved(obj)
+                history.record(MoveBy(obj, dx, dy))
+            elif op == 1:
+                before = (obj.p1, obj.p2)
+                obj.p2 = (obj.p2[0] + rng.uniform(-80, 80), obj.p2[1] + rng.uniform(-80, 80))
+                scene.moved(obj)
+                history.record(MoveHandle(obj, before, (obj.p1, obj.p2)))
+            elif op == 2:
+                history.record(DeleteObject(obj, scene.remove(obj)))
+            else:
+                new = random_object(rng)
+                scene.add(new)
+                history.record(AddObject(new))
+            if rng.random() < 0.4:
+                history.undo(scene)
+        image_rect, image_scale = views[step % len(views)]
+        sx = image_rect.x + rng.uniform(0, image_rect.w)
+        sy = image_rect.y + rng.uniform(0, image_rect.h)
+        tol = rng.choice((4, 10, 25))
+        grid = (50.0, 0.5, (rng.uniform(-30, 30), rng.uniform(-30, 30))) if step % 2 else None
+        exclude = scene.objects[rng.randrange(len(scene.objects))] if step % 3 == 0 else None
+        got = find_snap(scene, sx, sy, image_rect, image_scale, tol, grid=grid, exclude=exclude)
+        assert same(got, brute_force_snap(scene, sx, sy, image_rect, image_scale, tol, grid, exclude)), step
+    # the incremental index holds what a rebuild would
+    fresh = SnapIndex()
+    fresh.rebuild(scene.objects)
+    assert len(scene.snaps) == len(fresh) == len(scene.objects)
+    assert sorted(map(tuple, scene.snaps.query(750, 500, 2000))) == sorted(map(tuple, fresh.query(750, 500, 2000)))
+
+
+def test_ranking_within_tolerance():
+    scene = Scene()
+    rect = pygame.Rect(0, 0, 1000, 1000)
+    line = MeasureLine((100, 100), (300, 100))   # midpoint at (200, 100)
+    other = MeasureLine((206, 100), (206, 160))  # endpoint 6 px from the midpoint
+    scene.add(line)
+    scene.add(other)
+    t = find_snap(scene, 202, 96, rect, 1.0, 10)
+    assert (t.kind, t.obj) == ('end', other)
+    # without the endpoint the midpoint wins over the closer edge point
+    t = find_snap(scene, 202, 96, rect, 1.0, 10, exclude=other)
+    assert (t.kind, (t.sx, t.sy)) == ('mid', (200.0, 100.0))
+    # away from points: the edge, then the grid
+    t = find_snap(scene, 150, 104, rect, 1.0, 10, grid=(100.0, 1.0, (0.0, 0.0)))
+    assert (t.kind, (t.sx, t.sy)) == ('edge', (150.0, 100.0))
+    t = find_snap(scene, 497, 502, rect, 1.0, 10, grid=(100.0, 1.0, (0.0, 0.0)))
+    assert (t.kind, (t.sx, t.sy)) == ('grid', (500.0, 500.0))
+    assert find_snap(scene, 497, 502, rect, 1.0, 10) is None
+    # the object being edited is never a target
+    assert find_snap(scene, 150, 104, rect, 1.0, 10, exclude=line) is None